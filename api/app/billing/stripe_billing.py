@@ -26,3 +26,45 @@ def record_usage(api_key: str, qty: int = 1, timestamp: int = None):
         return {"ok": True, "id": usage_record.id}
     except Exception as e:
         return {"ok": False, "error": str(e)}
+
+
+class StripeUsageClient:
+    """Reports metered usage to Stripe (used by billing/usage_flusher.py)."""
+
+    def create_usage_record(self, subscription_item: str, quantity: int, timestamp: int, idempotency_key: str):
+        return stripe.SubscriptionItem.create_usage_record(
+            subscription_item,
+            quantity=quantity,
+            timestamp=timestamp,
+            action="increment",
+            idempotency_key=idempotency_key,
+        )
+
+
+class StubStripeClient:
+    """In-memory stand-in for StripeUsageClient. Like Stripe, a repeated idempotency key is a no-op."""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.records: dict[str, dict] = {}
+
+    def create_usage_record(self, subscription_item: str, quantity: int, timestamp: int, idempotency_key: str):
+        if self.fail:
+            raise RuntimeError("stub stripe failure")
+        return self.records.setdefault(idempotency_key, {
+            "id": f"mbur_stub_{len(self.records) + 1}",
+            "subscription_item": subscription_item,
+            "quantity": quantity,
+            "timestamp": timestamp,
+        })
+
+    def totals(self) -> dict[str, int]:
+        out: dict[str, int] = {}
+        for rec in self.records.values():
+            out[rec["subscription_item"]] = out.get(rec["subscription_item"], 0) + rec["quantity"]
+        return out
+
+
+def get_usage_client():
+    """Stripe client when STRIPE_API_KEY is configured, else None (usage stays in the ledger)."""
+    return StripeUsageClient() if STRIPE_API_KEY else None
@@ -0,0 +1,187 @@
+"""
+Batched Stripe usage reporting from the local usage ledger.
+
+Workers write one UsageEvent per finished job in the same transaction as the
+job result (see job_state.finish). The flusher periodically:
+
+1. claims unreported events under a new report_batch_id,
+2. resolves each tenant's metered subscription item (cached per tenant),
+3. sums quantities per subscription item and sends one usage record per item
+   with idempotency key "<report_batch_id>:<item>",
+4. marks the events reported.
+
+A batch that fails to report keeps its report_batch_id and is retried with
+the same idempotency key on the next run, so Stripe never counts it twice.
+
+Configuration (env vars):
+- USAGE_FLUSH_INTERVAL: seconds between flushes in the API process (default: 60, 0 disables)
+- USAGE_FLUSH_BATCH: max events claimed per flush (default: 500)
+- METERED_ITEM_CACHE_TTL: seconds to cache a tenant's metered item (default: 300)
+
+Run standalone with: python -m app.billing.usage_flusher [--once]
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from sqlalchemy import func, select, update
+
+from ..db import SessionLocal, UsageEvent, get_metered_item_for_tenant
+from .stripe_billing import SUBS_ITEMS_MAP, get_usage_client
+
+logger = logging.getLogger(__name__)
+
+USAGE_FLUSH_INTERVAL = int(os.getenv("USAGE_FLUSH_INTERVAL", "60"))
+USAGE_FLUSH_BATCH = int(os.getenv("USAGE_FLUSH_BATCH", "500"))
+METERED_ITEM_CACHE_TTL = int(os.getenv("METERED_ITEM_CACHE_TTL", "300"))
+
+_item_cache: dict[str, tuple[str | None, float]] = {}
+_item_cache_lock = threading.Lock()
+
+
+def metered_item_for(db, tenant_id: str, api_key: str | None = None) -> str | None:
+    """Stripe subscription item for a tenant (tenants table, then STRIPE_SUBSCRIPTION_ITEMS)."""
+    now = time.monotonic()
+    with _item_cache_lock:
+        cached = _item_cache.get(tenant_id)
+    if cached and cached[1] > now:
+        item = cached[0]
+    else:
+        try:
+            item = get_metered_item_for_tenant(db, tenant_id)
+        except Exception as e:  # tenants table is optional
+            logger.debug(f"Metered item lookup failed for tenant {tenant_id}: {e}")
+            db.rollback()
+            item = None
+        with _item_cache_lock:
+            _item_cache[tenant_id] = (item, now + METERED_ITEM_CACHE_TTL)
+    return item or SUBS_ITEMS_MAP.get(api_key or "")
+
+
+def clear_metered_item_cache() -> None:
+    with _item_cache_lock:
+        _item_cache.clear()
+
+
+def _claim(db, limit: int) -> str | None:
+    """Claim up to `limit` unreported events. Returns the new report_batch_id, or None."""
+    # Resolve metered items first: a failed lookup rolls back, which must not undo the claim
+    owners = db.execute(
+        select(UsageEvent.tenant_id, UsageEvent.api_key)
+        .where(UsageEvent.reported_at.is_(None), UsageEvent.report_batch_id.is_(None))
+        .distinct()
+    ).all()
+    items = {(t, k): metered_item_for(db, t, k) for t, k in owners}
+
+    query = (
+        select(UsageEvent)
+        .where(UsageEvent.reported_at.is_(None), UsageEvent.report_batch_id.is_(None))
+        .order_by(UsageEvent.created_at)
+        .limit(limit)
+    )
+    if db.bind.dialect.name == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+    events = db.execute(query).scalars().all()
+    if not events:
+        db.commit()
+        return None
+    batch_id = "ub_" + uuid.uuid4().hex[:16]
+    claimed = 0
+    for event in events:
+        owner = (event.tenant_id, event.api_key)
+        if owner not in items:  # arrived after the lookup; picked up next run
+            continue
+        event.report_batch_id = batch_id
+        event.subscription_item = items[owner]
+        claimed += 1
+    db.commit()
+    return batch_id if claimed else None
+
+
+def _report(db, client, batch_id: str) -> dict:
+    """Send one usage record per subscription item in a claimed batch."""
+    events = db.execute(
+        select(UsageEvent).where(UsageEvent.report_batch_id == batch_id, UsageEvent.reported_at.is_(None))
+    ).scalars().all()
+    groups: dict[str | None, list] = defaultdict(list)
+    for event in events:
+        groups[event.subscription_item].append(event)
+
+    stats = {"events": 0, "records": 0, "skipped": 0, "errors": 0}
+    for item, group in groups.items():
+        ids = [e.id for e in group]
+        if item:
+            # Timestamp comes from the events so a retry sends identical parameters
+            stamps = [int(e.created_at.timestamp()) for e in group if e.created_at]
+            ts = max(stamps) if stamps else int(time.time())
+            try:
+                client.create_usage_record(
+                    item,
+                    quantity=sum(e.quantity or 0 for e in group),
+                    timestamp=ts,
+                    idempotency_key=f"{batch_id}:{item}",
+                )
+            except Exception as e:
+                logger.warning(f"Stripe usage report failed for {item} (batch {batch_id}): {e}")
+                stats["errors"] += 1
+                continue
+            stats["records"] += 1
+            stats["events"] += len(ids)
+        else:
+            # No metered item: nothing to bill, keep the event as a ledger entry only
+            stats["skipped"] += len(ids)
+        db.execute(update(UsageEvent).where(UsageEvent.id.in_(ids)).values(reported_at=func.now()))
+        db.commit()
+    return stats
+
+
+def flush_usage(db=None, client=None, limit: int = USAGE_FLUSH_BATCH) -> dict:
+    """Report pending usage to Stripe. Returns counts of events, records, skipped and errors."""
+    client = client or get_usage_client()
+    totals = {"events": 0, "records": 0, "skipped": 0, "errors": 0}
+    if client is None:
+        return totals
+    if db is None:
+        with SessionLocal() as dbs:
+            return flush_usage(dbs, client, limit)
+
+    # Retry batches claimed earlier that did not finish, with their original idempotency keys
+    pending = db.execute(
+        select(UsageEvent.report_batch_id)
+        .where(UsageEvent.reported_at.is_(None), UsageEvent.report_batch_id.isnot(None))
+        .distinct()
+    ).scalars().all()
+    batch_id = _claim(db, limit)
+    for bid in [*pending, batch_id]:
+        if bid:
+            for k, v in _report(db, client, bid).items():
+                totals[k] += v
+    if totals["records"] or totals["errors"]:
+        logger.info(f"Usage flush: {totals}")
+    return totals
+
+
+def run_forever(interval: int = USAGE_FLUSH_INTERVAL) -> None:
+    while True:
+        try:
+            flush_usage()
+        except Exception as e:
+            logger.error(f"Usage flush failed: {e}", exc_info=True)
+        time.sleep(max(1, interval))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Report ledgered usage to Stripe")
+    parser.add_argument("--once", action="store_true", help="Flush once and exit")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.once:
+        print(flush_usage())
+    else:
+        run_forever()
@@ -0,0 +1,132 @@
+"""
+Persisted canonical form of job results.
+
+normalize_to_canonical() used to run on every canonical read (GET
+/v1/jobs/{id}?format=canonical, validation, canonical CSV export, the ITC
+2B vs 3B reconciliation in the worker and the API). The worker now builds
+the canonical document once when a job finishes and stores it in
+Job.canonical next to the legacy result:
+
+    {
+        "schema_version": "doc.v0.1",
+        "normalizer_version": 1,
+        "doc_type": "gstr3b",
+        "document": {...},   # canonical doc, or an `_offloaded` summary (result_store)
+    }
+
+Readers go through load_canonical() / load_canonical_async(). When the
+stored form is missing (jobs finished before this existed, or archived by
+retention) or was built by an older schema/normalizer version, it is
+rebuilt from the legacy result and written back, so upgrades happen lazily
+on first read after a normalizer change (bump NORMALIZER_VERSION in
+parsers/canonical).
+"""
+
+import logging
+
+from .db import store_job_canonical
+from .parsers.canonical import CANONICAL_SCHEMA_VERSION, NORMALIZER_VERSION, normalize_to_canonical
+from .result_store import OFFLOAD_KEY, hydrate_result, offload_result, is_offloaded
+
+logger = logging.getLogger(__name__)
+
+# doc_type aliases that share a normalizer (see normalize_to_canonical)
+_ALIASES = {
+    "gst_invoice": "invoice",
+    "gstr": "gstr3b",
+    "gstr-3b": "gstr3b",
+    "gstr-2b": "gstr2b",
+    "gstr-1": "gstr1",
+}
+
+
+def canonical_kind(doc_type: str | None) -> str:
+    doc_type = (doc_type or "invoice").lower()
+    return _ALIASES.get(doc_type, doc_type)
+
+
+def is_current(stored, doc_type: str | None = None) -> bool:
+    """True when `stored` was built by the current schema and normalizer for doc_type."""
+    if not isinstance(stored, dict) or stored.get("document") is None:
+        return False
+    if stored.get("schema_version") != CANONICAL_SCHEMA_VERSION:
+        return False
+    if stored.get("normalizer_version") != NORMALIZER_VERSION:
+        return False
+    return doc_type is None or canonical_kind(stored.get("doc_type")) == canonical_kind(doc_type)
+
+
+def build_canonical(job_id: str, doc_type: str, result, document=None) -> dict | None:
+    """
+    Job.canonical value for a (hydrated) legacy result, or None if it can't be built.
+
+    Pass `document` when the canonical form was already computed for this result.
+    """
+    if not isinstance(result, dict):
+        return None
+    if document is None:
+        try:
+            document = normalize_to_canonical(doc_type, result)
+        except Exception as e:  # noqa: BLE001
+            logger.warning(f"Canonical conversion failed for job {job_id} ({doc_type}): {e}")
+            return None
+    return {
+        "schema_version": CANONICAL_SCHEMA_VERSION,
+        "normalizer_version": NORMALIZER_VERSION,
+        "doc_type": canonical_kind(doc_type),
+        "document": offload_result(job_id, document, name="canonical"),
+    }
+
+
+def stored_document(stored, summary: bool = False):
+    """Canonical document from a Job.canonical value (the stored summary if summary=True)."""
+    document = stored.get("document")
+    if summary:
+        return document
+    return hydrate_result(document)
+
+
+def canonical_keys(stored) -> list[str]:
+    """Storage key of an offloaded canonical document, if any."""
+    if isinstance(stored, dict) and is_offloaded(stored.get("document")):
+        return [stored["document"][OFFLOAD_KEY]["key"]]
+    return []
+
+
+def _resolve(job, doc_type: str | None):
+    """(document, new Job.canonical value or None when the stored one is current)."""
+    doc_type = doc_type or job.doc_type
+    stored = getattr(job, "canonical", None)
+    if is_current(stored, doc_type):
+        return stored_document(stored), None
+    result = hydrate_result(job.result)
+    if not isinstance(result, dict):
+        return None, None
+    document = normalize_to_canonical(doc_type, result)
+    # Only the job's own doc_type is cached; other interpretations are computed on demand
+    if canonical_kind(doc_type) != canonical_kind(job.doc_type):
+        return document, None
+    return document, build_canonical(job.id, doc_type, result, document)
+
+
+def load_canonical(db, job, doc_type: str | None = None):
+    """Canonical document of `job`, rebuilt and written back when missing or stale."""
+    document, upgraded = _resolve(job, doc_type)
+    if upgraded is not None:
+        store_job_canonical(db, job.id, upgraded)
+        logger.info(f"Stored canonical form of job {job.id} (normalizer v{NORMALIZER_VERSION})")
+    return document
+
+
+async def load_canonical_async(job, doc_type: str | None = None, summary: bool = False):
+    """load_canonical() for the async endpoints (storage and normalization run in a thread)."""
+    import asyncio
+    from .db_async import store_job_canonical_async
+
+    stored = getattr(job, "canonical", None)
+    if summary and is_current(stored, doc_type or job.doc_type):
+        return stored_document(stored, summary=True)
+    document, upgraded = await asyncio.to_thread(_resolve, job, doc_type)
+    if upgraded is not None:
+        await store_job_canonical_async(job.id, upgraded)
+    return document
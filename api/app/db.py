@@ -1,5 +1,6 @@
 import os, uuid
-from sqlalchemy import create_engine, Column, String, JSON, TIMESTAMP, Integer, text
+from sqlalchemy import create_engine, Column, String, JSON, TIMESTAMP, Integer, BigInteger, Date, Index, case, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -68,6 +69,9 @@ engine = create_engine(DB_URL, future=True)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
 Base = declarative_base()
 
+# JSONB on PostgreSQL (indexable), plain JSON elsewhere
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
 class Job(Base):
     __tablename__ = "jobs"
     __table_args__ = {'schema': TABLE_SCHEMA} if TABLE_SCHEMA else {}
@@ -78,12 +82,60 @@ class Job(Base):
     tenant_id = Column(String, default="")   # <— new
     api_key = Column(String, default="")
     filename = Column(String, default="")
-    result = Column(JSON, nullable=True)
-    meta = Column(JSON, nullable=True)
+    result = Column(JSONType, nullable=True)
+    meta = Column(JSONType, nullable=True)
     batch_id = Column(String, nullable=True)  # NEW: Link to batch
     client_id = Column(String, nullable=True)  # NEW: Link to client
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
+    upload_deleted_at = Column(TIMESTAMP(timezone=True), nullable=True)  # retention: raw upload removed
+    archived_at = Column(TIMESTAMP(timezone=True), nullable=True)  # retention: payload moved to a segment
+    canonical = Column(JSONType, nullable=True)  # versioned canonical form of result, see canonical_store.py
+
+
+# SQL expressions over Job.result used for matching (PostgreSQL only).
+# They mirror _extract_gstin_from_result / _extract_period_from_result and
+# back the expression indexes below, so keep queries and indexes in sync.
+def _json_str(col, *path):
+    """Text at `path` when it is a JSON string, else NULL."""
+    node = col[path] if len(path) > 1 else col[path[0]]
+    return case((func.jsonb_typeof(node) == "string", func.nullif(node.as_string(), "")))
+
+
+def result_gstin_expr(col=None):
+    col = Job.result if col is None else col
+    return func.upper(func.btrim(func.coalesce(
+        _json_str(col, "gstin"),
+        _json_str(col, "gstin", "value"),
+        _json_str(col, "gstin", "gstin"),
+        _json_str(col, "gstin_of_business"),
+        _json_str(col, "gstin_of_business", "value"),
+        _json_str(col, "seller", "gstin"),
+        _json_str(col, "seller", "gstin", "value"),
+    )))
+
+
+def result_period_expr(col=None):
+    """'YYYY-MM' from period.{month,year} or period.from; NULL for free-text periods."""
+    col = Job.result if col is None else col
+    month = col[("period", "month")].as_string()
+    year = col[("period", "year")].as_string()
+    start = col[("period", "from")].as_string()
+    return func.coalesce(
+        case((
+            month.regexp_match("^[0-9]{1,2}$") & year.regexp_match("^[0-9]{4}$"),
+            year + "-" + func.lpad(month, 2, "0"),
+        )),
+        case((start.regexp_match("^[0-9]{4}-[0-9]{2}"), func.left(start, 7))),
+    )
+
+
+Index("ix_jobs_tenant_doc_type_updated", Job.tenant_id, Job.doc_type, Job.updated_at)
+Index(
+    "ix_jobs_doc_type_gstin_period",
+    Job.doc_type, result_gstin_expr(), result_period_expr(),
+).ddl_if(dialect="postgresql")
+
 
 class Batch(Base):
     """Represents a batch of documents uploaded together"""
@@ -130,6 +182,82 @@ class ApiKey(Base):
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     created_by = Column(String, nullable=True)  # User/tenant who created it
 
+class UsageEvent(Base):
+    """Billable usage ledger: one row per finished job, reported to Stripe in batches"""
+    __tablename__ = "usage_events"
+    __table_args__ = {'schema': TABLE_SCHEMA} if TABLE_SCHEMA else {}
+
+    id = Column(String, primary_key=True, default=lambda: "use_" + uuid.uuid4().hex[:12])
+    job_id = Column(String, nullable=False, unique=True)  # at most one billable event per job
+    tenant_id = Column(String, nullable=False, default="", index=True)
+    api_key = Column(String, default="")
+    quantity = Column(Integer, nullable=False, default=1)
+    doc_type = Column(String, default="")
+    ocr_pages = Column(Integer, default=0)
+    bytes_processed = Column(BigInteger, default=0)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+    subscription_item = Column(String, nullable=True)  # resolved by the flusher
+    report_batch_id = Column(String, nullable=True, index=True)  # flusher claim, reused on retry
+    reported_at = Column(TIMESTAMP(timezone=True), nullable=True)
+
+Index(
+    "ix_usage_events_unreported", UsageEvent.created_at,
+    postgresql_where=UsageEvent.reported_at.is_(None),
+)
+
+class RetentionPolicy(Base):
+    """Per-tenant retention; NULL days fall back to RETENTION_* env defaults (see retention.py)"""
+    __tablename__ = "retention_policies"
+    __table_args__ = {'schema': TABLE_SCHEMA} if TABLE_SCHEMA else {}
+
+    tenant_id = Column(String, primary_key=True)
+    upload_days = Column(Integer, nullable=True)  # delete raw uploads after N days
+    archive_days = Column(Integer, nullable=True)  # archive result/meta after N days
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class UsageDaily(Base):
+    """Per-day usage rollup, bumped when a job finishes (see usage.py)"""
+    __tablename__ = "usage_daily"
+    __table_args__ = {'schema': TABLE_SCHEMA} if TABLE_SCHEMA else {}
+
+    tenant_id = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    api_key = Column(String, primary_key=True, default="")
+    doc_type = Column(String, primary_key=True, default="")
+    docs_parsed = Column(Integer, nullable=False, default=0)
+    ocr_pages = Column(Integer, nullable=False, default=0)
+    bytes_processed = Column(BigInteger, nullable=False, default=0)
+
+class UsageMonthly(Base):
+    """Per-month usage rollup (month is 'YYYY-MM'), bumped alongside UsageDaily"""
+    __tablename__ = "usage_monthly"
+    __table_args__ = {'schema': TABLE_SCHEMA} if TABLE_SCHEMA else {}
+
+    tenant_id = Column(String, primary_key=True)
+    month = Column(String(7), primary_key=True)
+    api_key = Column(String, primary_key=True, default="")
+    doc_type = Column(String, primary_key=True, default="")
+    docs_parsed = Column(Integer, nullable=False, default=0)
+    ocr_pages = Column(Integer, nullable=False, default=0)
+    bytes_processed = Column(BigInteger, nullable=False, default=0)
+
+class Reconciliation(Base):
+    """Latest reconciliation per (tenant, GSTIN, period 'YYYY-MM', type), maintained by the worker (see recon_store.py)"""
+    __tablename__ = "reconciliations"
+    __table_args__ = {'schema': TABLE_SCHEMA} if TABLE_SCHEMA else {}
+
+    tenant_id = Column(String, primary_key=True, default="")
+    gstin = Column(String, primary_key=True)
+    period = Column(String(7), primary_key=True)
+    recon_type = Column(String, primary_key=True)
+    left_job_id = Column(String, nullable=True, index=True)  # e.g. sales_register side
+    right_job_id = Column(String, nullable=True, index=True)  # e.g. gstr1 side
+    status = Column(String, nullable=False, default="awaiting_counterpart")
+    summary = Column(JSONType, nullable=True)  # small fields of result, for listings
+    result = Column(JSONType, nullable=True)  # full reconciliation (may be offloaded, see result_store)
+    computed_by_job_id = Column(String, nullable=True)
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
+
 def init_db():
     """Initialize database: create schema if needed, then create tables."""
     import logging
@@ -177,6 +305,8 @@ def create_job(
     tenant_id: str,
     filename: str,
     meta: dict | None = None,
+    batch_id: str | None = None,
+    client_id: str | None = None,
 ):
     job = Job(
         object_key=object_key,
@@ -186,6 +316,8 @@ def create_job(
         status="queued",
         result=None,
         meta=meta or {},
+        batch_id=batch_id,
+        client_id=client_id,
     )
     db.add(job)
     db.commit()
@@ -197,6 +329,25 @@ def create_job(
 def get_job_by_id(db, job_id: str):
     return db.get(Job, job_id)
 
+def tenant_filter(tenant_id: str | None):
+    """Jobs visible to a tenant.
+    For development, jobs with an empty tenant_id are always included
+    (they were created before tenant_id was properly set).
+    """
+    from sqlalchemy import or_
+    if tenant_id:
+        return or_(Job.tenant_id == tenant_id, Job.tenant_id == "", Job.tenant_id.is_(None))
+    return or_(Job.tenant_id == "", Job.tenant_id.is_(None))
+
+def list_jobs_for_tenant(db, tenant_id: str | None, limit: int = 10):
+    return (
+        db.query(Job)
+        .filter(tenant_filter(tenant_id))
+        .order_by(Job.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+
 def update_job_status(db, job_id: str, **kwargs):
     j = db.get(Job, job_id)
     if not j:
@@ -206,6 +357,12 @@ def update_job_status(db, job_id: str, **kwargs):
     db.add(j); db.commit(); db.refresh(j)
     return j
 
+def store_job_canonical(db, job_id: str, canonical: dict | None):
+    """Write Job.canonical without bumping updated_at (which orders job matching)."""
+    from sqlalchemy import update
+    db.execute(update(Job).where(Job.id == job_id).values(canonical=canonical, updated_at=Job.updated_at))
+    db.commit()
+
 def get_metered_item_for_tenant(db, tenant_id: str) -> str | None:
     if not tenant_id:
         return None
@@ -368,9 +525,17 @@ def find_matching_job_by_gstin_and_period(
     
     if exclude_job_id:
         query = query.filter(Job.id != exclude_job_id)
-    
-    # Get all candidates and filter by GSTIN and period in Python
-    # (SQLAlchemy JSON queries can be complex, so we do it in Python for reliability)
+
+    if db.bind.dialect.name == "postgresql":
+        # Narrow in SQL via ix_jobs_doc_type_gstin_period. Free-text periods
+        # ("November 2025") have no SQL form, so NULL periods stay candidates.
+        period_key = f"{int(source_period_year):04d}-{int(source_period_month):02d}"
+        query = query.filter(
+            result_gstin_expr() == source_gstin,
+            or_(result_period_expr() == period_key, result_period_expr().is_(None)),
+        )
+
+    # Verify GSTIN and period in Python (authoritative; also the only filter on SQLite)
     candidates = query.order_by(Job.updated_at.desc()).all()
     
     for job in candidates:
@@ -389,6 +554,55 @@ def find_matching_job_by_gstin_and_period(
     
     return None
 
+def find_jobs_by_gstin_and_periods(
+    db,
+    tenant_id: str,
+    doc_types,
+    gstin: str,
+    periods,
+):
+    """Latest matching job per (doc_type, period) for one GSTIN across many periods.
+
+    Same matching rules as find_matching_job_by_gstin_and_period, but all
+    doc types and periods are fetched in one query (ix_jobs_doc_type_gstin_period
+    on PostgreSQL) instead of one query per doc type and month.
+
+    Args:
+        periods: iterable of (month, year)
+
+    Returns:
+        {(doc_type, (month, year)): Job}
+    """
+    from sqlalchemy import or_
+
+    gstin = _normalize_gstin(gstin)
+    wanted = {(int(m), int(y)) for m, y in periods}
+    if not gstin or not wanted:
+        return {}
+
+    query = db.query(Job).filter(
+        tenant_filter(tenant_id),
+        Job.doc_type.in_(list(doc_types)),
+        or_(Job.status == "succeeded", Job.status == "needs_review"),
+        Job.result.isnot(None),
+    )
+    if db.bind.dialect.name == "postgresql":
+        period_keys = sorted(f"{y:04d}-{m:02d}" for m, y in wanted)
+        query = query.filter(
+            result_gstin_expr() == gstin,
+            or_(result_period_expr().in_(period_keys), result_period_expr().is_(None)),
+        )
+
+    found = {}
+    for job in query.order_by(Job.updated_at.desc()).all():
+        if _extract_gstin_from_result(job.result) != gstin:
+            continue
+        period = _extract_period_from_result(job.result)
+        key = (job.doc_type, period)
+        if period in wanted and key not in found:
+            found[key] = job
+    return found
+
 # Bulk processing functions
 def create_batch(db, *, tenant_id: str, client_id: str = None, batch_name: str = None, total_files: int):
     batch = Batch(
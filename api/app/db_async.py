@@ -0,0 +1,218 @@
+"""
+Async database access for the API endpoints.
+
+The `async def` endpoints used to call the synchronous SessionLocal() from
+db.py, blocking the event loop on every round trip. This module exposes an
+async engine (asyncpg for PostgreSQL, aiosqlite for SQLite) and async
+versions of the job/batch helpers the endpoints need. Workers keep using
+the synchronous path in db.py.
+
+If the async driver is not installed, the helpers fall back to running the
+synchronous helpers in a worker thread so the event loop is still free.
+"""
+
+import asyncio
+import logging
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from sqlalchemy import select, update
+from sqlalchemy.sql import func
+
+from .db import (
+    DB_URL,
+    SessionLocal,
+    Job,
+    Batch,
+    create_job,
+    create_batch,
+    get_job_by_id,
+    get_batch_by_id,
+    get_jobs_by_batch,
+    list_jobs_for_tenant,
+    store_job_canonical,
+    tenant_filter,
+    update_batch_stats,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _to_async_url(url: str) -> tuple[str, dict]:
+    """Map a sync DB URL to its async-driver equivalent. Returns (url, connect_args)."""
+    connect_args: dict = {}
+    scheme, _, rest = url.partition("://")
+    base = scheme.split("+", 1)[0]
+    if base in ("postgres", "postgresql"):
+        # asyncpg does not understand libpq's sslmode query parameter
+        parts = urlsplit("postgresql+asyncpg://" + rest)
+        query = dict(parse_qsl(parts.query))
+        sslmode = query.pop("sslmode", None)
+        if sslmode and sslmode != "disable":
+            connect_args["ssl"] = sslmode
+        return urlunsplit(parts._replace(query=urlencode(query))), connect_args
+    if base == "sqlite":
+        return "sqlite+aiosqlite://" + rest, connect_args
+    return url, connect_args
+
+
+async_engine = None
+AsyncSessionLocal = None
+try:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    _async_url, _connect_args = _to_async_url(DB_URL)
+    async_engine = create_async_engine(_async_url, connect_args=_connect_args, pool_pre_ping=True)
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+    logger.info(f"Async database driver ready: {async_engine.dialect.driver}")
+except Exception as e:  # driver not installed (asyncpg/aiosqlite)
+    async_engine = None
+    AsyncSessionLocal = None
+    logger.warning(f"Async database driver unavailable ({e}); endpoints will use a thread pool")
+
+
+def _in_thread(fn, *args, **kwargs):
+    """Run a sync db.py helper with its own session in a worker thread."""
+    def _run():
+        with SessionLocal() as db:
+            return fn(db, *args, **kwargs)
+    return asyncio.to_thread(_run)
+
+
+async def create_job_async(**kwargs) -> Job:
+    if AsyncSessionLocal is None:
+        return await _in_thread(create_job, **kwargs)
+    async with AsyncSessionLocal() as db:
+        job = Job(
+            object_key=kwargs["object_key"],
+            api_key=kwargs["api_key"],
+            tenant_id=kwargs.get("tenant_id") or "",
+            filename=kwargs["filename"],
+            status="queued",
+            result=None,
+            meta=kwargs.get("meta") or {},
+            batch_id=kwargs.get("batch_id"),
+            client_id=kwargs.get("client_id"),
+        )
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+        return job
+
+
+async def get_job_by_id_async(job_id: str) -> Job | None:
+    if AsyncSessionLocal is None:
+        return await _in_thread(get_job_by_id, job_id)
+    async with AsyncSessionLocal() as db:
+        return await db.get(Job, job_id)
+
+
+async def list_jobs_for_tenant_async(tenant_id: str | None, limit: int = 10) -> list[Job]:
+    if AsyncSessionLocal is None:
+        return await _in_thread(list_jobs_for_tenant, tenant_id, limit)
+    async with AsyncSessionLocal() as db:
+        rows = await db.execute(
+            select(Job)
+            .where(tenant_filter(tenant_id))
+            .order_by(Job.created_at.desc())
+            .limit(limit)
+        )
+        return list(rows.scalars().all())
+
+
+async def create_batch_async(**kwargs) -> Batch:
+    if AsyncSessionLocal is None:
+        return await _in_thread(create_batch, **kwargs)
+    async with AsyncSessionLocal() as db:
+        batch = Batch(
+            tenant_id=kwargs["tenant_id"],
+            client_id=kwargs.get("client_id"),
+            batch_name=kwargs.get("batch_name"),
+            total_files=kwargs["total_files"],
+            status="processing",
+        )
+        db.add(batch)
+        await db.commit()
+        await db.refresh(batch)
+        return batch
+
+
+async def get_batch_by_id_async(batch_id: str) -> Batch | None:
+    if AsyncSessionLocal is None:
+        return await _in_thread(get_batch_by_id, batch_id)
+    async with AsyncSessionLocal() as db:
+        return await db.get(Batch, batch_id)
+
+
+async def get_jobs_by_batch_async(batch_id: str) -> list[Job]:
+    if AsyncSessionLocal is None:
+        return await _in_thread(get_jobs_by_batch, batch_id)
+    async with AsyncSessionLocal() as db:
+        rows = await db.execute(select(Job).where(Job.batch_id == batch_id))
+        return list(rows.scalars().all())
+
+
+async def update_batch_stats_async(batch_id: str, **kwargs) -> Batch | None:
+    """Increment batch counters (see db.update_batch_stats)."""
+    if AsyncSessionLocal is None:
+        return await _in_thread(update_batch_stats, batch_id, **kwargs)
+    async with AsyncSessionLocal() as db:
+        batch = await db.get(Batch, batch_id)
+        if batch:
+            for k, v in kwargs.items():
+                if hasattr(batch, k):
+                    setattr(batch, k, (getattr(batch, k) or 0) + v)
+            await db.commit()
+            await db.refresh(batch)
+        return batch
+
+
+async def update_job_fields_async(job_id: str, **kwargs) -> Job | None:
+    if AsyncSessionLocal is None:
+        from .db import update_job_status
+        return await _in_thread(update_job_status, job_id, **kwargs)
+    async with AsyncSessionLocal() as db:
+        job = await db.get(Job, job_id)
+        if not job:
+            return None
+        for k, v in kwargs.items():
+            setattr(job, k, v)
+        await db.commit()
+        await db.refresh(job)
+        return job
+
+
+async def store_job_canonical_async(job_id: str, canonical: dict | None) -> None:
+    if AsyncSessionLocal is None:
+        return await _in_thread(store_job_canonical, job_id, canonical)
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(Job).where(Job.id == job_id).values(canonical=canonical, updated_at=Job.updated_at)
+        )
+        await db.commit()
+
+
+async def reconciliations_for_job_async(job_id: str) -> dict:
+    """{recon_type: stored result} of the materialized reconciliations a job is a side of (not hydrated)."""
+    from .recon_store import job_rows_stmt, reconciliations_for_job
+    if AsyncSessionLocal is None:
+        return await _in_thread(reconciliations_for_job, job_id, hydrate=False)
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(job_rows_stmt(job_id))).scalars().all()
+        return {row.recon_type: row.result for row in rows}
+
+
+async def mark_batch_completed_async(batch_id: str) -> None:
+    if AsyncSessionLocal is None:
+        def _complete(db, batch_id):
+            batch = db.get(Batch, batch_id)
+            if batch and batch.status != "completed":
+                batch.status = "completed"
+                batch.completed_at = func.now()
+                db.commit()
+        return await _in_thread(_complete, batch_id)
+    async with AsyncSessionLocal() as db:
+        batch = await db.get(Batch, batch_id)
+        if batch and batch.status != "completed":
+            batch.status = "completed"
+            batch.completed_at = func.now()
+            await db.commit()
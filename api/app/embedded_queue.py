@@ -0,0 +1,129 @@
+"""
+Embedded (in-process) job execution for deployments without Redis.
+
+When REDIS_URL is not configured the API used to call parse_job_task()
+directly inside the async request handler, which ran the CPU-bound parse
+and OCR on the event loop. This module provides a small bounded process
+pool that lives inside the API process instead, so requests return
+immediately while documents parse in the background.
+
+Configuration (env vars):
+- EMBEDDED_WORKERS: number of worker processes (default: 2)
+- EMBEDDED_QUEUE_SIZE: max jobs waiting or running at once (default: 16)
+- EMBEDDED_START_METHOD: multiprocessing start method (default: spawn)
+
+If a worker process dies (e.g. killed for memory during OCR) the process
+pool is broken: every job it held fails with BrokenProcessPool. The queue
+then starts a fresh pool for later submissions and reports each lost job
+to `on_lost` so the caller can mark it failed.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+EMBEDDED_WORKERS = int(os.getenv("EMBEDDED_WORKERS", "2"))
+EMBEDDED_QUEUE_SIZE = int(os.getenv("EMBEDDED_QUEUE_SIZE", "16"))
+EMBEDDED_START_METHOD = os.getenv("EMBEDDED_START_METHOD", "spawn")
+
+
+class EmbeddedQueueFull(Exception):
+    """Raised when the embedded queue already holds EMBEDDED_QUEUE_SIZE jobs."""
+
+
+class EmbeddedQueue:
+    """
+    Bounded process pool with its own small admission queue.
+
+    At most `max_pending` submissions may be queued or running at any time;
+    further submissions raise EmbeddedQueueFull instead of blocking, so the
+    caller can answer with a 503 rather than stalling the event loop.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = EMBEDDED_WORKERS,
+        max_pending: int = EMBEDDED_QUEUE_SIZE,
+        start_method: str = EMBEDDED_START_METHOD,
+        on_lost: Optional[Callable[..., None]] = None,
+    ):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(self.max_workers, max_pending)
+        self.start_method = start_method
+        # Called with the submitted args of each job lost to a dead worker process
+        self.on_lost = on_lost
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = self._new_executor()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context(self.start_method),
+        )
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs currently queued or running."""
+        return self._pending
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """Submit fn(*args) to the pool. Raises EmbeddedQueueFull when at capacity."""
+        if not self._slots.acquire(blocking=False):
+            raise EmbeddedQueueFull(
+                f"Embedded queue is full ({self.max_pending} jobs pending)"
+            )
+        with self._lock:
+            self._pending += 1
+        try:
+            executor = self._executor
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                self._rebuild(executor)
+                future = self._executor.submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(lambda f: self._on_done(f, executor, args))
+        return future
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _rebuild(self, broken: ProcessPoolExecutor) -> None:
+        """Replace `broken` with a fresh pool (once, however many of its jobs report it)."""
+        with self._lock:
+            if self._executor is not broken:
+                return
+            logger.error("Embedded worker process died; starting a new worker pool")
+            self._executor = self._new_executor()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def _on_done(self, future: Future, executor: ProcessPoolExecutor, args: tuple) -> None:
+        self._release()
+        if future.cancelled():
+            return
+        exc = future.exception()
+        if isinstance(exc, BrokenProcessPool):
+            self._rebuild(executor)
+            if self.on_lost is not None:
+                try:
+                    self.on_lost(*args)
+                except Exception as e:
+                    logger.error(f"Could not mark lost embedded job {args}: {e}")
+            return
+        if exc is not None:
+            logger.error(f"Embedded job failed: {exc}", exc_info=exc)
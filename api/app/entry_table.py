@@ -0,0 +1,198 @@
+"""
+Columnar view of document entries for totals, validation and reconciliation.
+
+Registers, GSTR-1 B2B invoices and GSTR-2B entries are stored as lists of
+dicts. Walking those lists with a float() per field for every total and
+every validator is slow for large registers, so EntryTable converts a
+document's entries once into:
+
+- float64 NumPy arrays for the amount columns (taxable_value, igst, cgst,
+  sgst, cess, total),
+- lists of interned strings for GSTINs, invoice numbers, dates and entry ids.
+
+Totals, per-entry tolerance checks and validator rules then run as array
+operations. Two input shapes are supported:
+
+- flat: parser output rows (sales/purchase register entries, GSTR-1
+  b2b_invoices, GSTR-2B b2b rows) via EntryTable.from_flat()
+- canonical: doc.v0.1 entries (amounts.tax_breakup, party.gstin) via
+  EntryTable.from_canonical()
+
+to_flat() / to_canonical() merge the (possibly modified) columns back into
+copies of the source rows.
+"""
+
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+TAX_COLUMNS = ("igst", "cgst", "sgst", "cess")
+AMOUNT_COLUMNS = ("taxable_value",) + TAX_COLUMNS + ("total",)
+# Flat rows name the invoice total differently per document type
+FLAT_TOTAL_KEYS = ("total_value", "invoice_value")
+FLAT_GSTIN_KEYS = ("supplier_gstin", "customer_gstin", "counterparty_gstin", "gstin")
+
+
+def _f(x: Any) -> float:
+    """Safely convert value to float (strings may carry thousands separators)."""
+    try:
+        return float(x or 0.0)
+    except (TypeError, ValueError):
+        try:
+            return float(str(x).replace(",", "").strip() or 0.0)
+        except ValueError:
+            return 0.0
+
+
+def _column(values: List[Any]) -> np.ndarray:
+    """float64 column; the common all-numeric case converts in one call."""
+    try:
+        return np.array([v or 0.0 for v in values], dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.fromiter((_f(v) for v in values), dtype=np.float64, count=len(values))
+
+
+def _text(value: Any) -> Optional[str]:
+    if isinstance(value, dict):
+        value = value.get("value")
+    if value is None or value == "":
+        return None
+    return sys.intern(str(value))
+
+
+def _first(row: Dict[str, Any], keys: Iterable[str]) -> Any:
+    for key in keys:
+        value = row.get(key)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+@dataclass
+class EntryTable:
+    amounts: Dict[str, np.ndarray]
+    gstin: List[Optional[str]]
+    invoice_number: List[Optional[str]]
+    invoice_date: List[Optional[str]]
+    entry_id: List[Optional[str]]
+    rows: List[Dict[str, Any]] = field(default_factory=list, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @classmethod
+    def from_flat(cls, entries: Iterable[Any], gstin_key: Optional[str] = None) -> "EntryTable":
+        rows = [e for e in entries or [] if isinstance(e, dict)]
+        gstin_keys = (gstin_key,) if gstin_key else FLAT_GSTIN_KEYS
+        amounts = {col: _column([r.get(col) for r in rows]) for col in ("taxable_value",) + TAX_COLUMNS}
+        total = _column([_first(r, FLAT_TOTAL_KEYS) for r in rows])
+        # Rows without a stated total are taken as taxable + taxes (as the parsers do)
+        amounts["total"] = np.where(total != 0, total, amounts["taxable_value"] + sum(amounts[c] for c in TAX_COLUMNS))
+        return cls(
+            amounts=amounts,
+            gstin=[_text(_first(r, gstin_keys)) for r in rows],
+            invoice_number=[_text(r.get("invoice_number")) for r in rows],
+            invoice_date=[_text(r.get("invoice_date") or r.get("date")) for r in rows],
+            entry_id=[_text(r.get("entry_id")) for r in rows],
+            rows=rows,
+        )
+
+    @classmethod
+    def from_canonical(cls, entries: Iterable[Any]) -> "EntryTable":
+        rows = [e for e in entries or [] if isinstance(e, dict)]
+        amounts_of = [r.get("amounts") or {} for r in rows]
+        breakups = [a.get("tax_breakup") or {} for a in amounts_of]
+        amounts = {"taxable_value": _column([a.get("taxable_value") for a in amounts_of])}
+        for col in TAX_COLUMNS:
+            amounts[col] = _column([b.get(col) for b in breakups])
+        amounts["total"] = _column([a.get("total") for a in amounts_of])
+        return cls(
+            amounts=amounts,
+            gstin=[_text((r.get("party") or {}).get("gstin")) for r in rows],
+            invoice_number=[_text(r.get("entry_number")) for r in rows],
+            invoice_date=[_text(r.get("entry_date")) for r in rows],
+            entry_id=[_text(r.get("entry_id")) for r in rows],
+            rows=rows,
+        )
+
+    def tax(self) -> np.ndarray:
+        return sum(self.amounts[c] for c in TAX_COLUMNS)
+
+    def expected_total(self) -> np.ndarray:
+        """Per-entry taxable value plus all taxes."""
+        return self.amounts["taxable_value"] + self.tax()
+
+    def totals(self, columns: Iterable[str] = AMOUNT_COLUMNS, digits: Optional[int] = 2) -> Dict[str, float]:
+        """Column sums, rounded to `digits` (None keeps full precision)."""
+        sums = {c: float(self.amounts[c].sum()) for c in columns}
+        return sums if digits is None else {c: round(v, digits) for c, v in sums.items()}
+
+    def total_mismatches(self, tolerance: float) -> np.ndarray:
+        """Indices of entries whose total differs from taxable + taxes by more than tolerance."""
+        return np.flatnonzero(np.abs(self.amounts["total"] - self.expected_total()) > tolerance)
+
+    def to_flat(self) -> List[Dict[str, Any]]:
+        """Copies of the source rows with amount columns written back (flat shape)."""
+        out = []
+        for i, row in enumerate(self.rows):
+            new = dict(row)
+            for col in ("taxable_value",) + TAX_COLUMNS:
+                new[col] = float(self.amounts[col][i])
+            total_key = next((k for k in FLAT_TOTAL_KEYS if k in row), "total_value")
+            new[total_key] = float(self.amounts["total"][i])
+            out.append(new)
+        return out
+
+    def to_canonical(self) -> List[Dict[str, Any]]:
+        """Copies of the source rows with amount columns written back (canonical shape)."""
+        out = []
+        for i, row in enumerate(self.rows):
+            new = dict(row)
+            new["amounts"] = {
+                **(row.get("amounts") or {}),
+                "taxable_value": float(self.amounts["taxable_value"][i]),
+                "tax_breakup": {c: float(self.amounts[c][i]) for c in TAX_COLUMNS},
+                "total": float(self.amounts["total"][i]),
+            }
+            out.append(new)
+        return out
+
+
+def validate_canonical_totals(
+    doc: Dict[str, Any],
+    tolerance: float,
+    table: Optional[EntryTable] = None,
+) -> tuple:
+    """
+    Shared part of the canonical validators.
+
+    Returns (table, financials, issues) where financials holds the document's
+    stated totals and issues contains ENTRY_TOTAL_MISMATCH warnings.
+    """
+    if table is None:
+        table = EntryTable.from_canonical(doc.get("entries") or [])
+    fin = doc.get("financials") or {}
+    tb = fin.get("tax_breakup") or {}
+    financials = {
+        "subtotal": _f(fin.get("subtotal")),
+        "cgst": _f(tb.get("cgst")),
+        "sgst": _f(tb.get("sgst")),
+        "igst": _f(tb.get("igst")),
+        "cess": _f(tb.get("cess")),
+        "tax_total": _f(fin.get("tax_total")),
+        "grand_total": _f(fin.get("grand_total")),
+    }
+
+    issues: List[Dict[str, Any]] = []
+    expected = table.expected_total()
+    for i in table.total_mismatches(tolerance):
+        entry_id = table.rows[i].get("entry_id")
+        issues.append({
+            "code": "ENTRY_TOTAL_MISMATCH",
+            "level": "warning",
+            "message": f"Entry {entry_id} total {float(table.amounts['total'][i])} != taxable+tax {float(expected[i])}",
+            "meta": {"entry_id": entry_id},
+        })
+    return table, financials, issues
@@ -0,0 +1,132 @@
+"""
+Job state machine.
+
+Each transition is a single conditional UPDATE ... RETURNING, so a worker
+learns in one round trip whether it owns the transition and gets back the
+job fields it needs. Terminal transitions also bump the owning batch's
+counters in the same statement (PostgreSQL data-modifying CTE), so
+concurrent workers cannot lose updates.
+
+    queued ──> processing ──> succeeded
+                    │    └──> needs_review
+                    └───────> failed
+"""
+
+from sqlalchemy import case, func, select, update
+
+from .db import Job, Batch
+from .usage import record_job_usage
+
+QUEUED = "queued"
+PROCESSING = "processing"
+SUCCEEDED = "succeeded"
+NEEDS_REVIEW = "needs_review"
+FAILED = "failed"
+
+# target status -> statuses it may be entered from.
+# processing -> processing covers an RQ retry after a worker timeout/crash.
+ALLOWED_FROM = {
+    PROCESSING: (QUEUED, PROCESSING),
+    SUCCEEDED: (PROCESSING,),
+    NEEDS_REVIEW: (PROCESSING,),
+    FAILED: (QUEUED, PROCESSING),
+}
+
+_RETURNING = (
+    Job.id,
+    Job.status,
+    Job.doc_type,
+    Job.object_key,
+    Job.tenant_id,
+    Job.api_key,
+    Job.filename,
+    Job.meta,
+    Job.batch_id,
+    Job.client_id,
+)
+
+
+class InvalidTransition(ValueError):
+    pass
+
+
+def _batch_update(job_batch_id, to_status: str):
+    """UPDATE batches for a job reaching a terminal status."""
+    ok = 0 if to_status == FAILED else 1
+    bad = 1 - ok
+    done = Batch.processed_files + Batch.failed_files + 1 >= Batch.total_files
+    return (
+        update(Batch)
+        .where(Batch.id == job_batch_id)
+        .values(
+            processed_files=Batch.processed_files + ok,
+            failed_files=Batch.failed_files + bad,
+            status=case((done, "completed"), else_=Batch.status),
+            completed_at=case((done, func.now()), else_=Batch.completed_at),
+        )
+    )
+
+
+def transition(db, job_id: str, to_status: str, usage: dict | None = None, **values):
+    """
+    Move a job to `to_status` if its current status allows it.
+
+    `usage` (see usage.usage_from_meta) also records the job's usage ledger
+    event and rollups in the same transaction.
+
+    Returns the updated job row (id, status, doc_type, object_key, tenant_id,
+    api_key, filename, meta, batch_id, client_id) or None when the job does
+    not exist or is not in an allowed source status.
+    """
+    if to_status not in ALLOWED_FROM:
+        raise InvalidTransition(f"Unknown job status: {to_status}")
+
+    job_update = (
+        update(Job)
+        .where(Job.id == job_id, Job.status.in_(ALLOWED_FROM[to_status]))
+        .values(status=to_status, **values)
+        .returning(*_RETURNING)
+    )
+    terminal = to_status in (SUCCEEDED, NEEDS_REVIEW, FAILED)
+
+    try:
+        if terminal and db.bind.dialect.name == "postgresql":
+            # One statement: the job UPDATE feeds the batch UPDATE through a CTE
+            job_cte = job_update.cte("job_upd")
+            batch_cte = _batch_update(job_cte.c.batch_id, to_status).returning(Batch.id).cte("batch_upd")
+            row = db.execute(select(job_cte).add_cte(batch_cte)).first()
+        else:
+            row = db.execute(job_update).first()
+            if row is not None and terminal and row.batch_id:
+                db.execute(_batch_update(row.batch_id, to_status))
+        if row is not None and usage:
+            record_job_usage(db, row, usage)
+        db.commit()
+    except Exception:
+        # Nothing of a half-done transition may be committed by the caller's next one (e.g. fail())
+        db.rollback()
+        raise
+    return row
+
+
+def start_processing(db, job_id: str):
+    """queued -> processing. Returns the job row, or None if it should not run."""
+    return transition(db, job_id, PROCESSING)
+
+
+def finish(db, job_id: str, status: str = SUCCEEDED, usage: dict | None = None, billable: bool = True, **values):
+    """
+    processing -> succeeded / needs_review, storing result, meta, doc_type and usage.
+
+    billable=False records no usage at all (no ledger event, no rollups),
+    e.g. for reports built from documents billed when they were parsed.
+    """
+    if status not in (SUCCEEDED, NEEDS_REVIEW):
+        raise InvalidTransition(f"finish() cannot move a job to {status}")
+    usage = (usage or {"quantity": 1}) if billable else None
+    return transition(db, job_id, status, usage=usage, **values)
+
+
+def fail(db, job_id: str, **values):
+    """queued/processing -> failed."""
+    return transition(db, job_id, FAILED, **values)
@@ -1,4 +1,6 @@
+import asyncio
 import os, time, json
+from datetime import datetime, timedelta, timezone
 from fastapi import FastAPI, UploadFile, File, Header, HTTPException, status, Form, Query, Request
 from fastapi.exceptions import RequestValidationError
 from typing import List, Optional
@@ -50,10 +52,30 @@ from pathlib import Path
 
 from .security import verify_api_key
 from .storage import save_file_to_s3, get_object_key
-from .db import init_db, SessionLocal, get_job_by_id, create_job, create_batch, get_batch_by_id, get_jobs_by_batch, update_batch_stats, Job
-from sqlalchemy.sql import func, text
-from .schemas import JobResponse, UsageResponse, WebhookRegistration
-from .tasks import enqueue_parse
+from .result_store import hydrate_result, hydrate_meta
+from .db import init_db, SessionLocal, get_job_by_id
+from .db_async import (
+    create_job_async,
+    get_job_by_id_async,
+    list_jobs_for_tenant_async,
+    create_batch_async,
+    get_batch_by_id_async,
+    get_jobs_by_batch_async,
+    update_batch_stats_async,
+    update_job_fields_async,
+    mark_batch_completed_async,
+    reconciliations_for_job_async,
+)
+from sqlalchemy.sql import text
+from .schemas import JobResponse, UsageResponse, DailyUsageResponse, WebhookRegistration, FyReconRequest
+from .usage import get_daily_usage, get_monthly_usage
+from . import recon_store
+from .tasks import enqueue_parse, enqueue_parse_embedded, enqueue_fy_reconciliation, enqueue_fy_reconciliation_embedded
+from .tasks import create_embedded_queue
+from .embedded_queue import EmbeddedQueueFull
+from .billing.stripe_billing import get_usage_client
+from .billing.usage_flusher import USAGE_FLUSH_INTERVAL, flush_usage
+from .retention import RETENTION_INTERVAL, retention_configured, run_compactor
 from .exporters.tally_csv import invoice_to_tally_csv
 from .exporters.tally_xml import invoice_to_tally_xml
 from .exporters.registers import (
@@ -78,6 +100,7 @@ from .api_keys import router as api_keys_router
 
 # Import admin API key endpoints
 from .routers.admin_api_keys import router as admin_api_keys_router
+from .routers.admin_retention import router as admin_retention_router
 
 # ...
 # Initialize database (with error handling)
@@ -188,6 +211,9 @@ app.include_router(api_keys_router)
 # Include admin API key router (protected by ADMIN_TOKEN)
 app.include_router(admin_api_keys_router)
 
+# Include admin retention policy router (protected by ADMIN_TOKEN)
+app.include_router(admin_retention_router)
+
 # CORS origins - configurable via environment variable
 # Format: comma-separated list of origins, e.g., "http://localhost:3000,https://yourdomain.com"
 # Note: Including typo variant 'locahost' as temporary workaround for browser cache issues
@@ -215,7 +241,7 @@ q = None
 if redis_url:
     # Skip if it's a localhost URL (won't work in Railway without a Redis service)
     if redis_url.startswith("redis://localhost") or redis_url.startswith("redis://127.0.0.1"):
-        print(f"Warning: REDIS_URL points to localhost ({redis_url}), skipping Redis connection. Jobs will process synchronously.")
+        print(f"Warning: REDIS_URL points to localhost ({redis_url}), skipping Redis connection. Jobs will run on the embedded worker pool.")
     else:
         try:
             redis = Redis.from_url(redis_url, socket_connect_timeout=2, socket_timeout=2)
@@ -224,11 +250,72 @@ if redis_url:
             q = Queue("docparser-queue", connection=redis)
             print(f"✅ Redis connected: {redis_url}")
         except Exception as e:
-            print(f"⚠️  Warning: Redis connection failed ({e}). Jobs will process synchronously.")
+            print(f"⚠️  Warning: Redis connection failed ({e}). Jobs will run on the embedded worker pool.")
             redis = None
             q = None
 else:
-    print("ℹ️  REDIS_URL not set. Jobs will process synchronously (no background queue).")
+    print("ℹ️  REDIS_URL not set. Jobs will run on the embedded worker pool (no background queue).")
+
+# Embedded execution mode: without Redis, parse jobs run on a small bounded
+# process pool inside the API process instead of on the event loop.
+embedded_queue = None
+if q is None:
+    embedded_queue = create_embedded_queue()
+    print(f"ℹ️  Embedded worker pool: {embedded_queue.max_workers} workers, queue size {embedded_queue.max_pending}")
+
+@app.on_event("shutdown")
+def shutdown_embedded_queue():
+    if embedded_queue is not None:
+        embedded_queue.shutdown(wait=False)
+
+# Stripe usage: workers write a local ledger, this loop reports it in batches
+usage_flush_task = None
+
+@app.on_event("startup")
+async def start_usage_flusher():
+    global usage_flush_task
+    if USAGE_FLUSH_INTERVAL <= 0 or get_usage_client() is None:
+        return
+
+    async def _loop():
+        while True:
+            try:
+                await asyncio.to_thread(flush_usage)
+            except Exception as e:
+                logging.warning(f"Usage flush failed: {e}")
+            await asyncio.sleep(USAGE_FLUSH_INTERVAL)
+
+    usage_flush_task = asyncio.create_task(_loop())
+
+@app.on_event("shutdown")
+def stop_usage_flusher():
+    if usage_flush_task is not None:
+        usage_flush_task.cancel()
+
+# Retention: delete expired uploads and archive old payloads, rate limited
+retention_task = None
+
+@app.on_event("startup")
+async def start_retention_compactor():
+    global retention_task
+    if RETENTION_INTERVAL <= 0:
+        return
+
+    async def _loop():
+        while True:
+            try:
+                if await asyncio.to_thread(retention_configured):
+                    await asyncio.to_thread(run_compactor)
+            except Exception as e:
+                logging.warning(f"Retention pass failed: {e}")
+            await asyncio.sleep(RETENTION_INTERVAL)
+
+    retention_task = asyncio.create_task(_loop())
+
+@app.on_event("shutdown")
+def stop_retention_compactor():
+    if retention_task is not None:
+        retention_task.cancel()
 
 # Add API key authentication middleware (if enabled)
 # When enabled, this handles auth + rate limiting automatically
@@ -274,10 +361,12 @@ def _to_jsonable(x):
             return None
 
 # File type validation
-ALLOWED_EXTENSIONS = {"pdf", "json", "csv", "jpg", "jpeg", "png", "txt", "tiff"}
+ALLOWED_EXTENSIONS = {"pdf", "json", "csv", "tsv", "xlsx", "jpg", "jpeg", "png", "txt", "tiff", "tif"}
 ALLOWED_MIME_PREFIXES = {
     "application/pdf",
     "text/csv",
+    "text/tab-separated-values",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
     "application/json",
     "image/jpeg",
     "image/png",
@@ -303,7 +392,7 @@ def validate_upload_file(file: UploadFile) -> None:
             detail={
                 "error": "invalid_file_type",
                 "message": (
-                    "Unsupported file type. Allowed: PDF, JSON, CSV, JPG, PNG, TIFF, TXT."
+                    "Unsupported file type. Allowed: PDF, JSON, CSV, TSV, XLSX, JPG, PNG, TIFF, TXT."
                 ),
             },
         )
@@ -318,7 +407,7 @@ def validate_upload_file(file: UploadFile) -> None:
                 "error": "invalid_mime_type",
                 "message": (
                     f"Unsupported content type '{content_type}'. "
-                    "Allowed: PDF, JSON, CSV, JPEG, PNG, TIFF, TXT."
+                    "Allowed: PDF, JSON, CSV, TSV, XLSX, JPEG, PNG, TIFF, TXT."
                 ),
             },
         )
@@ -1188,17 +1277,24 @@ async def parse_endpoint(
         if use_hindi_flag:
             job_meta["use_hindi"] = True
 
-        with SessionLocal() as dbs:
-            job = create_job(dbs, object_key=object_key, filename=file.filename,
-                             tenant_id=tenant_id, api_key=api_key, meta=job_meta or None)
+        job = await create_job_async(object_key=object_key, filename=file.filename,
+                                     tenant_id=tenant_id, api_key=api_key, meta=job_meta or None)
         
-        # Enqueue job if Redis is available, otherwise process synchronously
+        # Enqueue job if Redis is available, otherwise use the embedded worker pool
         if q:
             enqueue_parse(q, job.id)
         else:
-            # If no Redis, process immediately (for development)
-            from .worker import parse_job_task
-            parse_job_task(job.id)
+            try:
+                enqueue_parse_embedded(embedded_queue, job.id)
+            except EmbeddedQueueFull:
+                await update_job_fields_async(job.id, status="failed", meta={**job_meta, "error": "queue_full"})
+                raise HTTPException(
+                    status_code=503,
+                    detail={
+                        "error": "queue_full",
+                        "message": "Too many documents are being processed right now. Please retry in a few seconds.",
+                    },
+                )
         
         return {
             "job_id": job.id,
@@ -1276,128 +1372,114 @@ async def list_jobs(
     """Get list of recent jobs for the authenticated tenant"""
     _, tenant_id = verify_api_key(authorization, x_api_key, request=request)
 
-    with SessionLocal() as dbs:
-        # For development: always include jobs with empty tenant_id
-        # This helps when jobs were created before tenant_id was properly set
-        from sqlalchemy import or_
-        query = dbs.query(Job)
-        
-        if tenant_id:
-            # Show jobs matching tenant_id OR jobs with empty tenant_id (for development)
-            query = query.filter(or_(Job.tenant_id == tenant_id, Job.tenant_id == "", Job.tenant_id.is_(None)))
-        else:
-            # If no tenant_id, show only jobs with empty tenant_id
-            query = query.filter(or_(Job.tenant_id == "", Job.tenant_id.is_(None)))
-        
-        jobs = (
-            query
-            .order_by(Job.created_at.desc())
-            .limit(limit)
-            .all()
-        )
-        
-        return [
-            {
-                "id": job.id,
-                "job_id": job.id,
-                "filename": job.filename or "Untitled",
-                "doc_type": job.doc_type or "unknown",
-                "status": job.status,
-                "created_at": job.created_at.isoformat() if job.created_at else None,
-            }
-            for job in jobs
-        ]
+    # For development, jobs with empty tenant_id are included (see db.tenant_filter)
+    jobs = await list_jobs_for_tenant_async(tenant_id, limit)
+
+    return [
+        {
+            "id": job.id,
+            "job_id": job.id,
+            "filename": job.filename or "Untitled",
+            "doc_type": job.doc_type or "unknown",
+            "status": job.status,
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+        }
+        for job in jobs
+    ]
 
 @app.get("/v1/jobs/{job_id}")
 async def get_job(job_id: str,
                   request: Request,
                   authorization: str | None = Header(None),
                   x_api_key: str | None = Header(None, alias="x-api-key"),
-                  format: str = "legacy"):
+                  format: str = "legacy",
+                  summary: bool = False):
     """
     Get job result.
     
     Query parameters:
     - format: "legacy" (default) or "canonical" - Return result in legacy or canonical JSON format
+    - summary: if true, return the stored summary of large (offloaded) results
+      instead of fetching the full payload from storage
     """
     # reuse your API key check (supports Authorization and X-API-Key)
     _, _tenant_id = verify_api_key(authorization, x_api_key, request=request)
 
-    with SessionLocal() as dbs:
+    try:
+        job = await get_job_by_id_async(job_id)
+    except Exception as e:
+        import logging
+        logging.error(f"Error fetching job {job_id}: {e}")
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "job_not_found",
+                "message": f"Job {job_id} not found: {str(e)}",
+            },
+        )
+    
+    if not job:
+        # Log for debugging
+        import logging
+        logging.warning(f"Job {job_id} not found in database (tenant_id={_tenant_id})")
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "job_not_found",
+                "message": f"Job {job_id} not found. It may have been deleted or the ID is incorrect.",
+            },
+        )
+
+    result = _to_jsonable(getattr(job, "result", None))
+    meta   = _to_jsonable(getattr(job, "meta", None)) or {}
+    if not summary:
+        result, meta = await asyncio.gather(
+            asyncio.to_thread(hydrate_result, result),
+            asyncio.to_thread(hydrate_meta, meta),
+        )
+    doc_type = getattr(job, "doc_type", None) or "invoice"
+
+    # Materialized reconciliations this job is a side of (also set when it finished first)
+    recons = await reconciliations_for_job_async(job.id)
+    if recons and isinstance(meta, dict):
+        if not summary:
+            recons = await asyncio.to_thread(lambda: {k: hydrate_result(v) for k, v in recons.items()})
+        meta = {**meta, "reconciliations": {**(meta.get("reconciliations") or {}), **recons}}
+
+    # Canonical format is stored with the job (computed at completion, upgraded lazily)
+    if format.lower() == "canonical" and result:
         try:
-            job = get_job_by_id(dbs, job_id)
-        except Exception as e:
-            import logging
-            logging.error(f"Error fetching job {job_id}: {e}")
-            raise HTTPException(
-                status_code=404,
-                detail={
-                    "error": "job_not_found",
-                    "message": f"Job {job_id} not found: {str(e)}",
-                },
-            )
-        
-        if not job:
-            # Log for debugging
+            from .canonical_store import load_canonical_async
             import logging
-            logging.warning(f"Job {job_id} not found in database (tenant_id={_tenant_id})")
-            raise HTTPException(
-                status_code=404,
-                detail={
-                    "error": "job_not_found",
-                    "message": f"Job {job_id} not found. It may have been deleted or the ID is incorrect.",
-                },
-            )
-
-        result = _to_jsonable(getattr(job, "result", None))
-        meta   = _to_jsonable(getattr(job, "meta", None)) or {}
-        doc_type = getattr(job, "doc_type", None) or "invoice"
 
-        # Convert to canonical format if requested
-        if format.lower() == "canonical" and result:
-            try:
-                from .parsers.canonical import normalize_to_canonical
-                import json
-                import logging
-                
-                # Parse result if it's a string
-                if isinstance(result, str):
-                    try:
-                        result = json.loads(result)
-                    except json.JSONDecodeError:
-                        pass
-                
-                # Convert to canonical
-                if isinstance(result, dict):
-                    logging.info(f"Converting job {job_id} to canonical format. doc_type={doc_type}, result keys={list(result.keys())[:5]}")
-                    canonical_result = normalize_to_canonical(doc_type, result)
-                    logging.info(f"Successfully converted job {job_id} to canonical format. schema_version={canonical_result.get('schema_version')}")
-                    return {
-                        "job_id": job.id,
-                        "status": job.status,
-                        "doc_type": doc_type,
-                        "filename": job.filename,
-                        "result": canonical_result,
-                        "meta": {**meta, "format": "canonical", "schema_version": "doc.v0.1"},
-                    }
-                else:
-                    logging.warning(f"Job {job_id} result is not a dict, cannot convert to canonical. Type: {type(result)}")
-            except Exception as e:
-                import logging
-                import traceback
-                logging.error(f"Failed to convert job {job_id} to canonical format: {e}")
-                logging.error(f"Traceback: {traceback.format_exc()}")
-                # Fall through to legacy format
+            canonical_result = await load_canonical_async(job, doc_type, summary=summary)
+            if isinstance(canonical_result, dict):
+                return {
+                    "job_id": job.id,
+                    "status": job.status,
+                    "doc_type": doc_type,
+                    "filename": job.filename,
+                    "result": canonical_result,
+                    "meta": {**meta, "format": "canonical", "schema_version": "doc.v0.1"},
+                }
+            else:
+                logging.warning(f"Job {job_id} result is not a dict, cannot convert to canonical. Type: {type(result)}")
+        except Exception as e:
+            import logging
+            import traceback
+            logging.error(f"Failed to convert job {job_id} to canonical format: {e}")
+            logging.error(f"Traceback: {traceback.format_exc()}")
+            # Fall through to legacy format
 
-        # Return legacy format (default)
-        return {
-            "job_id": job.id,
-            "status": job.status,
-            "doc_type": doc_type,
-            "filename": job.filename,
-            "result": job.result,
-            "meta": job.meta,
-        }
+    # Return legacy format (default)
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "doc_type": doc_type,
+        "filename": job.filename,
+        "result": result,
+        "meta": meta,
+    }
 
 @app.post("/v1/bulk-parse")
 async def bulk_parse_endpoint(
@@ -1424,73 +1506,70 @@ async def bulk_parse_endpoint(
         base_meta["requested_doc_type"] = doc_type_override
 
     # Create batch record
-    with SessionLocal() as db:
-        batch = create_batch(
-            db, 
-            tenant_id=tenant_id,
-            client_id=client_id,
-            batch_name=batch_name,
-            total_files=len(files)
-        )
-        
-        # Process files
-        job_ids = []
-        for file in files:
+    batch = await create_batch_async(
+        tenant_id=tenant_id,
+        client_id=client_id,
+        batch_name=batch_name,
+        total_files=len(files)
+    )
+
+    # Process files
+    job_ids = []
+    for file in files:
+        try:
+            # 1) File type validation
             try:
-                # 1) File type validation
-                try:
-                    validate_upload_file(file)
-                except HTTPException as e:
-                    # Log error but continue with other files
-                    update_batch_stats(db, batch.id, failed_files=1)
-                    continue
-                
-                # 2) File size validation
-                contents = await file.read()
-                mb = len(contents) / (1024 * 1024)
-                
-                if mb > MAX_FILE_MB:
-                    update_batch_stats(db, batch.id, failed_files=1)
-                    continue
-                
-                # Reset file pointer for later parsing (if needed)
-                from io import BytesIO
-                file.file = BytesIO(contents)
-                
-                # Save file to S3
-                object_key = get_object_key(file.filename)
-                save_file_to_s3(object_key, contents)
-                
-                # Create job linked to batch
-                job_meta = dict(base_meta)
-
-                job = create_job(
-                    db,
-                    object_key=object_key,
-                    filename=file.filename,
-                    tenant_id=tenant_id,
-                    api_key=api_key,
-                    meta=job_meta or None,
-                )
-                
-                # Update job with batch and client info
-                job.batch_id = batch.id
-                job.client_id = client_id
-                db.commit()
-                
-                job_ids.append(job.id)
-                
-                # Enqueue for processing
-                if q:
-                    enqueue_parse(q, job.id)
-                else:
-                    from .worker import parse_job_task
-                    parse_job_task(job.id)
-                
-            except Exception as e:
-                update_batch_stats(db, batch.id, failed_files=1)
+                validate_upload_file(file)
+            except HTTPException as e:
+                # Log error but continue with other files
+                await update_batch_stats_async(batch.id, failed_files=1)
                 continue
-    
+
+            # 2) File size validation
+            contents = await file.read()
+            mb = len(contents) / (1024 * 1024)
+
+            if mb > MAX_FILE_MB:
+                await update_batch_stats_async(batch.id, failed_files=1)
+                continue
+
+            # Reset file pointer for later parsing (if needed)
+            from io import BytesIO
+            file.file = BytesIO(contents)
+
+            # Save file to S3
+            object_key = get_object_key(file.filename)
+            save_file_to_s3(object_key, contents)
+
+            # Create job linked to batch and client
+            job_meta = dict(base_meta)
+
+            job = await create_job_async(
+                object_key=object_key,
+                filename=file.filename,
+                tenant_id=tenant_id,
+                api_key=api_key,
+                meta=job_meta or None,
+                batch_id=batch.id,
+                client_id=client_id,
+            )
+
+            job_ids.append(job.id)
+
+            # Enqueue for processing
+            if q:
+                enqueue_parse(q, job.id)
+            else:
+                try:
+                    enqueue_parse_embedded(embedded_queue, job.id)
+                except EmbeddedQueueFull:
+                    await update_job_fields_async(job.id, status="failed", meta={**job_meta, "error": "queue_full"})
+                    raise
+
+        except Exception as e:
+            await update_batch_stats_async(batch.id, failed_files=1)
+            continue
+
     return {
         "batch_id": batch.id,
         "total_files": len(files),
@@ -1506,54 +1585,72 @@ async def get_batch_status(
 ):
     """Get batch processing status and results"""
     api_key, tenant_id = verify_api_key(authorization, x_api_key)
-    
-    with SessionLocal() as db:
-        batch = get_batch_by_id(db, batch_id)
-        if not batch or batch.tenant_id != tenant_id:
-            raise HTTPException(status_code=404, detail="Batch not found")
-        
-        # Get all jobs in this batch
-        jobs = get_jobs_by_batch(db, batch_id)
-        
-        # Calculate progress
-        completed = sum(1 for job in jobs if job.status == "succeeded")
-        failed = sum(1 for job in jobs if job.status == "failed")
-        processing = sum(1 for job in jobs if job.status in ["queued", "processing"])
-        
-        # Update batch status
-        if completed + failed == len(jobs):
-            batch.status = "completed"
-            batch.completed_at = func.now()
-            db.commit()
-        
-        return {
-            "batch_id": batch.id,
-            "batch_name": batch.batch_name,
-            "client_id": batch.client_id,
-            "status": batch.status,
-            "progress": {
-                "total": len(jobs),
-                "completed": completed,
-                "failed": failed,
-                "processing": processing
-            },
-            "jobs": [
-                {
-                    "job_id": job.id,
-                    "filename": job.filename,
-                    "status": job.status,
-                    "doc_type": job.doc_type,
-                    "result": job.result
-                }
-                for job in jobs
-            ]
-        }
+
+    batch = await get_batch_by_id_async(batch_id)
+    if not batch or batch.tenant_id != tenant_id:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    # Get all jobs in this batch
+    jobs = await get_jobs_by_batch_async(batch_id)
+
+    # Calculate progress
+    completed = sum(1 for job in jobs if job.status == "succeeded")
+    failed = sum(1 for job in jobs if job.status == "failed")
+    processing = sum(1 for job in jobs if job.status in ["queued", "processing"])
+
+    # Update batch status
+    if completed + failed == len(jobs):
+        await mark_batch_completed_async(batch_id)
+        batch.status = "completed"
+
+    return {
+        "batch_id": batch.id,
+        "batch_name": batch.batch_name,
+        "client_id": batch.client_id,
+        "status": batch.status,
+        "progress": {
+            "total": len(jobs),
+            "completed": completed,
+            "failed": failed,
+            "processing": processing
+        },
+        "jobs": [
+            {
+                "job_id": job.id,
+                "filename": job.filename,
+                "status": job.status,
+                "doc_type": job.doc_type,
+                "result": job.result
+            }
+            for job in jobs
+        ]
+    }
 
 @app.get("/v1/usage", response_model=UsageResponse)
-def get_usage(authorization: str = Header(None)):
-    api_key = verify_api_key(authorization)
-    # TODO: aggregate from Jobs table by api_key and month
-    return {"month": time.strftime("%Y-%m"), "docs_parsed": 0, "ocr_pages": 0}
+def get_usage(
+    authorization: str | None = Header(None),
+    x_api_key: str | None = Header(None, alias="x-api-key"),
+    month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="YYYY-MM (default: current month, UTC)"),
+):
+    """Usage for the tenant's month, read from the usage_monthly rollup."""
+    _, tenant_id = verify_api_key(authorization, x_api_key)
+    month = month or datetime.now(timezone.utc).strftime("%Y-%m")
+    with SessionLocal() as dbs:
+        return get_monthly_usage(dbs, tenant_id, month)
+
+@app.get("/v1/usage/daily", response_model=DailyUsageResponse)
+def get_usage_daily(
+    authorization: str | None = Header(None),
+    x_api_key: str | None = Header(None, alias="x-api-key"),
+    days: int = Query(30, ge=1, le=366),
+):
+    """Per-day usage for the last `days` days (for dashboard charts), from the usage_daily rollup."""
+    _, tenant_id = verify_api_key(authorization, x_api_key)
+    end = datetime.now(timezone.utc).date()
+    start = end - timedelta(days=days - 1)
+    with SessionLocal() as dbs:
+        rows = get_daily_usage(dbs, tenant_id, start, end)
+    return {"start": start.isoformat(), "end": end.isoformat(), "days": rows}
 
 @app.post("/v1/webhooks")
 def register_webhook(body: WebhookRegistration, authorization: str = Header(None)):
@@ -1603,7 +1700,7 @@ def export_tally_csv(job_id: str, authorization: str = Header(None), x_api_key:
                         },
                     )
             
-            result = job.result
+            result = hydrate_result(job.result)
             if isinstance(result, str):
                 import json
                 try:
@@ -1755,7 +1852,7 @@ def export_tally_xml(job_id: str, authorization: str = Header(None), x_api_key:
                         },
                     )
             
-            result = job.result
+            result = hydrate_result(job.result)
             if isinstance(result, str):
                 import json
                 try:
@@ -1927,7 +2024,7 @@ def push_to_zoho(job_id: str, body: dict, authorization: str = Header(None)):
         if not job or job.status != "succeeded" or not job.result:
             raise HTTPException(status_code=404, detail="job not found or not succeeded")
         client = ZohoBooksClient(org_id=body.get("org_id"), access_token=body.get("access_token"))
-        payload = map_parsed_to_zoho_invoice(job.result)
+        payload = map_parsed_to_zoho_invoice(hydrate_result(job.result))
         code, resp = client.create_invoice(payload)
         return {"status_code": code, "response": resp, "payload": payload}
 
@@ -1960,7 +2057,7 @@ def export_parsed_json(
             raise HTTPException(status_code=404, detail="Job has no result data")
         
         # Ensure result is a dict (might be stored as JSON string)
-        result = _to_jsonable(job.result)
+        result = _to_jsonable(hydrate_result(job.result))
         if result is None:
             raise HTTPException(status_code=404, detail="Job result is empty")
         
@@ -2005,7 +2102,7 @@ def export_sales_register_csv(job_id: str, authorization: str = Header(None), x_
             or job.doc_type != "sales_register"
         ):
             raise HTTPException(status_code=400, detail="Not a sales_register job")
-        csv_data = sales_register_to_csv(job.result)
+        csv_data = sales_register_to_csv(hydrate_result(job.result))
         return JSONResponse(
             content={"filename": f"sales_{job_id}.csv", "content": csv_data}
         )
@@ -2023,7 +2120,7 @@ def export_purchase_register_csv(job_id: str, authorization: str = Header(None),
             or job.doc_type != "purchase_register"
         ):
             raise HTTPException(status_code=400, detail="Not a purchase_register job")
-        csv_data = purchase_register_to_csv(job.result)
+        csv_data = purchase_register_to_csv(hydrate_result(job.result))
         return JSONResponse(
             content={"filename": f"purchase_{job_id}.csv", "content": csv_data}
         )
@@ -2041,7 +2138,7 @@ def export_sales_register_zoho(job_id: str, authorization: str = Header(None), x
             or job.doc_type != "sales_register"
         ):
             raise HTTPException(status_code=400, detail="Not a sales_register job")
-        json_body = sales_register_to_zoho_json(job.result)
+        json_body = sales_register_to_zoho_json(hydrate_result(job.result))
         return JSONResponse(
             content={"filename": f"zoho_invoices_{job_id}.json", "content": json_body}
         )
@@ -2061,9 +2158,9 @@ def export_sales_register_canonical_csv(job_id: str, authorization: str = Header
         ):
             raise HTTPException(status_code=400, detail="Not a sales_register job")
         
-        # Convert to canonical format first
-        from .parsers.canonical import normalize_to_canonical
-        canonical = normalize_to_canonical("sales_register", job.result)
+        # Stored canonical form (computed at job completion)
+        from .canonical_store import load_canonical
+        canonical = load_canonical(dbs, job, "sales_register")
         
         # Export canonical to CSV
         csv_data = canonical_sales_register_to_csv(canonical)
@@ -2091,9 +2188,9 @@ def validate_document(
         if not job or job.status != "succeeded" or not job.result:
             raise HTTPException(status_code=404, detail="Job not found or not completed")
         
-        # Convert to canonical format first
-        from .parsers.canonical import normalize_to_canonical
-        canonical = normalize_to_canonical(job.doc_type or doc_type, job.result)
+        # Stored canonical form (computed at job completion)
+        from .canonical_store import load_canonical
+        canonical = load_canonical(dbs, job, job.doc_type or doc_type)
         
         # Validate based on doc_type
         issues = []
@@ -2138,7 +2235,7 @@ def reconcile_itc_endpoint(
     verify_api_key(authorization, x_api_key)
     
     from .recon.itc_2b_3b import reconcile_itc_2b_3b
-    from .parsers.canonical import normalize_to_canonical
+    from .canonical_store import load_canonical
     
     with SessionLocal() as dbs:
         # Load GSTR-2B job
@@ -2155,9 +2252,9 @@ def reconcile_itc_endpoint(
         if job3b.doc_type != "gstr3b":
             raise HTTPException(status_code=400, detail=f"job3b_id is not a gstr3b document (got: {job3b.doc_type})")
         
-        # Convert both to canonical format
-        canonical_2b = normalize_to_canonical("gstr2b", job2b.result)
-        canonical_3b = normalize_to_canonical("gstr3b", job3b.result)
+        # Stored canonical forms (computed at job completion)
+        canonical_2b = load_canonical(dbs, job2b, "gstr2b")
+        canonical_3b = load_canonical(dbs, job3b, "gstr3b")
         
         # Perform reconciliation
         result = reconcile_itc_2b_3b(canonical_2b, canonical_3b)
@@ -2171,6 +2268,95 @@ def reconcile_itc_endpoint(
         )
 
 
+@app.post("/v1/reconcile/fy", response_model=JobResponse)
+async def reconcile_fy_endpoint(
+    body: FyReconRequest,
+    request: Request,
+    authorization: str | None = Header(None, alias="Authorization"),
+    x_api_key: str | None = Header(None, alias="x-api-key"),
+):
+    """
+    Queue a financial-year reconciliation for one GSTIN.
+
+    All months of the FY are reconciled in one job (sales register vs GSTR-1,
+    purchase register vs GSTR-3B and GSTR-2B, GSTR-2B vs GSTR-3B) from the
+    tenant's already parsed documents. Poll GET /v1/jobs/{job_id} for the
+    consolidated report.
+    """
+    from .recon.fy_recon import fy_periods
+
+    api_key, tenant_id = verify_api_key(authorization, x_api_key, request=request)
+    gstin = (body.gstin or "").strip().upper()
+    if len(gstin) != 15:
+        raise HTTPException(status_code=400, detail={"error": "invalid_gstin", "message": "GSTIN must be 15 characters."})
+    try:
+        fy, _ = fy_periods(body.fy)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"error": "invalid_fy", "message": str(e)})
+
+    job_meta = {"job_type": "fy_reconciliation", "gstin": gstin, "fy": fy}
+    job = await create_job_async(object_key=None, filename=f"FY {fy} reconciliation {gstin}",
+                                 tenant_id=tenant_id, api_key=api_key, meta=job_meta)
+    if q:
+        enqueue_fy_reconciliation(q, job.id)
+    else:
+        try:
+            enqueue_fy_reconciliation_embedded(embedded_queue, job.id)
+        except EmbeddedQueueFull:
+            await update_job_fields_async(job.id, status="failed", meta={**job_meta, "error": "queue_full"})
+            raise HTTPException(
+                status_code=503,
+                detail={
+                    "error": "queue_full",
+                    "message": "Too many jobs are being processed right now. Please retry in a few seconds.",
+                },
+            )
+
+    return {
+        "job_id": job.id,
+        "status": "queued",
+        "doc_type": "fy_reconciliation",
+        "result": None,
+        "meta": job_meta,
+    }
+
+
+@app.get("/v1/reconciliations")
+def list_reconciliations_endpoint(
+    gstin: Optional[str] = Query(None),
+    period: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="YYYY-MM"),
+    recon_type: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+    authorization: str | None = Header(None),
+    x_api_key: str | None = Header(None, alias="x-api-key"),
+):
+    """Materialized reconciliations of the tenant (status and summary only), newest period first."""
+    _, tenant_id = verify_api_key(authorization, x_api_key)
+    with SessionLocal() as dbs:
+        rows = recon_store.list_reconciliations(dbs, tenant_id, gstin=gstin, period=period,
+                                                recon_type=recon_type, limit=limit)
+        return {"reconciliations": [recon_store.to_dict(row) for row in rows]}
+
+
+@app.get("/v1/reconciliations/{recon_type}")
+def get_reconciliation_endpoint(
+    recon_type: str,
+    gstin: str = Query(...),
+    period: str = Query(..., pattern=r"^\d{4}-\d{2}$", description="YYYY-MM"),
+    authorization: str | None = Header(None),
+    x_api_key: str | None = Header(None, alias="x-api-key"),
+):
+    """One materialized reconciliation with its full result (primary key lookup, nothing recomputed)."""
+    _, tenant_id = verify_api_key(authorization, x_api_key)
+    if recon_type not in recon_store.RECON_SIDES:
+        raise HTTPException(status_code=400, detail=f"Unknown recon_type. Use one of: {', '.join(recon_store.RECON_SIDES)}")
+    with SessionLocal() as dbs:
+        row = recon_store.get_reconciliation(dbs, tenant_id, recon_type, gstin, period)
+        if row is None:
+            raise HTTPException(status_code=404, detail="No reconciliation for this GSTIN and period")
+        return recon_store.to_dict(row, full=True)
+
+
 @app.get("/v1/export/reconciliation/missing-invoices/{job_id}")
 def export_missing_invoices(
     job_id: str,
@@ -2185,7 +2371,7 @@ def export_missing_invoices(
         if not job or job.status != "succeeded" or not job.meta:
             raise HTTPException(status_code=400, detail="Job not found or not completed")
         
-        reconciliations = job.meta.get("reconciliations", {})
+        reconciliations = recon_store.job_reconciliations(dbs, job)
         sales_recon = reconciliations.get("sales_vs_gstr1", {})
         
         if not sales_recon:
@@ -2225,7 +2411,7 @@ def export_value_mismatches(
         if not job or job.status != "succeeded" or not job.meta:
             raise HTTPException(status_code=400, detail="Job not found or not completed")
         
-        reconciliations = job.meta.get("reconciliations", {})
+        reconciliations = recon_store.job_reconciliations(dbs, job)
         sales_recon = reconciliations.get("sales_vs_gstr1", {})
         
         if not sales_recon:
@@ -2254,7 +2440,7 @@ def export_itc_summary(
         if not job or job.status != "succeeded" or not job.meta:
             raise HTTPException(status_code=400, detail="Job not found or not completed")
         
-        reconciliations = job.meta.get("reconciliations", {})
+        reconciliations = recon_store.job_reconciliations(dbs, job)
         itc_recon = reconciliations.get("purchase_vs_gstr3b_itc", {})
         
         if not itc_recon:
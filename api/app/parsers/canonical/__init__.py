@@ -23,6 +23,11 @@ from .gstr2b_normalizer import normalize_gstr2b_to_canonical
 from .gstr1_normalizer import normalize_gstr1_to_canonical
 from .bank_statement_normalizer import normalize_bank_statement_to_canonical
 
+CANONICAL_SCHEMA_VERSION = "doc.v0.1"
+# Bump whenever a normalizer's output changes: canonical documents stored with
+# an older version are rebuilt from the job result on next read (canonical_store.py)
+NORMALIZER_VERSION = 1
+
 
 def normalize_to_canonical(doc_type: str, parsed_data: dict) -> dict:
     """
@@ -1,95 +1,232 @@
 # api/app/parsers/common.py
+import functools
 import io
+import os
 import re
-from typing import List, Tuple
+import threading
+from typing import Dict, List, Tuple
 
-from pdfminer.high_level import extract_text as _pdf_extract
 try:
     import pdfplumber
 except Exception:
     pdfplumber = None
 try:
-    from pdf2image import convert_from_bytes
+    from pdf2image import convert_from_bytes, pdfinfo_from_bytes
 except Exception:
     convert_from_bytes = None
+    pdfinfo_from_bytes = None
+try:
+    from .spreadsheet import is_xlsx, xlsx_to_text
+except Exception:
+    is_xlsx = None
+    xlsx_to_text = None
 try:
     from PIL import Image
     import pytesseract
 except Exception:
     Image = None
     pytesseract = None
+from .pdf_backend import extract_pdf
+from .ocr import AUTO_LANG, DEFAULT_LANG, OCR_RESOLUTION, image_source, ocr_pages
+from .ocr import ocr_page  # noqa: F401  (re-exported, ocr_page used to live here)
 
-def extract_text_safely(data: bytes, filename: str | None = None) -> Tuple[str, bool]:
-    """Return (text, ocr_used). Handles .txt/.csv, PDFs, images."""
-    # 1) Plain text files: decode
-    if filename and filename.lower().endswith((".txt", ".md", ".csv", ".log")):
-        return data.decode("utf-8", errors="ignore"), False
+IMAGE_MAGIC = (b"\x89PNG", b"\xff\xd8\xff", b"II*\x00", b"MM\x00*", b"GIF8", b"BM")
+# Pages whose text layer has fewer non-space characters than this are OCR'd
+MIN_PAGE_TEXT_CHARS = int(os.getenv("MIN_PAGE_TEXT_CHARS", "25"))
 
-    is_pdf = data[:4] == b"%PDF"
-    if is_pdf:
-        buffer = io.BytesIO(data)
+
+def _is_image(data: bytes) -> bool:
+    return data.startswith(IMAGE_MAGIC) or (data[:4] == b"RIFF" and data[8:12] == b"WEBP")
+
+
+def page_text_usable(text: str) -> bool:
+    """Whether a page's text layer is worth keeping over OCR: enough characters, mostly real glyphs."""
+    compact = "".join((text or "").split())
+    if len(compact) < MIN_PAGE_TEXT_CHARS:
+        return False
+    # Fonts without a ToUnicode map come out as "(cid:123)" or replacement characters
+    garbage = compact.count("(cid:") * 8 + compact.count("\ufffd")
+    return garbage < 0.3 * len(compact)
+
+
+def _pdf_page_texts(data: bytes) -> Tuple[str, List[str]]:
+    """(text, per-page texts) of a PDF's text layer, from the shared single parse (pdf_backend)."""
+    try:
+        extraction = extract_pdf(data)
+    except Exception:
+        return "", []
+    return extraction.text, [page.text for page in extraction.pages]
+
+
+def _render_page(pdf, data: bytes, index: int, resolution: int):
+    if pdf is not None:
         try:
-            txt = _pdf_extract(buffer) or ""
+            page = pdf.pages[index]
+            page_image = page.to_image(resolution=resolution)
+            pil_img = getattr(page_image, "original", None) or getattr(page_image, "image", None)
+            if pil_img is None and hasattr(page_image, "pil_image"):
+                pil_img = page_image.pil_image
+            page.close()
+            if pil_img is not None:
+                return pil_img
         except Exception:
-            txt = ""
+            pass
+    if convert_from_bytes:
+        try:
+            images = convert_from_bytes(data, dpi=resolution, first_page=index + 1, last_page=index + 1)
+            return images[0] if images else None
+        except Exception:
+            pass
+    return None
 
-        if txt.strip():
-            return txt, False
 
-        # pdfminer found nothing – try pdfplumber
+class PdfPageRenderer:
+    """
+    Renders the pages of one PDF on demand at any DPI (pdfplumber, else pdf2image).
+
+    page(i) is an ocr.PageSource. Renders are serialized because the PDF
+    handle isn't thread-safe; OCR of the rendered pages still runs in parallel.
+    """
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self._lock = threading.Lock()
+        self._pdf = None
         if pdfplumber is not None:
             try:
-                buffer.seek(0)
-                with pdfplumber.open(buffer) as pdf:
-                    pages = [page.extract_text() or "" for page in pdf.pages]
-                txt = "\n".join(pages).strip()
-                if txt:
-                    return txt, False
+                self._pdf = pdfplumber.open(io.BytesIO(data))
             except Exception:
-                pass
+                self._pdf = None
 
-        # As a last resort, run OCR per page using pdfplumber rendering
-        if pdfplumber is not None and Image and pytesseract:
-            try:
-                buffer.seek(0)
-                with pdfplumber.open(buffer) as pdf:
-                    texts: list[str] = []
-                    for page in pdf.pages:
-                        try:
-                            page_image = page.to_image(resolution=200)
-                            pil_img = getattr(page_image, "original", None) or getattr(page_image, "image", None)
-                            if pil_img is None and hasattr(page_image, "pil_image"):
-                                pil_img = page_image.pil_image
-                            if pil_img is None:
-                                continue
-                            t = ocr_page(pil_img)
-                            if t.strip():
-                                texts.append(t)
-                        except Exception:
-                            continue
-                full = "\n".join(texts).strip()
-                if full:
-                    return full, True
-            except Exception:
-                pass
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
-        # Fallback to pdf2image OCR if available
-        if convert_from_bytes and Image and pytesseract:
+    def close(self) -> None:
+        if self._pdf is not None:
+            self._pdf.close()
+            self._pdf = None
+
+    def page_count(self) -> int:
+        if self._pdf is not None:
+            return len(self._pdf.pages)
+        if pdfinfo_from_bytes:
             try:
-                images = convert_from_bytes(data, dpi=200)
-                texts = []
-                for img in images:
-                    t = ocr_page(img)
-                    if t.strip():
-                        texts.append(t)
-                full = "\n".join(texts).strip()
-                if full:
-                    return full, True
+                return int(pdfinfo_from_bytes(self.data).get("Pages") or 0)
             except Exception:
                 pass
+        return 0
+
+    def render(self, index: int, dpi: int = OCR_RESOLUTION):
+        with self._lock:
+            return _render_page(self._pdf, self.data, index, dpi)
+
+    def page(self, index: int):
+        return functools.partial(self.render, index)
+
+
+class ImageFrameRenderer:
+    """
+    The frames of a (multi-frame) image upload, e.g. a multi-page TIFF, as page sources.
+
+    Frames are decoded one at a time when the page pool asks for them, not
+    up front; seeking is serialized because the file handle is shared.
+    """
+
+    def __init__(self, data: bytes):
+        self._lock = threading.Lock()
+        self._img = Image.open(io.BytesIO(data))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self._img.close()
+
+    def frame_count(self) -> int:
+        return getattr(self._img, "n_frames", 1)
+
+    def render(self, index: int, dpi: int = OCR_RESOLUTION):
+        with self._lock:
+            self._img.seek(index)
+            frame = self._img.copy()
+        return image_source(frame)(dpi)
+
+    def page(self, index: int):
+        return functools.partial(self.render, index)
+
+
+def _extract_image(data: bytes, lang: str, info: dict | None) -> Tuple[str, bool]:
+    """OCR every frame of an image upload on the page pool."""
+    with ImageFrameRenderer(data) as frames:
+        count = frames.frame_count()
+        texts = ocr_pages([frames.page(i) for i in range(count)], lang, info)
+    if info is not None:
+        info["pages"] = count
+        info["ocr_pages"] = count
+        info["page_text_source"] = {str(i + 1): "ocr" if t.strip() else "empty" for i, t in enumerate(texts)}
+    text = "\n\f".join(t.strip("\n") for t in texts).strip()
+    return text, bool(text)
+
+
+def _extract_pdf(data: bytes, lang: str, info: dict | None) -> Tuple[str, bool]:
+    """
+    Text layer where a page has a usable one, OCR for the other pages only.
+
+    Pages without a usable text layer are rendered and OCR'd in parallel;
+    `info` gets pages, ocr_pages and a per-page page_text_source map.
+    """
+    txt, pages = _pdf_page_texts(data)
+    todo = [i for i, page in enumerate(pages) if not page_text_usable(page)]
+    ocr_texts: Dict[int, str] = {}
+    run_ocr = bool(todo or not pages) and bool(Image and pytesseract)
+    if run_ocr:
+        with PdfPageRenderer(data) as renderer:
+            if not pages:
+                # No text layer could be read at all: OCR whatever renders
+                pages = [""] * renderer.page_count()
+                todo = list(range(len(pages)))
+            texts = ocr_pages([renderer.page(i) for i in todo], lang, info)
+        ocr_texts = {i: t for i, t in zip(todo, texts) if t.strip()}
+
+    sources = {}
+    for i, page in enumerate(pages):
+        sources[str(i + 1)] = "ocr" if i in ocr_texts else ("pdf_text" if page.strip() else "empty")
+    if info is not None:
+        info["pages"] = max(len(pages), 1)
+        info["ocr_pages"] = len(todo) if run_ocr else 0
+        info["page_text_source"] = sources
+        if ocr_texts and len(ocr_texts) < len(pages):
+            info["text_source"] = "hybrid"
+
+    if not ocr_texts:
+        return (txt if txt.strip() else ""), False
+    merged = [ocr_texts.get(i, page) for i, page in enumerate(pages)]
+    return "\n\f".join(t.strip("\n") for t in merged).strip(), True
+
+
+def _extract(data: bytes, filename: str | None, lang: str, info: dict | None) -> Tuple[str, bool]:
+    # 1) Plain text files: decode
+    if filename and filename.lower().endswith((".txt", ".md", ".csv", ".tsv", ".log")):
+        return data.decode("utf-8", errors="ignore"), False
+    if is_xlsx and is_xlsx(data, filename):
+        try:
+            return xlsx_to_text(data), False
+        except Exception:
+            return "", False
+
+    # 2) PDFs: text layer per page, OCR only where it is missing
+    is_pdf = data[:4] == b"%PDF"
+    if is_pdf:
+        return _extract_pdf(data, lang, info)
 
     # 3) Try generic UTF-8 decode (some uploads are text with no extension)
-    if not is_pdf:  # raw PDF bytes aren't useful as UTF-8
+    if not _is_image(data):  # raw image bytes aren't useful as UTF-8
         try:
             t = data.decode("utf-8", errors="ignore")
             if t.strip():
@@ -97,12 +234,11 @@ def extract_text_safely(data: bytes, filename: str | None = None) -> Tuple[str,
         except Exception:
             pass
 
-    # 4) Last resort: OCR (images)
+    # 4) Last resort: OCR (images, every frame of multi-page TIFFs)
     if Image and pytesseract:
         try:
-            img = Image.open(io.BytesIO(data))
-            t2 = ocr_page(img)
-            if t2.strip():
+            t2, ocr_used = _extract_image(data, lang, info)
+            if ocr_used:
                 return t2, True
         except Exception:
             pass
@@ -110,101 +246,20 @@ def extract_text_safely(data: bytes, filename: str | None = None) -> Tuple[str,
     return "", False
 
 
-def ocr_page(img, lang: str = "eng") -> str:
-    """
-    Perform OCR on an image.
-    
-    Args:
-        img: PIL Image object
-        lang: Language code(s) for OCR. Use "hin+eng" for Hindi+English mixed documents.
-              Options: "eng", "hin", "hin+eng" (default: "eng")
-    
-    Returns:
-        Extracted text string
-    """
-    if not pytesseract:
-        return ""
-    
-    # Try the requested language, fallback to English if it fails
-    try:
-        return pytesseract.image_to_string(img, lang=lang, config="--psm 6") or ""
-    except Exception:
-        # If Hindi language pack not installed, fallback to English
-        if lang != "eng":
-            try:
-                return pytesseract.image_to_string(img, lang="eng", config="--psm 6") or ""
-            except Exception:
-                return ""
-        return ""
+def extract_text_safely(data: bytes, filename: str | None = None, info: dict | None = None) -> Tuple[str, bool]:
+    """Return (text, ocr_used). Handles .txt/.csv, .xlsx, PDFs, images."""
+    return _extract(data, filename, DEFAULT_LANG, info)
 
 
-def extract_text_safely_hindi(data: bytes, filename: str | None = None) -> Tuple[str, bool]:
+def extract_text_safely_hindi(data: bytes, filename: str | None = None, info: dict | None = None) -> Tuple[str, bool]:
     """
-    Extract text with Hindi OCR support. Tries Hindi+English OCR if English-only fails.
-    Returns (text, ocr_used).
+    Extract text with Hindi OCR support. Returns (text, ocr_used).
+
+    Pages that need OCR are OCR'd once, in the language picked from a sampled
+    page (ocr.choose_ocr_lang): `hin+eng` for Devanagari or undetermined
+    script, `eng` for Latin. The decision is added to `info` if given.
     """
-    # First try English extraction
-    text, ocr_used = extract_text_safely(data, filename)
-    
-    # If we got text, return it
-    if text.strip():
-        return text, ocr_used
-    
-    # If no text and we haven't tried OCR yet, try Hindi+English OCR
-    if not ocr_used and Image and pytesseract:
-        is_pdf = data[:4] == b"%PDF"
-        
-        if is_pdf:
-            # Try Hindi OCR on PDF
-            if pdfplumber is not None:
-                try:
-                    buffer = io.BytesIO(data)
-                    with pdfplumber.open(buffer) as pdf:
-                        texts: list[str] = []
-                        for page in pdf.pages:
-                            try:
-                                page_image = page.to_image(resolution=200)
-                                pil_img = getattr(page_image, "original", None) or getattr(page_image, "image", None)
-                                if pil_img is None and hasattr(page_image, "pil_image"):
-                                    pil_img = page_image.pil_image
-                                if pil_img is None:
-                                    continue
-                                t = ocr_page(pil_img, lang="hin+eng")
-                                if t.strip():
-                                    texts.append(t)
-                            except Exception:
-                                continue
-                        full = "\n".join(texts).strip()
-                        if full:
-                            return full, True
-                except Exception:
-                    pass
-            
-            # Fallback to pdf2image with Hindi OCR
-            if convert_from_bytes and Image and pytesseract:
-                try:
-                    images = convert_from_bytes(data, dpi=200)
-                    texts = []
-                    for img in images:
-                        t = ocr_page(img, lang="hin+eng")
-                        if t.strip():
-                            texts.append(t)
-                    full = "\n".join(texts).strip()
-                    if full:
-                        return full, True
-                except Exception:
-                    pass
-        else:
-            # Try Hindi OCR on images
-            try:
-                img = Image.open(io.BytesIO(data))
-                t = ocr_page(img, lang="hin+eng")
-                if t.strip():
-                    return t, True
-            except Exception:
-                pass
-    
-    return text, ocr_used
+    return _extract(data, filename, AUTO_LANG, info)
 
 
 _NUMERIC_TOKEN = re.compile(r"\b[0-9OIl]{2,}(?:[./][0-9OIl]{2,})?\b")
@@ -229,19 +284,8 @@ def normalize_text(s: str | None) -> str:
 
 
 def extract_text_with_layout(data: bytes) -> str:
-    if pdfplumber is None:
-        return ""
-    buffer = io.BytesIO(data)
-    texts: List[str] = []
+    """Layout-preserving text of a PDF; reuses the parse extract_text_safely already did."""
     try:
-        with pdfplumber.open(buffer) as pdf:
-            for page in pdf.pages:
-                try:
-                    txt = page.extract_text(layout=True) or page.extract_text() or ""
-                except Exception:
-                    txt = ""
-                if txt:
-                    texts.append(txt)
+        return extract_pdf(data).layout_text
     except Exception:
         return ""
-    return "\n".join(texts)
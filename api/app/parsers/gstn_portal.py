@@ -0,0 +1,262 @@
+"""
+Incremental parser for GSTR-2B / GSTR-1 JSON downloaded from the GSTN portal.
+
+Portal downloads carry the raw return structure rather than our parsed
+shape, e.g. for GSTR-2B:
+
+    {"chksum": "...", "data": {"gstin": "...", "rtnprd": "112025",
+        "docdata": {"b2b": [{"ctin": "...", "trdnm": "...",
+            "inv": [{"inum": "...", "dt": "05-11-2025", "val": 118000,
+                     "txval": 100000, "igst": 0, "cgst": 9000, ...}]}]}}}
+
+and for GSTR-1 {"gstin", "fp", "b2b": [{"ctin", "inv": [{"inum", "idt",
+"itms": [{"itm_det": {"txval", "iamt", "camt", "samt", "csamt"}}]}]}]}.
+
+For large taxpayers these files are tens of MB, so the document is read
+with ijson (when installed) and each supplier/recipient block under `b2b`
+is materialized on its own, flattened into invoice rows and dropped; peak
+memory is one block plus the output rows. Without ijson the file is loaded
+with json and walked the same way.
+
+GSTR-2B output matches what normalize_gstr2b_to_canonical expects (`b2b`
+rows with supplier_gstin, invoice_value, itc_availability, ...); GSTR-1
+output matches normalize_gstr1 (`b2b_invoices` with counterparty_gstin).
+"""
+
+from __future__ import annotations
+
+import io
+import json
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import ijson
+    from ijson.common import ObjectBuilder
+except ImportError:  # optional, falls back to json.loads
+    ijson = None
+    ObjectBuilder = None
+
+from .gstr1 import MONTHS
+
+PORTAL_KINDS = ("gstr2b", "gstr1")
+SNIFF_BYTES = 4096
+# b2b may sit at the top level (GSTR-1) or under docdata, optionally wrapped in "data" (GSTR-2B)
+B2B_PREFIXES = ("b2b.item", "docdata.b2b.item", "data.docdata.b2b.item")
+SECTION_PARENTS = ("", "docdata", "data.docdata")
+HEADER_FIELDS = ("gstin", "rtnprd", "fp", "trdnm", "lgnm", "gendt", "version")
+
+ITC_AVAILABILITY = {"Y": "available", "N": "not_available", "T": "temporarily_unavailable"}
+INVOICE_TYPES = {"R": "REGULAR", "SEWP": "SEZ", "SEWOP": "SEZ", "DE": "DEEMED", "CBW": "REGULAR"}
+
+
+def sniff_portal_kind(head: bytes, filename: str = "", forced_route: Optional[str] = None) -> Optional[str]:
+    """Guess the return type of a portal JSON from its first bytes, or None if it isn't one."""
+    if b'"doc_type"' in head:
+        return None  # already in our parsed shape
+    if b'"b2b"' not in head and b'"docdata"' not in head and b'"ctin"' not in head:
+        return None
+    if forced_route in PORTAL_KINDS:
+        return forced_route
+    if b'"docdata"' in head or b'"rtnprd"' in head or b'"itcsumm"' in head:
+        return "gstr2b"
+    if b'"fp"' in head:
+        return "gstr1"
+    fn = (filename or "").lower()
+    if "2b" in fn:
+        return "gstr2b"
+    if "gstr1" in fn or "gstr-1" in fn or "gstr_1" in fn:
+        return "gstr1"
+    return None
+
+
+def _iter_stream(data: bytes, header: Dict[str, Any], sections: set) -> Iterator[Dict[str, Any]]:
+    """Yield b2b blocks one at a time from an ijson event stream."""
+    builder = None
+    block_prefix = None
+    for prefix, event, value in ijson.parse(io.BytesIO(data), use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == block_prefix and event == "end_map":
+                yield builder.value
+                builder = None
+            continue
+        if event == "start_map" and prefix in B2B_PREFIXES:
+            builder = ObjectBuilder()
+            builder.event(event, value)
+            block_prefix = prefix
+        elif event == "start_array":
+            parent, _, name = prefix.rpartition(".")
+            if parent in SECTION_PARENTS and name != "b2b":
+                sections.add(name)
+        elif event in ("string", "number") and prefix.count(".") <= 1:
+            name = prefix.rpartition(".")[2]
+            if name in HEADER_FIELDS:
+                header.setdefault(name, value)
+
+
+def _iter_loaded(data: bytes, header: Dict[str, Any], sections: set) -> Iterator[Dict[str, Any]]:
+    doc = json.loads(data.decode("utf-8-sig"))
+    root = doc.get("data") if isinstance(doc.get("data"), dict) else doc
+    header.update({k: root[k] for k in HEADER_FIELDS if k in root and not isinstance(root[k], (dict, list))})
+    section_root = root.get("docdata") if isinstance(root.get("docdata"), dict) else root
+    sections.update(k for k, v in section_root.items() if isinstance(v, list) and k != "b2b")
+    for block in section_root.get("b2b") or []:
+        if isinstance(block, dict):
+            yield block
+
+
+def _num(value) -> float:
+    try:
+        return round(float(value or 0), 2)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _iso_date(value) -> Optional[str]:
+    if not value or not isinstance(value, str):
+        return None
+    parts = value.split("-")
+    if len(parts) == 3 and len(parts[2]) == 4:
+        return f"{parts[2]}-{parts[1]}-{parts[0]}"
+    return value
+
+
+def _period(value) -> Dict[str, Any]:
+    """'112025' -> {'month': 11, 'year': 2025, 'label': 'November 2025'}"""
+    value = str(value or "")
+    if len(value) != 6 or not value.isdigit():
+        return {"month": None, "year": None, "label": None}
+    month, year = int(value[:2]), int(value[2:])
+    if not 1 <= month <= 12:
+        return {"month": None, "year": None, "label": None}
+    return {"month": month, "year": year, "label": f"{list(MONTHS.keys())[month - 1].title()} {year}"}
+
+
+def _tax_totals(inv: Dict[str, Any]) -> Tuple[float, float, float, float, float]:
+    """(taxable, igst, cgst, sgst, cess) from invoice-level fields or summed item details."""
+    if "txval" in inv:
+        return _num(inv.get("txval")), _num(inv.get("igst")), _num(inv.get("cgst")), _num(inv.get("sgst")), _num(inv.get("cess"))
+    totals = [0.0] * 5
+    for item in inv.get("itms") or inv.get("items") or []:
+        det = item.get("itm_det") or item
+        totals[0] += _num(det.get("txval"))
+        totals[1] += _num(det.get("iamt", det.get("igst")))
+        totals[2] += _num(det.get("camt", det.get("cgst")))
+        totals[3] += _num(det.get("samt", det.get("sgst")))
+        totals[4] += _num(det.get("csamt", det.get("cess")))
+    return tuple(round(t, 2) for t in totals)
+
+
+def _gstr2b_rows(block: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    for inv in block.get("inv") or []:
+        taxable, igst, cgst, sgst, cess = _tax_totals(inv)
+        yield {
+            "supplier_gstin": block.get("ctin"),
+            "supplier_name": block.get("trdnm"),
+            "supplier_period": block.get("supprd"),
+            "invoice_number": inv.get("inum"),
+            "invoice_date": _iso_date(inv.get("dt")),
+            "place_of_supply": inv.get("pos"),
+            "invoice_type": INVOICE_TYPES.get(inv.get("typ"), inv.get("typ") or "REGULAR"),
+            "reverse_charge": inv.get("rev") == "Y",
+            "invoice_value": _num(inv.get("val")),
+            "taxable_value": taxable,
+            "igst": igst,
+            "cgst": cgst,
+            "sgst": sgst,
+            "cess": cess,
+            "itc_availability": ITC_AVAILABILITY.get(inv.get("itcavl"), inv.get("itcavl")),
+            "reason": inv.get("rsn") or None,
+        }
+
+
+def _gstr1_rows(block: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    for inv in block.get("inv") or []:
+        taxable, igst, cgst, sgst, cess = _tax_totals(inv)
+        yield {
+            "invoice_number": inv.get("inum"),
+            "invoice_date": _iso_date(inv.get("idt")),
+            "counterparty_gstin": block.get("ctin"),
+            "place_of_supply": inv.get("pos"),
+            "reverse_charge": inv.get("rchrg") == "Y",
+            "invoice_type": INVOICE_TYPES.get(inv.get("inv_typ"), inv.get("inv_typ") or "REGULAR"),
+            "invoice_value": _num(inv.get("val")),
+            "taxable_value": taxable,
+            "igst": igst,
+            "cgst": cgst,
+            "sgst": sgst,
+            "cess": cess,
+        }
+
+
+def parse_portal_json(data: bytes, kind: str) -> Dict[str, Any]:
+    """Parse a GSTN portal GSTR-2B / GSTR-1 download into our parsed result shape."""
+    header: Dict[str, Any] = {}
+    sections: set = set()
+    blocks = _iter_stream(data, header, sections) if ijson is not None else _iter_loaded(data, header, sections)
+    to_rows = _gstr2b_rows if kind == "gstr2b" else _gstr1_rows
+
+    rows: List[Dict[str, Any]] = []
+    totals = {"total_taxable_value": 0.0, "total_igst": 0.0, "total_cgst": 0.0, "total_sgst": 0.0, "total_cess": 0.0}
+    suppliers = 0
+    for block in blocks:
+        suppliers += 1
+        for row in to_rows(block):
+            totals["total_taxable_value"] += row["taxable_value"]
+            totals["total_igst"] += row["igst"]
+            totals["total_cgst"] += row["cgst"]
+            totals["total_sgst"] += row["sgst"]
+            totals["total_cess"] += row["cess"]
+            rows.append(row)
+
+    warnings: List[str] = []
+    if not rows:
+        warnings.append("b2b_invoices_not_parsed")
+    if not header.get("gstin"):
+        warnings.append("gstin_missing")
+    warnings.extend(f"section_not_parsed: {name}" for name in sorted(sections))
+
+    meta = {
+        "parser_version": f"{kind}_portal_v1",
+        "source_format": "gstn_portal_json",
+        "counterparties": suppliers,
+        "streamed": ijson is not None,
+    }
+    period = _period(header.get("rtnprd") or header.get("fp"))
+    if kind == "gstr2b":
+        return {
+            "doc_type": "gstr2b",
+            "gstin": header.get("gstin"),
+            "legal_name": header.get("lgnm"),
+            "trade_name": header.get("trdnm"),
+            "period": period,
+            "summary": {k: round(v, 2) for k, v in totals.items()},
+            "b2b": rows,
+            "warnings": warnings,
+            "meta": {**meta, "generated_on": header.get("gendt")},
+        }
+    return {
+        "doc_type": "gstr1",
+        "gstin": header.get("gstin"),
+        "legal_name": header.get("lgnm"),
+        "trade_name": header.get("trdnm"),
+        "period": period,
+        "b2b_invoices": rows,
+        "b2c_large": [],
+        "credit_debit_notes": [],
+        "hsn_summary": [],
+        "warnings": warnings,
+        "meta": meta,
+    }
+
+
+def try_parse_portal_json(filename: str, data: bytes, forced_route: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Parse `data` if it is a portal GSTR-2B/GSTR-1 download, else return None."""
+    if not (filename or "").lower().endswith(".json"):
+        return None
+    if forced_route and forced_route not in PORTAL_KINDS:
+        return None
+    kind = sniff_portal_kind(data[:SNIFF_BYTES], filename, forced_route)
+    if kind is None:
+        return None
+    return parse_portal_json(data, kind)
@@ -25,10 +25,11 @@ def parse_bytes_to_result(filename: str, data: bytes, use_hindi: bool = False):
 
     text = ""
     ocr_used = False
+    extraction = {}
 
     # Use Hindi-aware text extraction if requested
     if use_hindi:
-        text, ocr_used = extract_text_safely_hindi(data, filename)
+        text, ocr_used = extract_text_safely_hindi(data, filename, info=extraction)
     else:
         # 1) Try pdfminer text first
         try:
@@ -57,6 +58,7 @@ def parse_bytes_to_result(filename: str, data: bytes, use_hindi: bool = False):
             "ocr_used": ocr_used,
             "processing_ms": dt,
             "detected_doc_type": doc_type,
+            **extraction,
         }
         result = {
             "invoice_number": None,
@@ -83,6 +85,7 @@ def parse_bytes_to_result(filename: str, data: bytes, use_hindi: bool = False):
         "ocr_used": ocr_used,
         "processing_ms": dt,
         "detected_doc_type": "invoice",
+        **extraction,
     }
     return result, meta
     
@@ -0,0 +1,498 @@
+# api/app/parsers/ocr.py
+"""
+Page OCR, the page pool (map_pages) and OCR language selection.
+
+The Hindi extraction path used to run the full English pipeline first
+(English OCR of every page) and, only when that came back empty, render and
+OCR every page again with `hin+eng`. choose_ocr_lang() instead looks at one
+sampled page and picks the language pack once per document:
+
+1. Tesseract OSD (`image_to_osd`) when osd.traineddata is installed, which
+   also reports the page orientation;
+2. otherwise a Devanagari glyph heuristic: Devanagari words hang from a
+   continuous headline (shirorekha), so a text line's horizontal ink
+   profile has one dominant row in its upper half whose ink runs span whole
+   words. Latin text has no such row.
+
+The decision (script, confidence, source, rotation) is returned so callers
+can record it in the job meta.
+
+Tesseract is run through ocr_engine (a pooled in-process binding when
+installed, pytesseract otherwise). Every page is preprocessed (grayscale,
+binarize, deskew, crop, blank page skip; ocr_preprocess) before tesseract
+sees it, and pages seen before are answered from ocr_cache. ocr_pages()
+reports the engine, the time spent per stage and the cache hits in
+info["ocr_engine"] / info["ocr_stage_ms"] / info["ocr_cache_hits"].
+"""
+import functools
+import itertools
+import logging
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+try:
+    import pytesseract
+except Exception:
+    pytesseract = None
+
+from . import ocr_preprocess
+from .ocr_cache import get_cache, page_key
+from .ocr_engine import get_engine
+from .ocr_preprocess import PagePreprocessor
+
+logger = logging.getLogger(__name__)
+
+# Pages OCR'd concurrently per document (tesseract runs outside the GIL)
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+OCR_RESOLUTION = 200
+AUTO_LANG = "auto"
+
+# Adaptive mode (opt-in): OCR at a low DPI, re-OCR weak regions/pages at a high one
+OCR_ADAPTIVE = os.getenv("OCR_ADAPTIVE", "").strip().lower() in ("1", "true", "yes", "on")
+OCR_ADAPTIVE_LOW_DPI = int(os.getenv("OCR_ADAPTIVE_LOW_DPI", "120"))
+OCR_ADAPTIVE_HIGH_DPI = int(os.getenv("OCR_ADAPTIVE_HIGH_DPI", "300"))
+OCR_MIN_CONF = float(os.getenv("OCR_MIN_CONF", "60"))
+# Share of low-confidence words above which the whole page is redone
+ADAPTIVE_PAGE_REOCR_SHARE = 0.3
+# Words the parsers depend on: amounts, GSTINs, dates, invoice numbers all carry digits
+FIELD_RE = re.compile(r"\d")
+
+# A page source renders its page at a given DPI (None if it can't)
+PageSource = Callable[[int], Any]
+
+HINDI_LANG = "hin+eng"
+DEFAULT_LANG = "eng"
+# OSD script names -> tesseract language pack
+SCRIPT_LANGS = {"Devanagari": HINDI_LANG, "Latin": DEFAULT_LANG}
+# Minimum OSD confidences to act on its script / orientation
+OSD_MIN_SCRIPT_CONF = 1.0
+OSD_MIN_ORIENTATION_CONF = 2.0
+# Heuristic: width the sampled page is scaled to, and share of lines with a headline
+HEURISTIC_WIDTH = 1200
+HEURISTIC_MIN_LINES = 3
+HEURISTIC_DEVANAGARI_SHARE = 0.4
+
+
+def ocr_page(img, lang: str = "eng", raise_errors: bool = False) -> str:
+    """
+    Perform OCR on an image.
+
+    Args:
+        img: PIL Image object
+        lang: Language code(s) for OCR. Use "hin+eng" for Hindi+English mixed documents.
+              Options: "eng", "hin", "hin+eng" (default: "eng")
+        raise_errors: Raise the engine error instead of returning "" when even
+              the English fallback fails (callers that cache the text)
+
+    Returns:
+        Extracted text string
+    """
+    engine = get_engine()
+    if engine is None:
+        return ""
+
+    # Try the requested language, fallback to English if it fails
+    try:
+        return engine.text(img, lang, psm=6)
+    except Exception:
+        if lang == "eng":
+            if raise_errors:
+                raise
+            return ""
+    # If Hindi language pack not installed, fallback to English
+    try:
+        return engine.text(img, "eng", psm=6)
+    except Exception:
+        if raise_errors:
+            raise
+        return ""
+
+
+def ocr_words(img, lang: str = "eng", psm: int = 6, raise_errors: bool = False) -> List[Dict[str, Any]]:
+    """Words with confidences and boxes (ocr_engine), in reading order; see ocr_page for raise_errors."""
+    engine = get_engine()
+    if engine is None:
+        return []
+    try:
+        return engine.words(img, lang, psm)
+    except Exception:
+        if lang != "eng":
+            return ocr_words(img, "eng", psm, raise_errors)
+        if raise_errors:
+            raise
+        return []
+
+
+def words_to_text(words: List[Dict[str, Any]]) -> str:
+    """Text as image_to_string lays it out: a line per OCR line, a blank line between paragraphs."""
+    lines: List[str] = []
+    prev = None
+    for w in words:
+        key = w["line"]
+        if key == prev:
+            lines[-1] += " " + w["text"]
+            continue
+        if prev is not None and key[:2] != prev[:2]:
+            lines.append("")
+        lines.append(w["text"])
+        prev = key
+    return "\n".join(lines)
+
+
+def _mean_conf(words: List[Dict[str, Any]]) -> float:
+    return sum(w["conf"] for w in words) / len(words) if words else -1.0
+
+
+def _reocr_lines(words, keys, high, scale: float, lang: str, raise_errors: bool = False) -> Tuple[List[Dict[str, Any]], int]:
+    """Re-OCR the lines `keys` from the high-resolution render; keep whichever reading is more confident."""
+    replaced: Dict[Any, List[Dict[str, Any]]] = {}
+    for key in keys:
+        line = [w for w in words if w["line"] == key]
+        x0 = min(w["box"][0] for w in line) - 4
+        y0 = min(w["box"][1] for w in line) - 4
+        x1 = max(w["box"][2] for w in line) + 4
+        y1 = max(w["box"][3] for w in line) + 4
+        crop = high.crop((max(0, int(x0 * scale)), max(0, int(y0 * scale)),
+                          min(high.width, int(x1 * scale)), min(high.height, int(y1 * scale))))
+        better = ocr_words(crop, lang, psm=7, raise_errors=raise_errors)
+        if better and _mean_conf(better) > _mean_conf(line):
+            replaced[key] = [{**w, "line": key} for w in better]
+    out: List[Dict[str, Any]] = []
+    for w in words:
+        if w["line"] not in replaced:
+            out.append(w)
+        elif replaced[w["line"]] is not None:
+            out.extend(replaced[w["line"]])
+            replaced[w["line"]] = None
+    return out, sum(1 for v in replaced.values() if v is None)
+
+
+def ocr_page_adaptive(source: PageSource, lang: str = "eng", raise_errors: bool = False) -> Tuple[str, Dict[str, Any]]:
+    """
+    OCR a page at OCR_ADAPTIVE_LOW_DPI, then fix up weak readings at OCR_ADAPTIVE_HIGH_DPI.
+
+    - more than ADAPTIVE_PAGE_REOCR_SHARE of the words below OCR_MIN_CONF (or
+      none at all): the whole page is OCR'd again at the high DPI;
+    - otherwise only lines holding a low-confidence word with digits (amounts,
+      GSTINs, dates) are cropped from the high-DPI render and re-read.
+
+    raise_errors is passed on to ocr_words.
+    """
+    stats: Dict[str, Any] = {"dpi": OCR_ADAPTIVE_LOW_DPI, "reocr": None, "regions": 0}
+    low = source(OCR_ADAPTIVE_LOW_DPI)
+    if low is None:
+        return "", stats
+    words = ocr_words(low, lang, raise_errors=raise_errors)
+    weak = [w for w in words if w["conf"] < OCR_MIN_CONF]
+    if not words or len(weak) > ADAPTIVE_PAGE_REOCR_SHARE * len(words):
+        high = source(OCR_ADAPTIVE_HIGH_DPI)
+        if high is not None:
+            retry = ocr_words(high, lang, raise_errors=raise_errors)
+            if _mean_conf(retry) >= _mean_conf(words):
+                words = retry
+            stats.update(dpi=OCR_ADAPTIVE_HIGH_DPI, reocr="page")
+        return words_to_text(words), stats
+    keys = list(dict.fromkeys(w["line"] for w in weak if FIELD_RE.search(w["text"])))
+    if keys:
+        high = source(OCR_ADAPTIVE_HIGH_DPI)
+        if high is not None:
+            # Measured, not dpi ratio: image sources are never upscaled
+            words, stats["regions"] = _reocr_lines(words, keys, high, high.width / low.width, lang, raise_errors)
+            stats["reocr"] = "regions"
+    return words_to_text(words), stats
+
+
+def map_pages(fn: Callable[[Any], Any], pages: Iterable[Any], workers: int = OCR_WORKERS) -> List[Any]:
+    """
+    [fn(page) for page in pages] on a thread pool, in page order.
+
+    `pages` is consumed lazily with at most 2 x workers pages in flight, so a
+    generator of rendered images never holds the whole document in memory.
+    """
+    if workers <= 1:
+        return [fn(page) for page in pages]
+    results: List[Any] = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending: deque = deque()
+        for page in pages:
+            pending.append(pool.submit(fn, page))
+            if len(pending) >= 2 * workers:
+                results.append(pending.popleft().result())
+        results.extend(f.result() for f in pending)
+    return results
+
+
+@functools.lru_cache(maxsize=1)
+def installed_languages() -> frozenset:
+    """Language packs tesseract reports (empty if it can't be asked)."""
+    if not pytesseract:
+        return frozenset()
+    try:
+        return frozenset(pytesseract.get_languages(config=""))
+    except Exception:
+        return frozenset()
+
+
+def _lang_available(lang: str) -> bool:
+    installed = installed_languages()
+    # Unknown installation: let ocr_page's own fallback deal with it
+    return not installed or all(part in installed for part in lang.split("+"))
+
+
+def _osd(img) -> Optional[Dict[str, Any]]:
+    if not pytesseract:
+        return None
+    try:
+        osd = pytesseract.image_to_osd(img, output_type=pytesseract.Output.DICT)
+    except Exception:
+        return None
+    return {
+        "script": osd.get("script"),
+        "confidence": round(float(osd.get("script_conf") or 0.0), 2),
+        "rotate": int(osd.get("rotate") or 0),
+        "orientation_confidence": round(float(osd.get("orientation_conf") or 0.0), 2),
+        "source": "osd",
+    }
+
+
+def _runs(mask) -> List[Tuple[int, int]]:
+    """[start, end) spans of True values in a 1-D boolean array."""
+    padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    return list(zip(edges[::2], edges[1::2]))
+
+
+def _has_headline(ink, top: int, bottom: int) -> bool:
+    """True if the text line ink[top:bottom] hangs from a Devanagari-style headline."""
+    line = ink[top:bottom]
+    height = bottom - top
+    profile = line.sum(axis=1)
+    peak = int(profile.argmax())
+    if peak > height * 0.5 or profile[peak] < 2.0 * profile.mean():
+        return False
+    runs = [e - s for s, e in _runs(line[peak])]
+    # Headline runs connect whole words; Latin rows break at every glyph
+    return bool(runs) and float(np.mean(runs)) >= 1.5 * height
+
+
+def devanagari_heuristic(img) -> Optional[Dict[str, Any]]:
+    """Script guess from text-line ink profiles; None when the page has too few text lines."""
+    if np is None:
+        return None
+    gray = img.convert("L")
+    if gray.width > HEURISTIC_WIDTH:
+        gray = gray.resize((HEURISTIC_WIDTH, max(1, gray.height * HEURISTIC_WIDTH // gray.width)))
+    pixels = np.asarray(gray, dtype=np.float32)
+    ink = pixels < min(160.0, float(pixels.mean()) * 0.8)
+    rows = ink.sum(axis=1) > max(2, ink.shape[1] // 200)
+    lines = [(s, e) for s, e in _runs(rows) if e - s >= 8]
+    if len(lines) < HEURISTIC_MIN_LINES:
+        return None
+    share = float(sum(_has_headline(ink, s, e) for s, e in lines)) / len(lines)
+    devanagari = share >= HEURISTIC_DEVANAGARI_SHARE
+    return {
+        "script": "Devanagari" if devanagari else "Latin",
+        "confidence": round(share if devanagari else 1.0 - share, 2),
+        "rotate": 0,
+        "source": "heuristic",
+    }
+
+
+def detect_script(img) -> Optional[Dict[str, Any]]:
+    """Script and orientation of a page image: OSD if available, else the glyph heuristic."""
+    osd = _osd(img)
+    if osd and osd["script"] and osd["confidence"] >= OSD_MIN_SCRIPT_CONF:
+        return osd
+    try:
+        guess = devanagari_heuristic(img)
+    except Exception as e:
+        logger.debug(f"Script heuristic failed: {e}")
+        guess = None
+    if guess and osd:
+        # Keep OSD's orientation even when its script guess was too weak
+        guess["rotate"] = osd["rotate"]
+        guess["orientation_confidence"] = osd["orientation_confidence"]
+    return guess or osd
+
+
+def sample_page_index(images: List[Any]) -> int:
+    """The page to detect on: the first with a reasonable amount of ink among the first few."""
+    if np is None or len(images) <= 1:
+        return 0
+    for i, img in enumerate(images[:3]):
+        try:
+            pixels = np.asarray(img.convert("L").reduce(4))
+        except Exception:
+            continue
+        if (pixels < 128).mean() > 0.01:
+            return i
+    return 0
+
+
+def upright(img, detection: Optional[Dict[str, Any]]):
+    """img rotated as OSD says it should be (no-op without a confident orientation)."""
+    rotate = (detection or {}).get("rotate") or 0
+    if img is None or rotate % 360 == 0 or (detection or {}).get("orientation_confidence", 0.0) < OSD_MIN_ORIENTATION_CONF:
+        return img
+    # OSD's rotate is clockwise; PIL rotates counter-clockwise
+    return img.rotate(-rotate, expand=True)
+
+
+def choose_ocr_lang(images: List[Any], default: str = HINDI_LANG) -> Tuple[str, Dict[str, Any]]:
+    """
+    Pick the OCR language for a document from one sampled page.
+
+    Returns (lang, info); `default` is used when the script can't be told.
+    images[sample] is replaced by its upright version when OSD found it rotated.
+    """
+    info: Dict[str, Any] = {}
+    if not images:
+        return default, info
+    index = sample_page_index(images)
+    detection = detect_script(images[index])
+    lang = default
+    if detection:
+        lang = SCRIPT_LANGS.get(detection["script"], default)
+        info["ocr_script_detection"] = {**detection, "page": index + 1}
+        images[index] = upright(images[index], detection)
+    if lang != DEFAULT_LANG and not _lang_available(lang):
+        info["ocr_lang_unavailable"] = lang
+        lang = DEFAULT_LANG
+    info["ocr_lang"] = lang
+    return lang, info
+
+
+def image_source(img, native_dpi: int = OCR_RESOLUTION) -> PageSource:
+    """Page source for an already decoded image, taken to be at native_dpi (never upscaled)."""
+    def render(dpi: int):
+        if dpi >= native_dpi:
+            return img
+        scale = dpi / native_dpi
+        return img.resize((max(1, int(img.width * scale)), max(1, int(img.height * scale))))
+    return render
+
+
+def _cache_params(lang: str, dpi: int) -> Dict[str, Any]:
+    """Everything besides the page pixels that a cached OCR result depends on."""
+    engine = get_engine()
+    params: Dict[str, Any] = {
+        "lang": lang,
+        "dpi": dpi,
+        "engine": engine.name if engine else None,
+        "preprocess": list(ocr_preprocess.OCR_PREPROCESS),
+    }
+    if OCR_ADAPTIVE:
+        params["adaptive"] = [OCR_ADAPTIVE_HIGH_DPI, OCR_MIN_CONF, ADAPTIVE_PAGE_REOCR_SHARE]
+    return params
+
+
+def _ocr_source(source: PageSource, lang: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    OCR one page source, preprocessed (ocr_preprocess). Returns (text, stats):
+    the adaptive stats if on, plus per-stage `timings` (ms), `blank` and
+    `cached` (served from ocr_cache by the hash of the first rendering).
+    """
+    timings: Dict[str, float] = {"render": 0.0}
+    preprocess = PagePreprocessor(timings=timings)
+    t0 = time.perf_counter()
+
+    def render(dpi: int):
+        start = time.perf_counter()
+        img = source(dpi)
+        timings["render"] += (time.perf_counter() - start) * 1000
+        return img
+
+    first_dpi = OCR_ADAPTIVE_LOW_DPI if OCR_ADAPTIVE else OCR_RESOLUTION
+    text, stats, key, failed = "", {}, None, False
+    try:
+        first = render(first_dpi)
+        cache = get_cache()
+        if cache is not None and first is not None:
+            start = time.perf_counter()
+            key = page_key(first, **_cache_params(lang, first_dpi))
+            hit = cache.get(key)
+            timings["cache"] = (time.perf_counter() - start) * 1000
+            if hit is not None:
+                return hit["text"], {"timings": timings, "blank": hit["blank"], "cached": True}
+
+        def load(dpi: int):
+            img = first if dpi == first_dpi else render(dpi)
+            return preprocess(img) if img is not None else None
+
+        if OCR_ADAPTIVE:
+            text, stats = ocr_page_adaptive(load, lang, raise_errors=True)
+        else:
+            img = load(OCR_RESOLUTION)
+            text = ocr_page(img, lang=lang, raise_errors=True) if img is not None else ""
+    except Exception as e:
+        # Not cached: a transient engine error must not stick to the page as ""
+        failed = True
+        logger.debug(f"OCR of a page failed: {e}")
+    # Whatever wasn't rendering, preprocessing or the cache was tesseract
+    timings["ocr"] = max(0.0, (time.perf_counter() - t0) * 1000 - sum(timings.values()))
+    if key is not None and not failed:
+        cache.put(key, {"text": text, "blank": preprocess.blank})
+    stats.update(timings=timings, blank=preprocess.blank, cached=False)
+    return text, stats
+
+
+def ocr_pages(sources: Iterable[PageSource], lang: str = DEFAULT_LANG, info: Optional[Dict[str, Any]] = None) -> List[str]:
+    """
+    OCR text of each page source, in order, on the page pool (map_pages).
+
+    lang AUTO_LANG picks the language from a sampled page first
+    (choose_ocr_lang); the pages rendered for that are reused for OCR.
+    """
+    sources = iter(sources)
+    if lang == AUTO_LANG:
+        t0 = time.perf_counter()
+        dpi = OCR_ADAPTIVE_LOW_DPI if OCR_ADAPTIVE else OCR_RESOLUTION
+        head = list(itertools.islice(sources, 3))
+        rendered = [src(dpi) for src in head]
+        images = [img for img in rendered if img is not None]
+        lang, decision = choose_ocr_lang(images)
+        if info is not None:
+            info.update(decision)
+            info["ocr_stage_ms"] = {"lang_detect": (time.perf_counter() - t0) * 1000}
+        upright_images = iter(images)
+        reused = []
+        for src, img in zip(head, rendered):
+            if img is not None:
+                fixed = next(upright_images)
+                if fixed is not img:
+                    # choose_ocr_lang turned this page upright: do the same at every DPI
+                    detection = decision.get("ocr_script_detection")
+                    src = lambda d, src=src, detection=detection: upright(src(d), detection)
+                src = lambda d, src=src, fixed=fixed: fixed if d == dpi else src(d)
+            reused.append(src)
+        sources = itertools.chain(reused, sources)
+
+    results = map_pages(lambda src: _ocr_source(src, lang), sources)
+    stats = [s for _, s in results]
+    if info is not None:
+        engine = get_engine()
+        info["ocr_engine"] = engine.name if engine else None
+        stage_ms = info.setdefault("ocr_stage_ms", {})
+        for s in stats:
+            for stage, ms in s["timings"].items():
+                stage_ms[stage] = stage_ms.get(stage, 0.0) + ms
+        info["ocr_stage_ms"] = {stage: round(ms, 1) for stage, ms in stage_ms.items()}
+        info["ocr_blank_pages"] = info.get("ocr_blank_pages", 0) + sum(1 for s in stats if s["blank"])
+        if get_cache() is not None:
+            info["ocr_cache_hits"] = info.get("ocr_cache_hits", 0) + sum(1 for s in stats if s["cached"])
+    if OCR_ADAPTIVE and info is not None:
+        info["ocr_adaptive"] = {
+            "low_dpi": OCR_ADAPTIVE_LOW_DPI,
+            "high_dpi": OCR_ADAPTIVE_HIGH_DPI,
+            "pages_reocr": sum(1 for s in stats if s.get("reocr") == "page"),
+            "regions_reocr": sum(s.get("regions", 0) for s in stats),
+        }
+    return [text for text, _ in results]
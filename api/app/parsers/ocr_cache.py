@@ -0,0 +1,198 @@
+# api/app/parsers/ocr_cache.py
+"""
+Cache of page OCR results, keyed by the rendered page image.
+
+Clients resend statements with one extra page, and documents share
+letterhead and annexure pages; each of those pages used to be OCR'd again.
+ocr._ocr_source() renders a page, hashes the pixels (page_key) together with
+everything that changes the OCR result (language, DPI, engine,
+preprocessing, adaptive settings) and, on a hit, skips preprocessing and
+tesseract.
+
+The key is an exact content hash: a perceptual hash would also match pages
+that differ in a digit or two, and return the other page's amounts.
+
+Backends (opt-in, both may be on):
+
+- disk:  OCR_CACHE_DIR, one small JSON file per page, shared by the workers
+         of a node. Least recently used entries (by mtime, touched on hit)
+         are evicted once the directory exceeds OCR_CACHE_MAX_MB.
+- redis: OCR_CACHE_REDIS_URL, shared across nodes, entries expire after
+         OCR_CACHE_TTL seconds. Disk is checked first and filled from redis
+         hits.
+
+Cache failures are logged and treated as misses.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+try:
+    from redis import Redis
+except Exception:
+    Redis = None
+
+logger = logging.getLogger(__name__)
+
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", "").strip()
+OCR_CACHE_MAX_MB = float(os.getenv("OCR_CACHE_MAX_MB", "256"))
+OCR_CACHE_REDIS_URL = os.getenv("OCR_CACHE_REDIS_URL", "").strip()
+OCR_CACHE_TTL = int(os.getenv("OCR_CACHE_TTL", str(7 * 24 * 3600)))
+# Bump when the cached value or the OCR pipeline changes incompatibly
+KEY_VERSION = "1"
+# Writes between directory scans for eviction (per process)
+EVICT_EVERY = 64
+
+
+def page_key(img, **params: Any) -> str:
+    """Hash of an image's pixels plus the parameters its OCR result depends on."""
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"{KEY_VERSION}|{img.mode}|{img.width}x{img.height}|".encode())
+    h.update(json.dumps(params, sort_keys=True, default=str).encode())
+    h.update(img.tobytes())
+    return h.hexdigest()
+
+
+class DiskCache:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)  # recently used
+            return value
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename: other workers never read a partial entry
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        with self._lock:
+            # First write of the process, then every EVICT_EVERY
+            evict = self._writes % EVICT_EVERY == 0
+            self._writes += 1
+        if evict:
+            self.evict()
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the directory is under 90% of max_bytes."""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.max_bytes * 0.9:
+                break
+
+
+class RedisCache:
+    def __init__(self, url: str, ttl: int):
+        self.ttl = ttl
+        self.client = Redis.from_url(url, socket_connect_timeout=2, socket_timeout=2)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self.client.get("ocr:" + key)
+        return json.loads(raw) if raw else None
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        self.client.set("ocr:" + key, json.dumps(value, ensure_ascii=False), ex=self.ttl)
+
+
+class OcrCache:
+    """Disk first, then redis; either may be None."""
+
+    def __init__(self, disk: Optional[DiskCache] = None, shared: Optional[RedisCache] = None):
+        self.disk = disk
+        self.shared = shared
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        for backend in (self.disk, self.shared):
+            if backend is None:
+                continue
+            try:
+                value = backend.get(key)
+            except Exception as e:
+                logger.debug(f"OCR cache read failed: {e}")
+                continue
+            if value is not None:
+                if backend is self.shared and self.disk is not None:
+                    self._put(self.disk, key, value)
+                return value
+        return None
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        for backend in (self.disk, self.shared):
+            if backend is not None:
+                self._put(backend, key, value)
+
+    @staticmethod
+    def _put(backend, key: str, value: Dict[str, Any]) -> None:
+        try:
+            backend.put(key, value)
+        except Exception as e:
+            logger.debug(f"OCR cache write failed: {e}")
+
+
+_cache: Optional[OcrCache] = None
+_cache_lock = threading.Lock()
+_cache_ready = False
+
+
+def get_cache() -> Optional[OcrCache]:
+    """The process-wide cache from the environment; None when no backend is configured."""
+    global _cache, _cache_ready
+    with _cache_lock:
+        if _cache_ready:
+            return _cache
+        _cache_ready = True
+        disk = shared = None
+        if OCR_CACHE_DIR:
+            try:
+                disk = DiskCache(OCR_CACHE_DIR, int(OCR_CACHE_MAX_MB * 1024 * 1024))
+            except Exception as e:
+                logger.warning(f"OCR cache directory {OCR_CACHE_DIR!r} is unusable: {e}")
+        if OCR_CACHE_REDIS_URL and Redis is not None:
+            try:
+                shared = RedisCache(OCR_CACHE_REDIS_URL, OCR_CACHE_TTL)
+            except Exception as e:
+                logger.warning(f"OCR cache redis is unusable: {e}")
+        _cache = OcrCache(disk, shared) if (disk or shared) else None
+        return _cache
@@ -0,0 +1,177 @@
+# api/app/parsers/ocr_engine.py
+"""
+OCR engines: who runs tesseract for ocr.ocr_page / ocr.ocr_words.
+
+pytesseract writes every page to a temp file, spawns a `tesseract` process
+and loads the language model again, for each page and each language
+fallback. On long documents that start-up is a large share of OCR time.
+
+Engines (OCR_ENGINE env, default "auto"):
+
+- tesserocr:   the native tesseract binding (optional dependency). Initialized
+               PyTessBaseAPI instances are pooled per language and reused
+               across pages, documents and page-pool threads, so a model is
+               loaded once per concurrent worker instead of once per page.
+               Recognition releases the GIL.
+- pytesseract: a tesseract process per call; the fallback.
+
+"auto" picks tesserocr when it is installed. Both return the same shapes:
+text() a string, words() word dicts ({"text", "conf", "line", "box"}) in
+reading order, line = (block, paragraph, line) numbers as image_to_data
+reports them.
+"""
+import logging
+import os
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+try:
+    import pytesseract
+except Exception:
+    pytesseract = None
+try:
+    import tesserocr
+except Exception:
+    tesserocr = None
+
+logger = logging.getLogger(__name__)
+
+OCR_ENGINE = os.getenv("OCR_ENGINE", "auto").lower()
+
+
+class PytesseractEngine:
+    name = "pytesseract"
+
+    def text(self, img, lang: str, psm: int = 6) -> str:
+        return pytesseract.image_to_string(img, lang=lang, config=f"--psm {psm}") or ""
+
+    def words(self, img, lang: str, psm: int = 6) -> List[Dict[str, Any]]:
+        data = pytesseract.image_to_data(img, lang=lang, config=f"--psm {psm}", output_type=pytesseract.Output.DICT)
+        words = []
+        for i, text in enumerate(data.get("text") or []):
+            text = (text or "").strip()
+            if not text:
+                continue
+            words.append({
+                "text": text,
+                "conf": float(data["conf"][i]),
+                "line": (data["block_num"][i], data["par_num"][i], data["line_num"][i]),
+                "box": (data["left"][i], data["top"][i], data["left"][i] + data["width"][i], data["top"][i] + data["height"][i]),
+            })
+        return words
+
+
+class TesserocrEngine:
+    """
+    Pooled tesserocr APIs, one pool per language.
+
+    An API is checked out for one call and put back, so pools grow to the
+    number of pages OCR'd concurrently and then only get reused.
+    """
+    name = "tesserocr"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._idle: Dict[str, List[Any]] = defaultdict(list)
+        # Languages whose model failed to load: fail fast instead of retrying per page
+        self._broken: Dict[str, str] = {}
+
+    @contextmanager
+    def _api(self, lang: str, psm: int):
+        with self._lock:
+            if lang in self._broken:
+                raise RuntimeError(self._broken[lang])
+            api = self._idle[lang].pop() if self._idle[lang] else None
+        if api is None:
+            try:
+                api = tesserocr.PyTessBaseAPI(lang=lang)
+            except Exception as e:
+                with self._lock:
+                    self._broken[lang] = f"tesserocr could not load {lang!r}: {e}"
+                raise
+        try:
+            api.SetPageSegMode(psm)
+            yield api
+        finally:
+            api.Clear()
+            with self._lock:
+                self._idle[lang].append(api)
+
+    def text(self, img, lang: str, psm: int = 6) -> str:
+        with self._api(lang, psm) as api:
+            api.SetImage(img)
+            return api.GetUTF8Text() or ""
+
+    def words(self, img, lang: str, psm: int = 6) -> List[Dict[str, Any]]:
+        RIL = tesserocr.RIL
+        with self._api(lang, psm) as api:
+            api.SetImage(img)
+            api.Recognize()
+            iterator = api.GetIterator()
+            words: List[Dict[str, Any]] = []
+            if iterator is None:
+                return words
+            block = par = line = 0
+            # Numbered like image_to_data: paragraphs restart per block, lines per paragraph
+            for word in tesserocr.iterate_level(iterator, RIL.WORD):
+                if word.IsAtBeginningOf(RIL.BLOCK):
+                    block, par, line = block + 1, 0, 0
+                if word.IsAtBeginningOf(RIL.PARA):
+                    par, line = par + 1, 0
+                if word.IsAtBeginningOf(RIL.TEXTLINE):
+                    line += 1
+                text = (word.GetUTF8Text(RIL.WORD) or "").strip()
+                box = word.BoundingBox(RIL.WORD)
+                if not text or box is None:
+                    continue
+                words.append({
+                    "text": text,
+                    "conf": float(word.Confidence(RIL.WORD)),
+                    "line": (block, par, line),
+                    "box": tuple(box),
+                })
+            return words
+
+    def close(self) -> None:
+        with self._lock:
+            for apis in self._idle.values():
+                for api in apis:
+                    api.End()
+            self._idle.clear()
+
+
+ENGINES = {
+    TesserocrEngine.name: TesserocrEngine,
+    PytesseractEngine.name: PytesseractEngine,
+}
+
+_engines: Dict[str, Any] = {}
+_engines_lock = threading.Lock()
+
+
+def available_engines() -> List[str]:
+    names = []
+    if tesserocr is not None:
+        names.append(TesserocrEngine.name)
+    if pytesseract is not None:
+        names.append(PytesseractEngine.name)
+    return names
+
+
+def get_engine(name: str | None = None):
+    """The shared engine instance by name (default OCR_ENGINE); None if no OCR engine is installed."""
+    available = available_engines()
+    if not available:
+        return None
+    name = (name or OCR_ENGINE).lower()
+    if name == "auto":
+        name = available[0]
+    elif name not in available:
+        logger.warning(f"OCR engine {name!r} is not available, using {available[0]!r}")
+        name = available[0]
+    with _engines_lock:
+        if name not in _engines:
+            _engines[name] = ENGINES[name]()
+        return _engines[name]
@@ -0,0 +1,267 @@
+# api/app/parsers/ocr_preprocess.py
+"""
+Page image preprocessing before OCR (NumPy).
+
+Rendered PDF pages and uploaded photos (skewed, unevenly lit, colour jpg/png
+receipts and bills) went to tesseract as-is. PagePreprocessor runs, per page:
+
+- grayscale: the page is handed to tesseract as luma (transparent areas as
+             white paper); without it, deskew/crop are applied to the page in
+             its own colours. The other steps always analyse the luma,
+- binarize:  adaptive (Bradley) threshold against the local mean, computed
+             with an integral image, so shadows and gradients don't swallow text,
+- deskew:    skew angle from the sharpest horizontal ink projection over
+             +-MAX_SKEW degrees, then rotation,
+- crop:      dark scanner borders trimmed, page cropped to its content,
+- blank:     pages with (almost) no ink are reported as blank and not OCR'd.
+
+Steps come from OCR_PREPROCESS (comma-separated, default all; "none"
+disables preprocessing). Each step's time is added to `timings` (ms).
+
+The geometry (border crop, angle, content crop) is planned on the first
+image a page preprocessor sees and replayed, as fractions of the image
+size, on any later rendering of the same page, so line boxes from a low-DPI
+pass still point at the same content in a high-DPI one (adaptive OCR).
+"""
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+try:
+    from PIL import Image
+except Exception:
+    Image = None
+
+ALL_STEPS = ("grayscale", "binarize", "deskew", "crop", "blank")
+MAX_SKEW = 5.0
+SKEW_STEP = 0.25
+MIN_SKEW = 0.3
+# Bradley threshold: ink if darker than (1 - BINARIZE_T) x local mean
+BINARIZE_T = 0.15
+# Edge rows/columns darker than this share are scanner borders
+BORDER_INK = 0.5
+# Rows/columns with at least this share of ink count as content
+CONTENT_INK = 0.002
+BLANK_INK = 0.001
+CROP_MARGIN = 10
+
+
+def _steps_from_env() -> Tuple[str, ...]:
+    raw = os.getenv("OCR_PREPROCESS", ",".join(ALL_STEPS)).strip().lower()
+    if raw in ("", "0", "none", "off", "false"):
+        return ()
+    return tuple(s for s in (p.strip() for p in raw.split(",")) if s in ALL_STEPS)
+
+
+OCR_PREPROCESS = _steps_from_env()
+
+
+def _flatten(img):
+    """The image as L or RGB, transparent areas as white paper (not ink)."""
+    if img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info):
+        rgba = img.convert("RGBA")
+        img = Image.new("RGBA", rgba.size, (255, 255, 255, 255))
+        img.alpha_composite(rgba)
+    return img if img.mode in ("L", "RGB") else img.convert("RGB")
+
+
+def grayscale(img) -> "np.ndarray":
+    img = _flatten(img)
+    return np.asarray(img if img.mode == "L" else img.convert("L"))
+
+
+def _box_mean(a: "np.ndarray", r: int) -> "np.ndarray":
+    """Mean over the (2r+1) x (2r+1) window around each pixel (edges replicated), via an integral image."""
+    k = 2 * r + 1
+    ii = np.pad(a.astype(np.float64), ((r + 1, r), (r + 1, r)), mode="edge").cumsum(axis=0).cumsum(axis=1)
+    return (ii[k:, k:] - ii[:-k, k:] - ii[k:, :-k] + ii[:-k, :-k]) / (k * k)
+
+
+def adaptive_ink(gray: "np.ndarray", t: float = BINARIZE_T) -> "np.ndarray":
+    """
+    Boolean ink mask: pixels darker than (1 - t) x the mean of their neighbourhood.
+
+    The neighbourhood (1/16 of the page) is smooth, so its mean is computed on
+    a 4x downsampled page and scaled back up.
+    """
+    h, w = gray.shape
+    f = 4 if min(h, w) >= 256 else 1
+    hs, ws = -(-h // f), -(-w // f)
+    small = np.pad(gray, ((0, hs * f - h), (0, ws * f - w)), mode="edge").reshape(hs, f, ws, f).mean(axis=(1, 3))
+    mean = _box_mean(small, max(2, min(h, w) // (32 * f))).astype(np.float32)
+    mean = np.repeat(np.repeat(mean, f, axis=0), f, axis=1)[:h, :w]
+    return gray < mean * (1.0 - t)
+
+
+def skew_angle(ink: "np.ndarray", max_angle: float = MAX_SKEW, step: float = SKEW_STEP) -> float:
+    """Counter-clockwise skew of the text lines in degrees (0.0 if unsure); rotate by -angle to level."""
+    ys, xs = np.nonzero(ink[::2, ::2])
+    if len(ys) < 200:
+        return 0.0
+    if len(ys) > 100_000:
+        keep = slice(None, None, len(ys) // 100_000 + 1)
+        ys, xs = ys[keep], xs[keep]
+    ys = ys.astype(np.float32)
+    xs = xs.astype(np.float32)
+    best, best_score = 0.0, -1.0
+    # Lines skewed by `angle` collapse into the sharpest row histogram once sheared back
+    for angle in np.arange(-max_angle, max_angle + step / 2, step):
+        rows = np.round(ys + xs * np.tan(np.radians(angle))).astype(np.int64)
+        hist = np.bincount(rows - rows.min()).astype(np.float64)
+        score = float((hist * hist).sum())
+        if score > best_score:
+            best, best_score = float(angle), score
+    return best if abs(best) >= MIN_SKEW else 0.0
+
+
+def _span(keep: "np.ndarray") -> Optional[Tuple[int, int]]:
+    idx = np.flatnonzero(keep)
+    return (int(idx[0]), int(idx[-1]) + 1) if idx.size else None
+
+
+def border_box(gray: "np.ndarray") -> Optional[Tuple[int, int, int, int]]:
+    """(x0, y0, x1, y1) inside the dark scanner borders at the image edges (None: all dark)."""
+    # Borders are uniformly dark, so adaptive ink misses them: use absolute darkness
+    dark = gray < 96
+    rows = _span(dark.mean(axis=1) <= BORDER_INK)
+    cols = _span(dark.mean(axis=0) <= BORDER_INK)
+    if rows is None or cols is None:
+        return None
+    return cols[0], rows[0], cols[1], rows[1]
+
+
+def content_box(ink: "np.ndarray") -> Optional[Tuple[int, int, int, int]]:
+    """(x0, y0, x1, y1) around the ink plus CROP_MARGIN, None if there is none."""
+    h, w = ink.shape
+    rows = _span(ink.mean(axis=1) >= CONTENT_INK)
+    cols = _span(ink.mean(axis=0) >= CONTENT_INK)
+    if rows is None or cols is None:
+        return None
+    return (max(0, cols[0] - CROP_MARGIN), max(0, rows[0] - CROP_MARGIN),
+            min(w, cols[1] + CROP_MARGIN), min(h, rows[1] + CROP_MARGIN))
+
+
+def _fractions(box, shape) -> Tuple[float, float, float, float]:
+    h, w = shape
+    return box[0] / w, box[1] / h, box[2] / w, box[3] / h
+
+
+def _pixels(box, size) -> Tuple[int, int, int, int]:
+    w, h = size
+    x0, y0, x1, y1 = box
+    return int(x0 * w), int(y0 * h), int(round(x1 * w)), int(round(y1 * h))
+
+
+def _crop(arr: "np.ndarray", box) -> "np.ndarray":
+    x0, y0, x1, y1 = _pixels(box, arr.shape[::-1])
+    return arr[y0:y1, x0:x1]
+
+
+class PagePreprocessor:
+    """
+    Preprocesses the renderings of one page: call it with a PIL image, get the
+    image to OCR back, or None if the page is blank.
+
+    The plan (border crop, skew angle, content crop) is made on the first
+    image and replayed on later ones.
+    """
+
+    def __init__(self, steps: Tuple[str, ...] = None, timings: Optional[Dict[str, float]] = None):
+        self.steps = OCR_PREPROCESS if steps is None else steps
+        self.timings = timings if timings is not None else {}
+        self.planned = False
+        self.blank = False
+        self.angle = 0.0
+        # Crop boxes as fractions of the image size: inside the borders, then around the content
+        self.border: Optional[Tuple[float, float, float, float]] = None
+        self.box: Optional[Tuple[float, float, float, float]] = None
+
+    def _timed(self, step: str, fn, *args):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        self.timings[step] = self.timings.get(step, 0.0) + (time.perf_counter() - t0) * 1000
+        return out
+
+    def __call__(self, img):
+        if not self.steps or np is None or Image is None:
+            return img
+        if self.blank:
+            return None
+        gray = self._timed("grayscale", grayscale, img)
+        if not self.planned:
+            gray, ink = self._plan(gray)
+            if self.blank:
+                return None
+        else:
+            gray, ink = self._replay(gray), None
+        if "binarize" in self.steps:
+            if ink is None:
+                ink = self._timed("binarize", adaptive_ink, gray)
+            return Image.fromarray(np.where(ink, 0, 255).astype(np.uint8))
+        if "grayscale" in self.steps:
+            # Deskew/crop without binarize still hand tesseract the grayscale page
+            return Image.fromarray(gray)
+        return self._replay_image(img)
+
+    def _plan(self, gray):
+        self.planned = True
+        steps = set(self.steps)
+        if "crop" in steps:
+            border = self._timed("crop", border_box, gray)
+            if border is not None and border != (0, 0, gray.shape[1], gray.shape[0]):
+                self.border = _fractions(border, gray.shape)
+                gray = _crop(gray, self.border)
+        ink = None
+        if steps & {"deskew", "crop", "blank"}:
+            ink = self._timed("binarize", adaptive_ink, gray)
+        if "deskew" in steps:
+            self.angle = self._timed("deskew", skew_angle, ink)
+            if self.angle:
+                # Rotating the mask, not re-thresholding the rotated page: the fill
+                # at the new corners would make the paper next to it look like ink
+                ink = self._timed("deskew", self._rotate_ink, ink)
+                gray = self._timed("deskew", self._rotate, gray)
+        if steps & {"crop", "blank"}:
+            box = self._timed("crop", content_box, ink)
+            if "blank" in steps and (box is None or ink.mean() < BLANK_INK):
+                self.blank = True
+                return gray, ink
+            if "crop" in steps and box is not None:
+                self.box = _fractions(box, gray.shape)
+                gray, ink = _crop(gray, self.box), _crop(ink, self.box)
+        return gray, ink
+
+    def _replay(self, gray):
+        if self.border is not None:
+            gray = self._timed("crop", _crop, gray, self.border)
+        if self.angle:
+            gray = self._timed("deskew", self._rotate, gray)
+        if self.box is not None:
+            gray = self._timed("crop", _crop, gray, self.box)
+        return gray
+
+    def _replay_image(self, img):
+        """The plan applied to the page itself, in its own colours."""
+        img = _flatten(img)
+        if self.border is not None:
+            img = self._timed("crop", img.crop, _pixels(self.border, img.size))
+        if self.angle:
+            paper = np.median(np.asarray(img)[::8, ::8].reshape(-1, len(img.getbands())), axis=0)
+            fill = tuple(int(c) for c in paper) if img.mode == "RGB" else int(paper[0])
+            img = self._timed("deskew", lambda: img.rotate(-self.angle, resample=Image.BICUBIC, fillcolor=fill))
+        if self.box is not None:
+            img = self._timed("crop", img.crop, _pixels(self.box, img.size))
+        return img
+
+    def _rotate(self, gray):
+        paper = int(np.median(gray[::8, ::8]))
+        rotated = Image.fromarray(gray).rotate(-self.angle, resample=Image.BICUBIC, fillcolor=paper)
+        return np.asarray(rotated)
+
+    def _rotate_ink(self, ink):
+        mask = Image.fromarray(ink.astype(np.uint8) * 255).rotate(-self.angle, resample=Image.NEAREST, fillcolor=0)
+        return np.asarray(mask) > 0
@@ -0,0 +1,218 @@
+# api/app/parsers/pdf_backend.py
+"""
+PDF text extraction backends: one parse, every text view.
+
+A PDF used to be parsed by pdfminer (extract_text_safely), again by
+pdfplumber when that found nothing, and again by pdfplumber for layout text
+(extract_text_with_layout, called from worker.py for GSTR forms). A backend
+parses the document once and returns a PdfExtraction holding, per page:
+
+- text:        plain text, identical to pdfminer's extract_text output,
+- layout_text: layout-preserving text (pdfplumber's layout=True),
+- words:       word boxes ({"text", "x0", "top", "x1", "bottom"}).
+
+Backends (PDF_BACKEND env, default "pdfplumber"):
+
+- pdfplumber: single pass. pdfplumber runs pdfminer's layout analysis once
+  per page; plain text is rendered from that layout, layout text and words
+  from the same characters.
+- pdfminer:   the previous separate passes (pdfminer, then pdfplumber), kept
+  as the baseline for scripts/bench_pdf_backends.py.
+- pymupdf:    PyMuPDF (optional dependency). Much faster; its plain text is
+  not byte-identical to pdfminer's, so parsers should be checked against it
+  before switching.
+
+extract_pdf() caches the last few extractions, so the worker's layout-text
+call after parse_any() reuses the parse instead of repeating it.
+"""
+import functools
+import io
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from pdfminer.high_level import extract_text as _pdf_extract
+from pdfminer.layout import LTContainer, LTText, LTTextBox
+try:
+    import pdfplumber
+    from pdfplumber.utils import extract_words as _extract_words
+except Exception:
+    pdfplumber = None
+    _extract_words = None
+try:
+    import fitz  # PyMuPDF
+except Exception:
+    fitz = None
+
+logger = logging.getLogger(__name__)
+
+PDF_BACKEND = os.getenv("PDF_BACKEND", "pdfplumber").lower()
+
+
+@dataclass
+class PdfPage:
+    number: int
+    text: str
+    layout_text: str = ""
+    width: float = 0.0
+    height: float = 0.0
+    # Word boxes are built on first access from what the parse already produced
+    _words: Optional[Callable[[], List[Dict[str, Any]]]] = field(default=None, repr=False)
+
+    @functools.cached_property
+    def words(self) -> List[Dict[str, Any]]:
+        return self._words() if self._words else []
+
+
+@dataclass
+class PdfExtraction:
+    backend: str
+    pages: List[PdfPage]
+
+    @property
+    def text(self) -> str:
+        """Plain text of the document, pages separated by form feeds (pdfminer's format)."""
+        return "".join(page.text + "\f" for page in self.pages)
+
+    @property
+    def layout_text(self) -> str:
+        return "\n".join(page.layout_text for page in self.pages if page.layout_text)
+
+
+def _render_layout(item, out: List[str]) -> None:
+    """Text of a pdfminer layout tree, as pdfminer's TextConverter writes it."""
+    if isinstance(item, LTContainer):
+        for child in item:
+            _render_layout(child, out)
+    elif isinstance(item, LTText):
+        out.append(item.get_text())
+    if isinstance(item, LTTextBox):
+        out.append("\n")
+
+
+def _word_boxes(words) -> List[Dict[str, Any]]:
+    return [
+        {"text": w["text"], "x0": w["x0"], "top": w["top"], "x1": w["x1"], "bottom": w["bottom"]}
+        for w in words
+    ]
+
+
+class PdfplumberBackend:
+    name = "pdfplumber"
+
+    def extract(self, data: bytes) -> PdfExtraction:
+        pages: List[PdfPage] = []
+        # laparams: run pdfminer's layout analysis as part of the one parse
+        with pdfplumber.open(io.BytesIO(data), laparams={}) as pdf:
+            for number, page in enumerate(pdf.pages, start=1):
+                out: List[str] = []
+                _render_layout(page.layout, out)
+                text = "".join(out)
+                layout_text = page.extract_text(layout=True) or ""
+                if not text.strip() or not layout_text:
+                    plain = page.extract_text() or ""
+                    text = text if text.strip() else plain
+                    layout_text = layout_text or plain
+                chars = list(page.chars)
+                pages.append(PdfPage(
+                    number=number,
+                    text=text,
+                    layout_text=layout_text,
+                    width=float(page.width),
+                    height=float(page.height),
+                    _words=lambda chars=chars: _word_boxes(_extract_words(chars)),
+                ))
+                page.close()
+        return PdfExtraction(self.name, pages)
+
+
+class PdfminerBackend:
+    """pdfminer for plain text, pdfplumber for layout text and words: one parse each."""
+    name = "pdfminer"
+
+    def extract(self, data: bytes) -> PdfExtraction:
+        texts = (_pdf_extract(io.BytesIO(data)) or "").split("\f")
+        if len(texts) > 1 and not texts[-1].strip():
+            texts.pop()
+        pages = [PdfPage(number=i + 1, text=t) for i, t in enumerate(texts)]
+        if pdfplumber is not None:
+            with pdfplumber.open(io.BytesIO(data)) as pdf:
+                for i, page in enumerate(pdf.pages):
+                    if i >= len(pages):
+                        pages.append(PdfPage(number=i + 1, text=""))
+                    words = _word_boxes(page.extract_words())
+                    pages[i].layout_text = page.extract_text(layout=True) or page.extract_text() or ""
+                    pages[i].width, pages[i].height = float(page.width), float(page.height)
+                    pages[i]._words = lambda words=words: words
+        return PdfExtraction(self.name, pages)
+
+
+def _layout_from_words(words: List[Dict[str, Any]], char_width: float = 5.0) -> str:
+    """Approximate layout text: words placed on their line at their x position."""
+    lines: Dict[int, List[Dict[str, Any]]] = {}
+    for w in words:
+        lines.setdefault(int(round(w["top"] / 3.0)), []).append(w)
+    out = []
+    for key in sorted(lines):
+        line = ""
+        for w in sorted(lines[key], key=lambda w: w["x0"]):
+            col = int(w["x0"] / char_width)
+            line += " " * max(1, col - len(line)) if line else " " * col
+            line += w["text"]
+        out.append(line)
+    return "\n".join(out)
+
+
+class PyMuPdfBackend:
+    name = "pymupdf"
+
+    def extract(self, data: bytes) -> PdfExtraction:
+        pages: List[PdfPage] = []
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            for number, page in enumerate(doc, start=1):
+                words = [
+                    {"text": w[4], "x0": w[0], "top": w[1], "x1": w[2], "bottom": w[3]}
+                    for w in page.get_text("words")
+                ]
+                pages.append(PdfPage(
+                    number=number,
+                    text=page.get_text("text"),
+                    layout_text=_layout_from_words(words),
+                    width=float(page.rect.width),
+                    height=float(page.rect.height),
+                    _words=lambda words=words: words,
+                ))
+        return PdfExtraction(self.name, pages)
+
+
+BACKENDS = {
+    PdfplumberBackend.name: PdfplumberBackend,
+    PdfminerBackend.name: PdfminerBackend,
+    PyMuPdfBackend.name: PyMuPdfBackend,
+}
+
+
+def available_backends() -> List[str]:
+    names = [PdfminerBackend.name]
+    if pdfplumber is not None:
+        names.insert(0, PdfplumberBackend.name)
+    if fitz is not None:
+        names.append(PyMuPdfBackend.name)
+    return names
+
+
+def get_backend(name: str | None = None):
+    """Backend instance by name (default PDF_BACKEND); falls back to the best available one."""
+    name = (name or PDF_BACKEND).lower()
+    available = available_backends()
+    if name not in available:
+        logger.warning(f"PDF backend {name!r} is not available, using {available[0]!r}")
+        name = available[0]
+    return BACKENDS[name]()
+
+
+@functools.lru_cache(maxsize=2)
+def extract_pdf(data: bytes, backend: str | None = None) -> PdfExtraction:
+    """Parse a PDF once with the configured backend (cached; treat the result as read-only)."""
+    return get_backend(backend).extract(data)
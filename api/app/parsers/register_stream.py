@@ -0,0 +1,290 @@
+"""
+Streaming fast path for sales/purchase registers exported as CSV/TSV/XLSX.
+
+The text path decodes the whole upload, runs normalize_text over it and the
+register normalizers split it into lines again and re-detect the delimiter,
+so a 100k-row register is copied several times before the first entry is
+built. Here rows are read straight from the bytes with the csv module,
+headers are mapped once and entries come out of a generator; only the
+final entries list grows with the file.
+
+Entries have the same shape as normalize_sales_register /
+normalize_purchase_register (the header maps, date and amount parsing are
+shared with those modules). Anything that does not look like a register
+returns None so the caller can fall back to the text path.
+
+parse_register_rows() takes any iterable of row lists; XLSX workbooks are
+read sheet by sheet in openpyxl's read-only mode (see spreadsheet.py) and
+the register sheets are merged into one result.
+"""
+
+from __future__ import annotations
+
+import calendar
+import csv
+import io
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import purchase_register, sales_register
+from .spreadsheet import is_xlsx, iter_xlsx_sheets, openpyxl
+
+XLSX_EXTENSIONS = ("xlsx", "xlsm")
+STREAMABLE_EXTENSIONS = ("csv", "tsv") + XLSX_EXTENSIONS
+REGISTER_KINDS = ("sales_register", "purchase_register")
+SNIFF_BYTES = 64 * 1024
+HEADER_SCAN_ROWS = 50
+MAX_ROW_WARNINGS = 50
+
+_AMOUNT_FIELDS = ("taxable_value", "igst", "cgst", "sgst", "cess", "total_value")
+_PARTY_FIELDS = {
+    "sales_register": ("customer_name", "customer_gstin"),
+    "purchase_register": ("supplier_name", "supplier_gstin"),
+}
+_HEADER_MAPS = {
+    "sales_register": sales_register._map_headers,
+    "purchase_register": purchase_register._map_headers,
+}
+_DATE_PARSERS = {
+    "sales_register": sales_register._parse_date,
+    "purchase_register": purchase_register._normalize_date,
+}
+
+
+def _sniff_delimiter(sample: str) -> str:
+    lines = [ln for ln in sample.splitlines() if ln.strip()]
+    header = next((ln for ln in lines if "invoice" in ln.lower()), lines[0] if lines else "")
+    counts = {d: header.count(d) for d in (",", "\t", ";")}
+    best = max(counts, key=counts.get)
+    return best if counts[best] else ","
+
+
+def iter_csv_rows(data: bytes, delimiter: Optional[str] = None) -> Tuple[str, Iterator[List[str]]]:
+    """Return (delimiter, row iterator) reading `data` incrementally."""
+    if delimiter is None:
+        sample = data[:SNIFF_BYTES].decode("utf-8-sig", errors="replace")
+        delimiter = _sniff_delimiter(sample)
+    stream = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig", errors="replace", newline="")
+    return delimiter, csv.reader(stream, delimiter=delimiter)
+
+
+def _is_header(cells: List[str]) -> bool:
+    for map_headers in _HEADER_MAPS.values():
+        mapping = map_headers(cells)
+        fields = set(mapping.values())
+        if len(mapping) >= 3 and fields & {"invoice_number", "invoice_date"}:
+            return True
+    return False
+
+
+def _find_header(rows: Iterator[List[str]]) -> Tuple[List[List[str]], Optional[List[str]]]:
+    """Consume rows up to and including the header. Returns (preamble rows, header cells)."""
+    preamble: List[List[str]] = []
+    for row in rows:
+        cells = [c.strip() for c in row]
+        if not any(cells):
+            continue
+        if _is_header(cells):
+            return preamble, cells
+        preamble.append(cells)
+        if len(preamble) >= HEADER_SCAN_ROWS:
+            break
+    return preamble, None
+
+
+def _guess_kind(header: List[str], preamble_text: str, filename: str) -> Optional[str]:
+    fn = (filename or "").lower()
+    if "purchase" in fn:
+        return "purchase_register"
+    if "sales" in fn:
+        return "sales_register"
+    text = preamble_text.lower()
+    if "purchase register" in text:
+        return "purchase_register"
+    if "sales register" in text:
+        return "sales_register"
+    words = " ".join(header).lower()
+    if "supplier" in words or "vendor" in words:
+        return "purchase_register"
+    if "customer" in words or "buyer" in words:
+        return "sales_register"
+    return None
+
+
+def _period_from_text(text: str) -> Optional[Dict[str, str]]:
+    match = purchase_register.PERIOD_RE.search(text)
+    if not match:
+        return None
+    month_name = match.group(1).lower()
+    month = purchase_register.MONTHS.get(month_name)
+    if not month:
+        return None
+    year = int(match.group(2))
+    days = calendar.monthrange(year, month)[1]
+    return {
+        "start": f"{year}-{month:02d}-01",
+        "end": f"{year}-{month:02d}-{days:02d}",
+        "label": f"{month_name.title()} {year}",
+    }
+
+
+def _empty_entry(kind: str) -> Dict[str, Any]:
+    name_field, gstin_field = _PARTY_FIELDS[kind]
+    return {
+        "invoice_number": None,
+        "invoice_date": None,
+        name_field: None,
+        gstin_field: None,
+        "place_of_supply": None,
+        "reverse_charge": False,
+        "invoice_type": "REGULAR",
+        "taxable_value": 0.0,
+        "igst": 0.0,
+        "cgst": 0.0,
+        "sgst": 0.0,
+        "cess": 0.0,
+        "total_value": 0.0,
+        "hsn_summary": [],
+        "raw_row": None,
+    }
+
+
+def iter_register_entries(
+    rows: Iterator[List[str]],
+    kind: str,
+    header: List[str],
+    warnings: List[str],
+    stats: Dict[str, int],
+) -> Iterator[Dict[str, Any]]:
+    """Yield one entry per data row after `header`. Skipped rows are counted in stats."""
+    mapping = sorted(_HEADER_MAPS[kind](header).items())
+    parse_date = _DATE_PARSERS[kind]
+    raw_as_dict = kind == "purchase_register"
+
+    for row in rows:
+        stats["rows"] += 1
+        cells = [c.strip() for c in row]
+        first = next((c for c in cells if c), "")
+        low = first.lower()
+        if not first or low.startswith(("total", "grand total", "----")) or low.startswith("page "):
+            continue
+
+        entry = _empty_entry(kind)
+        for idx, canon in mapping:
+            if idx >= len(cells) or not cells[idx]:
+                continue
+            val = cells[idx]
+            if canon in _AMOUNT_FIELDS:
+                entry[canon] = sales_register._parse_amount(val)
+            elif canon == "invoice_date":
+                entry[canon] = parse_date(val) or val
+            elif canon == "reverse_charge":
+                entry[canon] = val.lower().startswith(("y", "t"))
+            else:
+                entry[canon] = val
+
+        if entry["total_value"] == 0 and entry["taxable_value"] > 0:
+            entry["total_value"] = (
+                entry["taxable_value"] + entry["igst"] + entry["cgst"] + entry["sgst"] + entry["cess"]
+            )
+
+        if raw_as_dict:
+            entry["raw_row"] = {
+                (header[i] if i < len(header) and header[i] else f"col_{i}"): c
+                for i, c in enumerate(cells) if c
+            }
+        else:
+            entry["raw_row"] = [c for c in cells if c]
+
+        if not entry["invoice_number"] and entry["taxable_value"] == 0:
+            stats["skipped"] += 1
+            if stats["skipped"] <= MAX_ROW_WARNINGS:
+                warnings.append(f"row_skipped: {entry['raw_row']}")
+            continue
+        yield entry
+
+
+def parse_register_rows(
+    rows: Iterable[List[str]],
+    kind: Optional[str] = None,
+    filename: str = "",
+    source_format: str = "csv",
+) -> Optional[Dict[str, Any]]:
+    """Build a register result from tabular rows, or None if no register header is found."""
+    rows = iter(rows)
+    preamble, header = _find_header(rows)
+    if header is None:
+        return None
+    preamble_text = "\n".join(" ".join(c for c in cells if c) for cells in preamble)
+    kind = kind or _guess_kind(header, preamble_text, filename)
+    if kind not in REGISTER_KINDS:
+        return None
+
+    gstin_of_business = None
+    period = None
+    if kind == "purchase_register":
+        gstin_match = purchase_register.GSTIN_RE.search(preamble_text)
+        gstin_of_business = gstin_match.group(1) if gstin_match else None
+        period = _period_from_text(preamble_text)
+
+    warnings: List[str] = []
+    stats = {"rows": 0, "skipped": 0}
+    entries = list(iter_register_entries(rows, kind, header, warnings, stats))
+    if stats["skipped"] > MAX_ROW_WARNINGS:
+        warnings.append(f"rows_skipped: {stats['skipped']}")
+
+    return {
+        "doc_type": kind,
+        "gstin_of_business": gstin_of_business,
+        "period": period,
+        "entries": entries,
+        "warnings": warnings,
+        "meta": {
+            "parser_version": f"{kind}_v1",
+            "source_format": source_format,
+            "rows_read": stats["rows"],
+        },
+    }
+
+
+def _parse_workbook(data: bytes, kind: Optional[str], filename: str) -> Optional[Dict[str, Any]]:
+    """Merge the register sheets of a workbook; sheets of another register kind are skipped."""
+    merged: Optional[Dict[str, Any]] = None
+    for title, rows in iter_xlsx_sheets(data):
+        result = parse_register_rows(rows, kind, filename, "xlsx")
+        if result is None:
+            continue
+        if merged is None:
+            merged = result
+            kind = result["doc_type"]
+            merged["meta"]["sheets"] = [title]
+            continue
+        if result["doc_type"] != kind:
+            merged["warnings"].append(f"sheet_skipped: {title} looks like a {result['doc_type']}")
+            continue
+        merged["entries"].extend(result["entries"])
+        merged["warnings"].extend(result["warnings"])
+        merged["gstin_of_business"] = merged["gstin_of_business"] or result["gstin_of_business"]
+        merged["period"] = merged["period"] or result["period"]
+        merged["meta"]["rows_read"] += result["meta"]["rows_read"]
+        merged["meta"]["sheets"].append(title)
+    return merged
+
+
+def try_parse_register_stream(filename: str, data: bytes, forced_route: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Parse a CSV/TSV/XLSX register without going through text extraction.
+
+    Returns None when the file is not a streamable register (wrong extension,
+    another forced doc type, or no register header), so callers fall back.
+    """
+    ext = (filename or "").rsplit(".", 1)[-1].lower() if "." in (filename or "") else ""
+    if ext not in STREAMABLE_EXTENSIONS:
+        return None
+    if forced_route and forced_route not in REGISTER_KINDS:
+        return None
+    if ext in XLSX_EXTENSIONS:
+        if openpyxl is None or not is_xlsx(data, filename):
+            return None
+        return _parse_workbook(data, forced_route, filename)
+    delimiter, rows = iter_csv_rows(data, "\t" if ext == "tsv" else None)
+    source_format = "tsv" if delimiter == "\t" else "csv"
+    return parse_register_rows(rows, forced_route, filename, source_format)
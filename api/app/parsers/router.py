@@ -55,6 +55,14 @@ try:
     from .sales_register import normalize_sales_register
 except Exception:
     normalize_sales_register = None
+try:
+    from .gstn_portal import try_parse_portal_json
+except Exception:
+    try_parse_portal_json = None
+try:
+    from .register_stream import try_parse_register_stream
+except Exception:
+    try_parse_register_stream = None
 try:
     from .policy_loader import load_policy, pick_bank_profile
 except Exception:
@@ -123,6 +131,27 @@ def _resolve_forced_doc_type(value: str | None) -> tuple[str | None, str | None]
 def parse_any(filename: str, data: bytes, forced_doc_type: str | None = None, use_hindi: bool = False):
     t0 = time.time()
     
+    # GSTR-2B / GSTR-1 downloads from the GSTN portal are parsed incrementally
+    if try_parse_portal_json and filename.lower().endswith('.json'):
+        forced_label, forced_internal = _resolve_forced_doc_type(forced_doc_type)
+        result = try_parse_portal_json(filename, data, forced_internal)
+        if result is not None:
+            doc_type = result["doc_type"]
+            meta = {
+                "pages": 1,
+                "ocr_used": False,
+                "processing_ms": int((time.time() - t0) * 1000),
+                "detected_doc_type": doc_type,
+                "doc_type_scores": {doc_type: 10},
+                "doc_type_confidence": 1.0,
+                "text_source": "gstn_portal_json",
+                "parser_version": result["meta"]["parser_version"],
+            }
+            if forced_internal:
+                meta["doc_type_forced"] = True
+                meta["requested_doc_type"] = forced_label
+            return result, meta, doc_type
+
     # Handle JSON files (especially for GSTR-2B sample)
     if filename.lower().endswith('.json'):
         try:
@@ -146,11 +175,37 @@ def parse_any(filename: str, data: bytes, forced_doc_type: str | None = None, us
         except (json.JSONDecodeError, UnicodeDecodeError):
             pass  # Fall through to normal text extraction
     
+    # Register CSV/TSV/XLSX exports are read row by row straight from the bytes
+    if try_parse_register_stream and not use_hindi:
+        forced_label, forced_internal = _resolve_forced_doc_type(forced_doc_type)
+        result = try_parse_register_stream(filename, data, forced_internal)
+        if result is not None:
+            doc_type = result["doc_type"]
+            display_doc_type = forced_label or doc_type
+            meta = {
+                "pages": 1,
+                "ocr_used": False,
+                "processing_ms": int((time.time() - t0) * 1000),
+                "detected_doc_type": display_doc_type,
+                "doc_type_scores": {display_doc_type: 10},
+                "doc_type_confidence": 1.0,
+                "doc_type_confidences": {display_doc_type: 1.0},
+                "text_source": "structured_xlsx" if result["meta"]["source_format"] == "xlsx" else "structured_csv",
+                "text_len": len(data),
+                "row_count": len(result["entries"]),
+                "doc_type_internal": doc_type,
+            }
+            if forced_internal:
+                meta["doc_type_forced"] = True
+                meta.setdefault("requested_doc_type", forced_label)
+            return result, meta
+
     # Use Hindi-aware text extraction if requested
+    extraction: Dict[str, Any] = {}
     if use_hindi:
-        raw_text, ocr_used = extract_text_safely_hindi(data, filename)
+        raw_text, ocr_used = extract_text_safely_hindi(data, filename, info=extraction)
     else:
-        raw_text, ocr_used = extract_text_safely(data, filename)
+        raw_text, ocr_used = extract_text_safely(data, filename, info=extraction)
     cleaned_text = normalize_text(raw_text)
     text_len = len(cleaned_text)
     page1_text = (raw_text or "").split("\f", 1)[0]
@@ -361,6 +416,7 @@ def parse_any(filename: str, data: bytes, forced_doc_type: str | None = None, us
         "text_len": text_len,
     }
     meta["doc_type_internal"] = doc_type
+    meta.update(extraction)
     if meta_forced:
         meta["doc_type_forced"] = True
         if forced_label:
@@ -0,0 +1,61 @@
+"""
+Read-only access to XLSX workbooks (Tally / Busy register exports).
+
+Workbooks are opened with openpyxl in read_only mode, which streams each
+sheet's XML instead of building the whole cell tree, and rows are yielded
+as lists of strings so they can be fed to register_stream.parse_register_rows
+like CSV rows. Dates are rendered as DD-MM-YYYY and whole-number floats
+without a trailing ".0" (invoice numbers often come out of Excel as numbers).
+"""
+
+from __future__ import annotations
+
+import io
+from datetime import date, datetime
+from typing import Iterator, List, Tuple
+
+try:
+    import openpyxl
+except ImportError:  # optional, xlsx uploads fall back to "unknown"
+    openpyxl = None
+
+XLSX_MAGIC = b"PK\x03\x04"
+
+
+def is_xlsx(data: bytes, filename: str | None = None) -> bool:
+    name = (filename or "").lower()
+    return name.endswith((".xlsx", ".xlsm")) and data[:4] == XLSX_MAGIC
+
+
+def _cell_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.strftime("%d-%m-%Y")
+    if isinstance(value, date):
+        return value.strftime("%d-%m-%Y")
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def iter_xlsx_sheets(data: bytes) -> Iterator[Tuple[str, Iterator[List[str]]]]:
+    """Yield (sheet title, row iterator) for every worksheet, one sheet at a time."""
+    if openpyxl is None:
+        raise RuntimeError("openpyxl is required to read .xlsx files")
+    wb = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            rows = ([_cell_text(v) for v in row] for row in ws.iter_rows(values_only=True))
+            yield ws.title, rows
+    finally:
+        wb.close()
+
+
+def xlsx_to_text(data: bytes) -> str:
+    """Tab-separated text of all sheets, for the generic text pipeline."""
+    parts: List[str] = []
+    for _, rows in iter_xlsx_sheets(data):
+        lines = ["\t".join(cells).rstrip("\t") for cells in rows]
+        parts.append("\n".join(ln for ln in lines if ln.strip()))
+    return "\f".join(parts)
@@ -0,0 +1,269 @@
+"""
+Invoice-level matching engine shared by the reconciliation modules.
+
+Both sides are EntryTables (see entry_table.py). Matching runs in passes,
+each one only over what the previous passes left unmatched:
+
+1. exact:      same counterparty GSTIN, same month, same invoice number
+2. normalized: same GSTIN and month, invoice numbers equal after
+               normalization (case, separators, leading zeros)
+3. date_drift: same GSTIN and normalized number in a different month
+4. no_gstin:   one side has no GSTIN (e.g. B2C rows, text-parsed returns);
+               normalized number and month must agree
+5. fuzzy:      same GSTIN and month, total within an amount window and
+               invoice numbers that still look alike: the same digits and a
+               high similarity ratio, or the digits of one (at least
+               MIN_SUFFIX_DIGITS) prefixed by a year / financial-year series
+               in the other ("2024-25/0105" ~ "0105"). Numbers whose digits
+               differ otherwise never match, so recurring same-amount
+               invoices ("RENT-1", "RENT-11") stay apart.
+
+Passes 1-4 are hash joins on blocking keys, so they are linear in the
+number of invoices. The fuzzy pass only compares candidates inside a
+(GSTIN, month) block whose totals fall in the amount window, found by
+binary search over the block's sorted totals, so 100k x 100k registers
+reconcile in seconds and memory stays proportional to the inputs.
+"""
+
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ..entry_table import EntryTable
+
+_NON_ALNUM_RE = re.compile(r"[^0-9A-Z]")
+_LEADING_ZEROS_RE = re.compile(r"(?<![0-9])0+(?=[0-9])")
+_DIGITS_RE = re.compile(r"[^0-9]")
+_DMY_RE = re.compile(r"^(\d{1,2})[-/.](\d{1,2})[-/.](\d{4})")
+_YMD_RE = re.compile(r"^(\d{4})[-/.](\d{1,2})")
+# Upper bound on candidates compared per invoice in the fuzzy pass
+MAX_FUZZY_CANDIDATES = 200
+# Shortest digit string that may match a longer one with a year series in front
+MIN_SUFFIX_DIGITS = 4
+_YEAR_RE = re.compile(r"((?:19|20)\d{2})((?:19|20)?\d{2})?")
+_SHORT_FY_RE = re.compile(r"(\d{2})(\d{2})")
+
+
+def normalize_invoice_number(value: Optional[str]) -> Optional[str]:
+    """'inv/0042-A ' -> 'INV42A'. None when nothing alphanumeric is left."""
+    if not value:
+        return None
+    key = _LEADING_ZEROS_RE.sub("", _NON_ALNUM_RE.sub("", str(value).upper()))
+    return key or None
+
+
+def invoice_month(value: Optional[str]) -> Optional[str]:
+    """'YYYY-MM' from ISO or DD-MM-YYYY dates, else None."""
+    if not value:
+        return None
+    m = _YMD_RE.match(value)
+    if m:
+        return f"{m.group(1)}-{int(m.group(2)):02d}"
+    m = _DMY_RE.match(value)
+    if m:
+        return f"{m.group(3)}-{int(m.group(2)):02d}"
+    return None
+
+
+def _gstin(value: Optional[str]) -> str:
+    return value.strip().upper() if value else ""
+
+
+@dataclass
+class _Side:
+    table: EntryTable
+    gstin: List[str]
+    month: List[Optional[str]]
+    exact: List[Optional[str]]
+    norm: List[Optional[str]]
+    open: np.ndarray = field(repr=False)
+
+    @classmethod
+    def of(cls, table: EntryTable) -> "_Side":
+        return cls(
+            table=table,
+            gstin=[_gstin(g) for g in table.gstin],
+            month=[invoice_month(d) for d in table.invoice_date],
+            exact=[n.strip().upper() if n else None for n in table.invoice_number],
+            norm=[normalize_invoice_number(n) for n in table.invoice_number],
+            open=np.ones(len(table), dtype=bool),
+        )
+
+    def open_indices(self) -> Iterable[int]:
+        return np.flatnonzero(self.open).tolist()
+
+
+@dataclass
+class MatchResult:
+    """Index pairs into the left/right tables plus the unmatched indices of each side."""
+    pairs: List[Tuple[int, int]]
+    match_types: List[str]
+    left_only: List[int]
+    right_only: List[int]
+
+    def counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = defaultdict(int)
+        for kind in self.match_types:
+            counts[kind] += 1
+        return dict(counts)
+
+
+def _hash_pass(left: _Side, right: _Side, key_fn, kind: str, pairs, kinds, left_where=None, right_where=None) -> None:
+    index: Dict[tuple, List[int]] = defaultdict(list)
+    for j in right.open_indices():
+        key = key_fn(right, j)
+        if key is not None and (right_where is None or right_where(right, j)):
+            index[key].append(j)
+    if not index:
+        return
+    for bucket in index.values():
+        bucket.reverse()  # pop() from the end keeps document order
+    for i in left.open_indices():
+        key = key_fn(left, i)
+        if key is None or (left_where is not None and not left_where(left, i)):
+            continue
+        bucket = index.get(key)
+        if bucket:
+            j = bucket.pop()
+            pairs.append((i, j))
+            kinds.append(kind)
+            left.open[i] = right.open[j] = False
+
+
+def _no_gstin(side: _Side, i: int) -> bool:
+    return not side.gstin[i]
+
+
+def _exact_key(side: _Side, i: int):
+    return (side.gstin[i], side.month[i], side.exact[i]) if side.exact[i] else None
+
+
+def _norm_key(side: _Side, i: int):
+    return (side.gstin[i], side.month[i], side.norm[i]) if side.norm[i] else None
+
+
+def _drift_key(side: _Side, i: int):
+    return (side.gstin[i], side.norm[i]) if side.gstin[i] and side.norm[i] else None
+
+
+def _month_key(side: _Side, i: int):
+    return (side.month[i], side.norm[i]) if side.norm[i] else None
+
+
+def _is_year_series(digits: str) -> bool:
+    """'2024', '202425', '20242025', '2425': a year or consecutive financial-year pair."""
+    m = _YEAR_RE.fullmatch(digits)
+    if m:
+        first, second = int(m.group(1)), m.group(2)
+        if second is None:
+            return True
+        return int(second) == (first + 1 if len(second) == 4 else (first + 1) % 100)
+    m = _SHORT_FY_RE.fullmatch(digits)
+    return bool(m) and int(m.group(2)) == (int(m.group(1)) + 1) % 100
+
+
+def _looks_alike(a_raw: Optional[str], a: Optional[str], b_raw: Optional[str], b: Optional[str],
+                 threshold: float) -> Tuple[bool, float]:
+    """Raw and normalized invoice numbers of two candidates -> (alike, score)."""
+    if not a or not b:
+        return False, 0.0
+    # Raw digits: normalization drops leading zeros, which count towards MIN_SUFFIX_DIGITS
+    da, db = _DIGITS_RE.sub("", a_raw or a), _DIGITS_RE.sub("", b_raw or b)
+    if da != db:
+        short, long = sorted((da, db), key=len)
+        if (len(short) >= MIN_SUFFIX_DIGITS and long.endswith(short)
+                and _is_year_series(long[:-len(short)])):
+            return True, 1.0
+        return False, 0.0
+    ratio = SequenceMatcher(None, a, b).ratio()
+    return ratio >= threshold, ratio
+
+
+def _fuzzy_pass(left: _Side, right: _Side, tolerance: float, amount_pct: float, threshold: float, pairs, kinds) -> None:
+    blocks: Dict[tuple, List[int]] = defaultdict(list)
+    for j in right.open_indices():
+        if right.gstin[j]:
+            blocks[(right.gstin[j], right.month[j])].append(j)
+    if not blocks:
+        return
+    right_totals = right.table.amounts["total"]
+    sorted_blocks = {}
+    for key, idx in blocks.items():
+        idx = np.asarray(idx)
+        order = np.argsort(right_totals[idx], kind="stable")
+        sorted_blocks[key] = (idx[order], right_totals[idx][order])
+
+    left_totals = left.table.amounts["total"]
+    for i in left.open_indices():
+        block = sorted_blocks.get((left.gstin[i], left.month[i]))
+        if block is None:
+            continue
+        idx, totals = block
+        t = float(left_totals[i])
+        window = max(tolerance, amount_pct * abs(t))
+        lo, hi = np.searchsorted(totals, [t - window, t + window + 1e-9])
+        best, best_score = None, None
+        for j in idx[lo:min(hi, lo + MAX_FUZZY_CANDIDATES)].tolist():
+            if not right.open[j]:
+                continue
+            ok, ratio = _looks_alike(left.exact[i], left.norm[i], right.exact[j], right.norm[j], threshold)
+            if not ok:
+                continue
+            score = (ratio, -abs(float(right_totals[j]) - t))
+            if best_score is None or score > best_score:
+                best, best_score = j, score
+        if best is not None:
+            pairs.append((i, best))
+            kinds.append("fuzzy")
+            left.open[i] = right.open[best] = False
+
+
+def match_invoices(
+    left: EntryTable,
+    right: EntryTable,
+    tolerance: float = 1.0,
+    amount_pct: float = 0.01,
+    fuzzy_threshold: float = 0.85,
+    fuzzy: bool = True,
+) -> MatchResult:
+    """
+    Pair invoices of two documents (e.g. sales register vs GSTR-1 B2B).
+
+    tolerance / amount_pct define the fuzzy pass amount window
+    (max(tolerance, amount_pct * total)); fuzzy_threshold is the minimum
+    similarity ratio for invoice numbers whose digits don't line up.
+    """
+    lhs, rhs = _Side.of(left), _Side.of(right)
+    pairs: List[Tuple[int, int]] = []
+    kinds: List[str] = []
+
+    _hash_pass(lhs, rhs, _exact_key, "exact", pairs, kinds)
+    _hash_pass(lhs, rhs, _norm_key, "normalized", pairs, kinds)
+    _hash_pass(lhs, rhs, _drift_key, "date_drift", pairs, kinds)
+    # Rows without a GSTIN can only be blocked on month
+    _hash_pass(lhs, rhs, _month_key, "no_gstin", pairs, kinds, left_where=_no_gstin)
+    _hash_pass(lhs, rhs, _month_key, "no_gstin", pairs, kinds, right_where=_no_gstin)
+    if fuzzy:
+        _fuzzy_pass(lhs, rhs, tolerance, amount_pct, fuzzy_threshold, pairs, kinds)
+
+    return MatchResult(
+        pairs=pairs,
+        match_types=kinds,
+        left_only=lhs.open_indices(),
+        right_only=rhs.open_indices(),
+    )
+
+
+def amount_differences(left: EntryTable, right: EntryTable, result: MatchResult, tolerance: float = 1.0) -> List[int]:
+    """Positions in result.pairs whose total or taxable value differ by more than tolerance."""
+    if not result.pairs:
+        return []
+    li = np.fromiter((p[0] for p in result.pairs), dtype=np.int64, count=len(result.pairs))
+    ri = np.fromiter((p[1] for p in result.pairs), dtype=np.int64, count=len(result.pairs))
+    off = np.abs(left.amounts["total"][li] - right.amounts["total"][ri]) > tolerance
+    off |= np.abs(left.amounts["taxable_value"][li] - right.amounts["taxable_value"][ri]) > tolerance
+    return np.flatnonzero(off).tolist()
@@ -0,0 +1,238 @@
+"""
+Financial-year reconciliation: every month of an FY for one GSTIN in one job.
+
+The per-job attach functions in worker.py reconcile a document against its
+counterpart when the document is parsed. Reviewing a full year that way
+means 12 months x 3 pairs = 36 separate passes, each with its own lookup,
+hydration and canonical conversion (GSTR-3B is converted once per pair).
+
+Here the caller loads all of the FY's documents up front (see
+db.find_jobs_by_gstin_and_periods, one indexed query) and
+reconcile_financial_year():
+
+- hydrates each document at most once, the first time a pair of its month
+  needs it, and uses the job's stored canonical form (canonical_store.py),
+  converting only when it is missing or stale,
+- runs the months in parallel on a thread pool (hydration is storage I/O,
+  matching is mostly NumPy),
+- returns one consolidated report: per-month reconciliations plus FY
+  totals per reconciliation type.
+
+Pairs reconciled per month (key -> documents):
+
+- sales_vs_gstr1:         sales_register vs gstr1
+- purchase_vs_gstr3b_itc: purchase_register vs gstr3b
+- itc_2b_3b:              gstr2b vs gstr3b (canonical)
+- purchase_vs_gstr2b:     purchase_register vs gstr2b
+
+(keys match the per-job meta["reconciliations"] keys).
+
+A pair whose documents are not both present is listed under the month's
+`missing` instead.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..canonical_store import is_current, stored_document
+from ..parsers.canonical import normalize_to_canonical
+from ..result_store import hydrate_result
+from .itc_2b_3b import reconcile_itc_2b_3b
+from .purchase_vs_gstr2b import reconcile_purchase_register_vs_gstr2b
+from .purchase_vs_gstr3b import reconcile_pr_vs_gstr3b_itc
+from .sales_vs_gstr1 import reconcile_sales_register_vs_gstr1
+
+FY_RECON_WORKERS = int(os.getenv("FY_RECON_WORKERS", "4"))
+FY_DOC_TYPES = ("sales_register", "gstr1", "purchase_register", "gstr3b", "gstr2b")
+MONTH_NAMES = (
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December",
+)
+
+_FY_RE = re.compile(r"^(?:FY\s*)?(\d{4})(?:\s*[-/]\s*(\d{2}|\d{4}))?$", re.IGNORECASE)
+
+Period = Tuple[int, int]  # (month, year)
+
+
+def fy_periods(fy: str) -> Tuple[str, List[Period]]:
+    """
+    '2025-26' / '2025-2026' / 'FY2025-26' / '2025' -> ('2025-26', [(4, 2025), ..., (3, 2026)]).
+
+    Raises ValueError for anything else, or when the end year is not start + 1.
+    """
+    m = _FY_RE.match((fy or "").strip())
+    if not m:
+        raise ValueError(f"Invalid financial year: {fy!r} (expected e.g. '2025-26')")
+    start = int(m.group(1))
+    end = m.group(2)
+    if end is not None and int(end) % 100 != (start + 1) % 100:
+        raise ValueError(f"Invalid financial year: {fy!r} (end year must follow start year)")
+    periods = [(month, start) for month in range(4, 13)] + [(month, start + 1) for month in range(1, 4)]
+    return f"{start}-{(start + 1) % 100:02d}", periods
+
+
+def period_key(period: Period) -> str:
+    month, year = period
+    return f"{year:04d}-{month:02d}"
+
+
+class _MonthDocuments:
+    """One month's jobs; payloads are hydrated and canonicalized on first use only."""
+
+    def __init__(self, jobs: Dict[str, Dict[str, Any]]):
+        self.jobs = jobs
+        self._payloads: Dict[str, Any] = {}
+        self._canonical: Dict[str, Any] = {}
+
+    def has(self, *doc_types: str) -> bool:
+        return all(t in self.jobs for t in doc_types)
+
+    def payload(self, doc_type: str):
+        if doc_type not in self._payloads:
+            self._payloads[doc_type] = hydrate_result(self.jobs[doc_type]["result"])
+        return self._payloads[doc_type]
+
+    def canonical(self, doc_type: str):
+        if doc_type not in self._canonical:
+            stored = self.jobs[doc_type].get("canonical")
+            if is_current(stored, doc_type):
+                self._canonical[doc_type] = stored_document(stored)
+            else:
+                self._canonical[doc_type] = normalize_to_canonical(doc_type, self.payload(doc_type))
+        return self._canonical[doc_type]
+
+
+def _itc_2b_3b(docs: _MonthDocuments) -> Dict[str, Any]:
+    return reconcile_itc_2b_3b(docs.canonical("gstr2b"), docs.canonical("gstr3b"))
+
+
+# key -> (left doc_type, right doc_type, runner)
+RECON_PAIRS: Dict[str, Tuple[str, str, Callable[[_MonthDocuments], Dict[str, Any]]]] = {
+    "sales_vs_gstr1": (
+        "sales_register", "gstr1",
+        lambda d: reconcile_sales_register_vs_gstr1(d.payload("sales_register"), d.payload("gstr1")),
+    ),
+    "purchase_vs_gstr3b_itc": (
+        "purchase_register", "gstr3b",
+        lambda d: reconcile_pr_vs_gstr3b_itc(d.payload("purchase_register"), d.payload("gstr3b")),
+    ),
+    "itc_2b_3b": ("gstr2b", "gstr3b", _itc_2b_3b),
+    "purchase_vs_gstr2b": (
+        "purchase_register", "gstr2b",
+        lambda d: reconcile_purchase_register_vs_gstr2b(d.payload("purchase_register"), d.payload("gstr2b")),
+    ),
+}
+
+CLEAN_STATUSES = ("matched", "match")
+
+
+def _recon_status(key: str, recon: Dict[str, Any]) -> Optional[str]:
+    if key == "itc_2b_3b":
+        return (recon.get("overall") or {}).get("status")
+    return recon.get("status")
+
+
+def _recon_totals(key: str, recon: Dict[str, Any]) -> Dict[str, Any]:
+    if key == "itc_2b_3b":
+        return {"gstr2b": recon.get("itc_available_2b") or {}, "gstr3b": recon.get("itc_claimed_3b") or {}}
+    return recon.get("totals") or {}
+
+
+def _add_totals(acc: Dict[str, Any], totals: Dict[str, Any]) -> None:
+    """acc += totals for nested {side: {head: amount}} dicts."""
+    for name, value in totals.items():
+        if isinstance(value, dict):
+            _add_totals(acc.setdefault(name, {}), value)
+        elif isinstance(value, (int, float)):
+            acc[name] = round(acc.get(name, 0.0) + float(value), 2)
+
+
+def _reconcile_month(period: Period, jobs: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    docs = _MonthDocuments(jobs)
+    month, year = period
+    out: Dict[str, Any] = {
+        "period": period_key(period),
+        "label": f"{MONTH_NAMES[month - 1]} {year}",
+        "jobs": {t: j["job_id"] for t, j in sorted(jobs.items())},
+        "reconciliations": {},
+        "missing": {},
+        "errors": [],
+    }
+    for key, (left, right, run) in RECON_PAIRS.items():
+        if not docs.has(left, right):
+            out["missing"][key] = [t for t in (left, right) if t not in jobs]
+            continue
+        try:
+            recon = run(docs)
+            recon[f"source_{left}_job_id"] = jobs[left]["job_id"]
+            recon[f"source_{right}_job_id"] = jobs[right]["job_id"]
+            out["reconciliations"][key] = recon
+        except Exception as exc:  # noqa: BLE001
+            out["errors"].append({"reconciliation": key, "error": str(exc)})
+    return out
+
+
+def reconcile_financial_year(
+    gstin: str,
+    fy: str,
+    documents: Dict[Tuple[str, Period], Dict[str, Any]],
+    workers: int = FY_RECON_WORKERS,
+) -> Dict[str, Any]:
+    """
+    Reconcile every month of `fy` for `gstin`.
+
+    documents maps (doc_type, (month, year)) to {"job_id", "result",
+    "canonical"} holding the job's stored (possibly offloaded) Job.result and
+    Job.canonical.
+    """
+    fy_label, periods = fy_periods(fy)
+    by_month: Dict[Period, Dict[str, Dict[str, Any]]] = {p: {} for p in periods}
+    for (doc_type, period), job in documents.items():
+        if period in by_month and doc_type in FY_DOC_TYPES:
+            by_month[period][doc_type] = job
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(periods)))) as pool:
+        months = list(pool.map(lambda p: _reconcile_month(p, by_month[p]), periods))
+
+    summary: Dict[str, Dict[str, Any]] = {}
+    for key in RECON_PAIRS:
+        entry = {
+            "months_reconciled": 0,
+            "months_matched": 0,
+            "months_with_differences": [],
+            "months_missing_documents": [],
+            "totals": {},
+        }
+        for m in months:
+            recon = m["reconciliations"].get(key)
+            if recon is None:
+                if key in m["missing"]:
+                    entry["months_missing_documents"].append(m["period"])
+                continue
+            entry["months_reconciled"] += 1
+            if _recon_status(key, recon) in CLEAN_STATUSES:
+                entry["months_matched"] += 1
+            else:
+                entry["months_with_differences"].append(m["period"])
+            _add_totals(entry["totals"], _recon_totals(key, recon))
+        summary[key] = entry
+
+    status = "matched"
+    if any(s["months_with_differences"] for s in summary.values()):
+        status = "mismatches_found"
+    elif any(m["errors"] for m in months) or not any(s["months_reconciled"] for s in summary.values()):
+        status = "incomplete"
+
+    return {
+        "doc_type": "fy_reconciliation",
+        "gstin": gstin,
+        "fy": fy_label,
+        "status": status,
+        "summary": summary,
+        "months": months,
+        "documents_loaded": sum(len(jobs) for jobs in by_month.values()),
+    }
@@ -0,0 +1,129 @@
+"""
+Invoice-level ITC reconciliation: purchase register (books) vs GSTR-2B.
+
+purchase_vs_gstr3b / itc_2b_3b only compare head totals, which tells a CA
+that there is an ITC gap but not which supplier invoices cause it. Here
+purchase register entries are paired with GSTR-2B b2b rows through the
+shared matching engine (blocked on supplier GSTIN + month, see
+recon.engine) and every invoice ends up in one of:
+
+- matched:          present on both sides, all heads within tolerance
+- value_mismatch:   present on both sides, some head differs
+- missing_in_2b:    in the books only (ITC at risk)
+- missing_in_books: in 2B only (ITC not yet recorded)
+
+Per-head (igst/cgst/sgst/cess) amounts for each bucket are computed with
+array operations over the paired columns. Detail lists are capped at
+RECON_DETAIL_LIMIT rows each; counts and head totals always cover every
+invoice.
+"""
+
+import os
+from typing import Any, Dict, List
+
+import numpy as np
+
+from ..entry_table import EntryTable, TAX_COLUMNS
+from .engine import match_invoices
+
+RECON_DETAIL_LIMIT = int(os.getenv("RECON_DETAIL_LIMIT", "10000"))
+HEADS = TAX_COLUMNS
+
+
+def _sums(table: EntryTable, idx: np.ndarray) -> Dict[str, float]:
+    return {h: round(float(table.amounts[h][idx].sum()), 2) for h in ("taxable_value",) + HEADS}
+
+
+def _invoice(table: EntryTable, i: int) -> Dict[str, Any]:
+    row = table.rows[i]
+    out = {
+        "supplier_gstin": table.gstin[i],
+        "supplier_name": row.get("supplier_name"),
+        "invoice_number": row.get("invoice_number"),
+        "invoice_date": row.get("invoice_date"),
+        "taxable_value": float(table.amounts["taxable_value"][i]),
+    }
+    out.update({h: float(table.amounts[h][i]) for h in HEADS})
+    out["total"] = float(table.amounts["total"][i])
+    return out
+
+
+def reconcile_purchase_register_vs_gstr2b(
+    pr: Dict[str, Any], g2b: Dict[str, Any], tolerance: float = 1.0
+) -> Dict[str, Any]:
+    books = EntryTable.from_flat((pr or {}).get("entries") or [], gstin_key="supplier_gstin")
+    portal = EntryTable.from_flat((g2b or {}).get("b2b") or [], gstin_key="supplier_gstin")
+    match = match_invoices(books, portal, tolerance=tolerance)
+
+    n = len(match.pairs)
+    li = np.fromiter((p[0] for p in match.pairs), dtype=np.int64, count=n)
+    ri = np.fromiter((p[1] for p in match.pairs), dtype=np.int64, count=n)
+    head_diff = {h: books.amounts[h][li] - portal.amounts[h][ri] for h in ("taxable_value",) + HEADS}
+    off = np.zeros(n, dtype=bool)
+    for diff in head_diff.values():
+        off |= np.abs(diff) > tolerance
+    ok_pos, off_pos = np.flatnonzero(~off), np.flatnonzero(off)
+    left_only = np.asarray(match.left_only, dtype=np.int64)
+    right_only = np.asarray(match.right_only, dtype=np.int64)
+
+    by_head = {}
+    for h in HEADS:
+        by_head[h] = {
+            "books": round(float(books.amounts[h].sum()), 2),
+            "gstr2b": round(float(portal.amounts[h].sum()), 2),
+            "matched": round(float(books.amounts[h][li[ok_pos]].sum()), 2),
+            "value_mismatch_books": round(float(books.amounts[h][li[off_pos]].sum()), 2),
+            "value_mismatch_gstr2b": round(float(portal.amounts[h][ri[off_pos]].sum()), 2),
+            "missing_in_2b": round(float(books.amounts[h][left_only].sum()), 2),
+            "missing_in_books": round(float(portal.amounts[h][right_only].sum()), 2),
+        }
+        by_head[h]["difference"] = round(by_head[h]["books"] - by_head[h]["gstr2b"], 2)
+
+    value_mismatches: List[Dict[str, Any]] = []
+    for pos in off_pos[:RECON_DETAIL_LIMIT].tolist():
+        i, j = match.pairs[pos]
+        value_mismatches.append({
+            **_invoice(books, i),
+            "gstr2b_invoice_number": portal.rows[j].get("invoice_number"),
+            "match_type": match.match_types[pos],
+            "heads": {
+                h: {
+                    "books": float(books.amounts[h][i]),
+                    "gstr2b": float(portal.amounts[h][j]),
+                    "difference": round(float(head_diff[h][pos]), 2),
+                }
+                for h in ("taxable_value",) + HEADS
+                if abs(head_diff[h][pos]) > tolerance
+            },
+        })
+
+    summary = {
+        "books_invoices": len(books),
+        "gstr2b_invoices": len(portal),
+        "matched": int(ok_pos.size),
+        "value_mismatch": int(off_pos.size),
+        "missing_in_2b": int(left_only.size),
+        "missing_in_books": int(right_only.size),
+        "match_types": match.counts(),
+    }
+    status = "matched"
+    if summary["value_mismatch"] or summary["missing_in_2b"] or summary["missing_in_books"]:
+        status = "mismatches_found"
+
+    return {
+        "status": status,
+        "summary": summary,
+        "totals": {
+            "purchase_register": books.totals(("taxable_value",) + HEADS),
+            "gstr2b": portal.totals(("taxable_value",) + HEADS),
+            "matched_books": _sums(books, li[ok_pos]),
+        },
+        "by_head": by_head,
+        "missing_in_2b": [_invoice(books, i) for i in left_only[:RECON_DETAIL_LIMIT].tolist()],
+        "missing_in_books": [_invoice(portal, j) for j in right_only[:RECON_DETAIL_LIMIT].tolist()],
+        "value_mismatches": value_mismatches,
+        "truncated": any(
+            count > RECON_DETAIL_LIMIT
+            for count in (summary["value_mismatch"], summary["missing_in_2b"], summary["missing_in_books"])
+        ),
+    }
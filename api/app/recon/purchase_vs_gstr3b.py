@@ -2,17 +2,17 @@ from __future__ import annotations
 
 from typing import Dict, Any
 
+from ..entry_table import EntryTable
+
 
 def total_itc_from_purchase_register(pr: Dict[str, Any]) -> Dict[str, float]:
-    entries = pr.get("entries") or []
-    igst = sum((e or {}).get("igst", 0.0) or 0.0 for e in entries)
-    cgst = sum((e or {}).get("cgst", 0.0) or 0.0 for e in entries)
-    sgst = sum((e or {}).get("sgst", 0.0) or 0.0 for e in entries)
+    table = EntryTable.from_flat((pr or {}).get("entries") or [])
+    totals = table.totals(("igst", "cgst", "sgst"), digits=None)
     return {
-        "igst": round(float(igst), 2),
-        "cgst": round(float(cgst), 2),
-        "sgst": round(float(sgst), 2),
-        "total": round(float(igst + cgst + sgst), 2),
+        "igst": round(totals["igst"], 2),
+        "cgst": round(totals["cgst"], 2),
+        "sgst": round(totals["sgst"], 2),
+        "total": round(totals["igst"] + totals["cgst"] + totals["sgst"], 2),
     }
 
 
@@ -0,0 +1,219 @@
+"""
+Materialized reconciliations, one row per (tenant, GSTIN, period, type).
+
+The worker reconciles a document against its counterpart when the document
+finishes and stores the outcome in that job's meta, so only the job that
+finished second carried the reconciliation (a sales register uploaded
+before its GSTR-1 never showed one), and finding the counterpart meant
+scanning the tenant's jobs on every upload.
+
+Every finished job with a GSTIN and period now updates the `reconciliations`
+rows of the types it takes part in (record_job):
+
+- its own side (left_job_id / right_job_id, see RECON_SIDES) is set,
+- if the worker reconciled it against a counterpart of the same GSTIN and
+  period, the other side, status, summary and full result are stored with
+  it (a pairing from the worker's latest-document fallback is not),
+- otherwise any previous result is cleared (it was computed against the
+  side that just changed) and the row waits for the counterpart, or is
+  marked failed if the worker's reconciliation of that type raised
+  (meta["reconciliation_errors"][recon_type]).
+
+Rows are written with INSERT ... ON CONFLICT DO UPDATE, so either side may
+finish first and concurrent workers don't overwrite each other's side.
+Readers (dashboard endpoints, GET /v1/jobs/{id}) and the worker's counterpart
+lookup (counterpart_job) go by primary key or job id; nothing is
+recomputed on read.
+"""
+
+import logging
+
+from sqlalchemy import case, func, or_, select
+
+from .db import Job, Reconciliation, _extract_gstin_from_result, _extract_period_from_result, _normalize_gstin
+from .result_store import _summarize, hydrate_meta, hydrate_result, offload_result
+
+logger = logging.getLogger(__name__)
+
+# recon_type (meta["reconciliations"] key) -> (left doc_type, right doc_type)
+RECON_SIDES = {
+    "sales_vs_gstr1": ("sales_register", "gstr1"),
+    "purchase_vs_gstr3b_itc": ("purchase_register", "gstr3b"),
+    "itc_2b_3b": ("gstr2b", "gstr3b"),
+    "purchase_vs_gstr2b": ("purchase_register", "gstr2b"),
+}
+AWAITING = "awaiting_counterpart"
+PENDING = "pending"  # both sides known, reconciliation not (yet) computed
+FAILED = "failed"
+USABLE_JOB_STATUSES = ("succeeded", "needs_review")
+
+
+def period_of(result) -> str | None:
+    month, year = _extract_period_from_result(result)
+    if not month or not year:
+        return None
+    return f"{int(year):04d}-{int(month):02d}"
+
+
+def recon_status(recon: dict) -> str | None:
+    """Overall status of a reconciliation result (itc_2b_3b nests it under `overall`)."""
+    return recon.get("status") or (recon.get("overall") or {}).get("status")
+
+
+def _upsert(db, keys: dict, values: dict, other_side: str) -> None:
+    """Insert the row or update only `values` on it; status falls back on the other side's presence."""
+    other = getattr(Reconciliation, other_side)
+    waiting = case((other.is_(None), AWAITING), else_=PENDING)
+    dialect = db.bind.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        row = {**keys, "status": AWAITING, **values}
+        # ON CONFLICT DO UPDATE does not apply the column's onupdate
+        update = {**values, "updated_at": func.now()}
+        if "status" not in values:
+            update["status"] = waiting
+        stmt = insert(Reconciliation).values(**row).on_conflict_do_update(
+            index_elements=list(keys), set_=update,
+        )
+        db.execute(stmt)
+        return
+    row = db.get(Reconciliation, keys)
+    if row is None:
+        db.add(Reconciliation(**keys, status=AWAITING, **values))
+        return
+    for k, v in values.items():
+        setattr(row, k, v)
+    if "status" not in values:
+        row.status = AWAITING if getattr(row, other_side) is None else PENDING
+
+
+def record_job(db, job_id: str, tenant_id: str | None, doc_type: str, result, meta: dict | None) -> int:
+    """Update the reconciliation rows `job_id` takes part in (caller commits). Returns rows touched."""
+    gstin = _extract_gstin_from_result(result)
+    period = period_of(result)
+    if not gstin or not period:
+        return 0
+    reconciliations = (meta or {}).get("reconciliations") or {}
+    # recon_type -> error of a reconciliation that raised
+    errors = (meta or {}).get("reconciliation_errors") or {}
+    touched = 0
+    for recon_type, (left, right) in RECON_SIDES.items():
+        if doc_type not in (left, right):
+            continue
+        side, other_side = ("left_job_id", "right_job_id") if doc_type == left else ("right_job_id", "left_job_id")
+        keys = {"tenant_id": tenant_id or "", "gstin": gstin, "period": period, "recon_type": recon_type}
+        values = {side: job_id, "computed_by_job_id": None, "summary": None, "result": None}
+        recon = reconciliations.get(recon_type)
+        if isinstance(recon, dict) and not _usable(
+            recon.get("paired_job_id") and db.get(Job, recon["paired_job_id"]),
+            right if doc_type == left else left, gstin, period,
+        ):
+            logger.info(f"Not storing {recon_type} of job {job_id}: its counterpart is not for {gstin} {period}")
+            recon = None
+        if isinstance(recon, dict):
+            summary, _ = _summarize(recon)
+            values.update({
+                other_side: recon.get("paired_job_id"),
+                "status": recon_status(recon) or "unknown",
+                "summary": summary,
+                "result": offload_result(job_id, recon, name=f"recon_{recon_type}"),
+                "computed_by_job_id": job_id,
+            })
+        elif recon_type in errors:
+            values["status"] = FAILED
+        _upsert(db, keys, values, other_side)
+        touched += 1
+    return touched
+
+
+def _usable(job, doc_type: str, gstin: str, period: str) -> bool:
+    """A finished `doc_type` job whose result is for this GSTIN and period."""
+    return (
+        job is not None
+        and job.doc_type == doc_type
+        and job.status in USABLE_JOB_STATUSES
+        and job.result is not None
+        and _extract_gstin_from_result(job.result) == gstin
+        and period_of(job.result) == period
+    )
+
+
+def counterpart_job(db, tenant_id: str | None, doc_type: str, gstin: str | None, month: int | None, year: int | None):
+    """
+    Latest recorded `doc_type` job for (tenant, GSTIN, period), by primary key lookups.
+
+    Returns None when no row knows one (e.g. jobs finished before rows were
+    recorded); callers then fall back to find_matching_job_by_gstin_and_period.
+    """
+    if not gstin or not month or not year:
+        return None
+    gstin = _normalize_gstin(gstin)
+    period = f"{int(year):04d}-{int(month):02d}"
+    for recon_type, (left, right) in RECON_SIDES.items():
+        if doc_type not in (left, right):
+            continue
+        row = db.get(Reconciliation, {"tenant_id": tenant_id or "", "gstin": gstin, "period": period, "recon_type": recon_type})
+        job_id = row and (row.left_job_id if doc_type == left else row.right_job_id)
+        if job_id:
+            job = db.get(Job, job_id)
+            if _usable(job, doc_type, gstin, period):
+                return job
+    return None
+
+
+def to_dict(row: Reconciliation, full: bool = False) -> dict:
+    return {
+        "recon_type": row.recon_type,
+        "gstin": row.gstin,
+        "period": row.period,
+        "status": row.status,
+        "left_job_id": row.left_job_id,
+        "right_job_id": row.right_job_id,
+        "computed_by_job_id": row.computed_by_job_id,
+        "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+        "summary": row.summary,
+        **({"result": hydrate_result(row.result)} if full else {}),
+    }
+
+
+def get_reconciliation(db, tenant_id: str | None, recon_type: str, gstin: str, period: str):
+    return db.get(Reconciliation, {"tenant_id": tenant_id or "", "gstin": gstin.strip().upper(), "period": period, "recon_type": recon_type})
+
+
+def list_reconciliations(db, tenant_id: str | None, gstin: str | None = None, period: str | None = None,
+                         recon_type: str | None = None, limit: int = 100):
+    stmt = select(Reconciliation).where(Reconciliation.tenant_id == (tenant_id or ""))
+    if gstin:
+        stmt = stmt.where(Reconciliation.gstin == gstin.strip().upper())
+    if period:
+        stmt = stmt.where(Reconciliation.period == period)
+    if recon_type:
+        stmt = stmt.where(Reconciliation.recon_type == recon_type)
+    stmt = stmt.order_by(Reconciliation.period.desc(), Reconciliation.recon_type).limit(limit)
+    return db.execute(stmt).scalars().all()
+
+
+def job_rows_stmt(job_id: str):
+    """Computed rows `job_id` is a side of."""
+    return select(Reconciliation).where(
+        or_(Reconciliation.left_job_id == job_id, Reconciliation.right_job_id == job_id),
+        Reconciliation.result.isnot(None),
+    )
+
+
+def reconciliations_for_job(db, job_id: str, hydrate: bool = True) -> dict:
+    """{recon_type: result} of the computed rows `job_id` is a side of."""
+    rows = db.execute(job_rows_stmt(job_id)).scalars().all()
+    return {row.recon_type: hydrate_result(row.result) if hydrate else row.result for row in rows}
+
+
+def job_reconciliations(db, job) -> dict:
+    """The job's meta["reconciliations"] overlaid with the latest rows it is a side of.
+
+    Covers the job that finished first, whose meta never saw its counterpart.
+    """
+    meta = hydrate_meta(job.meta) or {}
+    return {**(meta.get("reconciliations") or {}), **reconciliations_for_job(db, job.id)}
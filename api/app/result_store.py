@@ -0,0 +1,211 @@
+"""
+Offloading of large job payloads to object storage.
+
+Job.result and meta["text_content"] can reach several MB for bank
+statements, registers and GSTR layout text. Storing them inline makes every
+query that touches the jobs table slow, so payloads above a threshold are
+written compressed (zstd when available, otherwise gzip) through the
+storage layer and the row keeps only a small summary plus a pointer:
+
+    {
+        "doc_type": "sales_register",
+        "gstin": "...",                    # scalar / small fields are kept
+        "_offloaded": {
+            "key": "results/<job_id>/result.json.zst",
+            "codec": "zstd",
+            "size": 5242880,               # uncompressed bytes
+            "counts": {"entries": 12000},  # lengths of the dropped lists
+        },
+    }
+
+Readers call hydrate_result() / hydrate_meta() only when they need the full
+payload; listings can return the summary as-is. The stored canonical form
+(Job.canonical, see canonical_store.py) is offloaded the same way.
+
+The retention compactor (retention.py) goes one step further for old jobs:
+result and meta are written into shared compressed JSONL segments and the
+row keeps the same kind of summary with an `_archived` pointer
+(segment key + line). hydrate_result() / hydrate_meta() follow both kinds
+of pointer.
+
+Configuration (env vars):
+- RESULT_OFFLOAD_BYTES: offload results/text larger than this (default: 256 KB)
+- RESULT_SUMMARY_FIELD_BYTES: largest field kept inline in the summary (default: 2 KB)
+"""
+
+import gzip
+import json
+import logging
+import os
+from functools import lru_cache
+
+from .storage import get_file_from_s3, save_file_to_s3
+
+try:
+    import zstandard
+except ImportError:  # optional, falls back to gzip
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+RESULT_OFFLOAD_BYTES = int(os.getenv("RESULT_OFFLOAD_BYTES", str(256 * 1024)))
+RESULT_SUMMARY_FIELD_BYTES = int(os.getenv("RESULT_SUMMARY_FIELD_BYTES", "2048"))
+
+OFFLOAD_KEY = "_offloaded"
+ARCHIVE_KEY = "_archived"
+TEXT_CONTENT_KEY = "text_content"
+TEXT_CONTENT_REF_KEY = "text_content_ref"
+
+
+def _compress(raw: bytes) -> tuple[bytes, str]:
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=6).compress(raw), "zstd"
+    return gzip.compress(raw, compresslevel=6), "gzip"
+
+
+def _decompress(blob: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed results")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    if codec == "gzip":
+        return gzip.decompress(blob)
+    return blob
+
+
+def _put(key_prefix: str, raw: bytes) -> dict:
+    blob, codec = _compress(raw)
+    ext = ".zst" if codec == "zstd" else ".gz"
+    key = f"{key_prefix}{ext}"
+    save_file_to_s3(key, blob)
+    return {"key": key, "codec": codec, "size": len(raw)}
+
+
+def _get(pointer: dict) -> bytes:
+    return _decompress(get_file_from_s3(pointer["key"]), pointer.get("codec", "gzip"))
+
+
+def _summarize(result) -> tuple[dict, dict]:
+    """Keep scalars and small nested fields; drop lists and large values.
+
+    Returns (summary, counts) where counts holds the lengths of dropped lists.
+    """
+    summary: dict = {}
+    counts: dict = {}
+    if not isinstance(result, dict):
+        return summary, counts
+    for k, v in result.items():
+        if isinstance(v, list):
+            counts[k] = len(v)
+            continue
+        if isinstance(v, dict):
+            try:
+                if len(json.dumps(v, default=str)) > RESULT_SUMMARY_FIELD_BYTES:
+                    continue
+            except (TypeError, ValueError):
+                continue
+        elif isinstance(v, str) and len(v) > RESULT_SUMMARY_FIELD_BYTES:
+            continue
+        summary[k] = v
+    return summary, counts
+
+
+def offload_result(job_id: str, result, name: str = "result"):
+    """
+    Return what should be stored in Job.result.
+
+    Small results are returned unchanged; large ones are written to storage
+    (as results/<job_id>/<name>.json) and replaced by a summary with an
+    `_offloaded` pointer.
+    """
+    if result is None:
+        return None
+    raw = json.dumps(result, default=str).encode("utf-8")
+    if len(raw) <= RESULT_OFFLOAD_BYTES:
+        return result
+    summary, counts = _summarize(result)
+    pointer = _put(f"results/{job_id}/{name}.json", raw)
+    summary[OFFLOAD_KEY] = {**pointer, "counts": counts}
+    logger.info(f"Offloaded result for job {job_id}: {pointer['size']} bytes -> {pointer['key']}")
+    return summary
+
+
+def offload_meta(job_id: str, meta: dict | None) -> dict | None:
+    """Move a large meta["text_content"] to storage, leaving a pointer behind."""
+    if not isinstance(meta, dict):
+        return meta
+    text = meta.get(TEXT_CONTENT_KEY)
+    if not isinstance(text, str) or len(text) <= RESULT_OFFLOAD_BYTES:
+        return meta
+    meta = dict(meta)
+    meta[TEXT_CONTENT_REF_KEY] = _put(f"results/{job_id}/text_content.txt", text.encode("utf-8"))
+    del meta[TEXT_CONTENT_KEY]
+    return meta
+
+
+def is_offloaded(result) -> bool:
+    return isinstance(result, dict) and "key" in (result.get(OFFLOAD_KEY) or {})
+
+
+def is_archived(payload) -> bool:
+    return isinstance(payload, dict) and ARCHIVE_KEY in payload
+
+
+def offloaded_keys(result, meta) -> list[str]:
+    """Storage keys of a job's individually offloaded payloads."""
+    keys = []
+    if is_offloaded(result):
+        keys.append(result[OFFLOAD_KEY]["key"])
+    if isinstance(meta, dict) and TEXT_CONTENT_REF_KEY in meta:
+        keys.append(meta[TEXT_CONTENT_REF_KEY]["key"])
+    return keys
+
+
+def write_segment(key_prefix: str, records: list[dict]) -> dict:
+    """Write records as one compressed JSONL segment. Returns {key, codec, size}."""
+    raw = b"".join(json.dumps(r, default=str).encode("utf-8") + b"\n" for r in records)
+    return _put(f"{key_prefix}.jsonl", raw)
+
+
+@lru_cache(maxsize=4)
+def _segment_lines(key: str, codec: str) -> tuple[bytes, ...]:
+    # Segments are immutable, so recently read ones can be kept decoded
+    return tuple(_decompress(get_file_from_s3(key), codec).splitlines())
+
+
+def _archived_record(pointer: dict) -> dict:
+    return json.loads(_segment_lines(pointer["key"], pointer.get("codec", "gzip"))[pointer["line"]])
+
+
+def archived_result_summary(result, pointer: dict, line: int) -> dict:
+    """Thin Job.result left behind after archiving into segment `pointer` at `line`."""
+    summary, counts = _summarize(result)
+    summary[ARCHIVE_KEY] = {"key": pointer["key"], "codec": pointer["codec"], "line": line, "counts": counts}
+    return summary
+
+
+def archived_meta_summary(meta, pointer: dict, line: int) -> dict:
+    """Thin Job.meta left behind after archiving (small fields only)."""
+    summary, _ = _summarize({k: v for k, v in (meta or {}).items() if k not in (TEXT_CONTENT_KEY, TEXT_CONTENT_REF_KEY)})
+    summary[ARCHIVE_KEY] = {"key": pointer["key"], "codec": pointer["codec"], "line": line}
+    return summary
+
+
+def hydrate_result(result):
+    """Return the full result, fetching it from storage if it was offloaded or archived."""
+    if is_archived(result):
+        return _archived_record(result[ARCHIVE_KEY]).get("result")
+    if not is_offloaded(result):
+        return result
+    return json.loads(_get(result[OFFLOAD_KEY]))
+
+
+def hydrate_meta(meta):
+    """Return meta with text_content restored if it was offloaded or archived."""
+    if is_archived(meta):
+        return _archived_record(meta[ARCHIVE_KEY]).get("meta")
+    if not isinstance(meta, dict) or TEXT_CONTENT_REF_KEY not in meta:
+        return meta
+    meta = dict(meta)
+    meta[TEXT_CONTENT_KEY] = _get(meta.pop(TEXT_CONTENT_REF_KEY)).decode("utf-8")
+    return meta
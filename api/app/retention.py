@@ -0,0 +1,282 @@
+"""
+Retention, archival and compaction for uploads and job payloads.
+
+Per-tenant policies live in the retention_policies table; a NULL column
+falls back to the RETENTION_* env defaults and 0 disables that step for the
+tenant. The compactor:
+
+1. deletes raw uploads (Job.object_key) of finished jobs older than
+   upload_days and stamps Job.upload_deleted_at,
+2. archives result/meta of finished jobs older than archive_days into
+   compressed JSONL segments (archive/<tenant>/<YYYY-MM>/<segment>.jsonl.zst),
+   one line per job, and leaves a thin summary with an `_archived` pointer
+   in the row (see result_store). Payloads that were offloaded individually
+   are folded into the segment and their blobs removed. The stored
+   canonical form is dropped too and rebuilt on demand (canonical_store).
+
+Storage calls and row updates go through a rate limiter so a run does not
+compete with parse traffic for storage or database bandwidth. Rows are
+written without bumping Job.updated_at, which orders counterpart matching
+(db.get_latest_job_by_doc_type and friends).
+
+Configuration (env vars):
+- RETENTION_UPLOAD_DAYS: default days to keep raw uploads (default: unset, keep forever)
+- RETENTION_ARCHIVE_DAYS: default days before archiving payloads (default: unset, never)
+- RETENTION_SEGMENT_SIZE: jobs per archive segment (default: 500)
+- RETENTION_MAX_OPS_PER_SEC: storage/database operations per second (default: 20)
+- RETENTION_INTERVAL: seconds between compactor runs in the API (default: 3600, 0 disables)
+
+Run standalone with: python -m app.retention [--once]
+"""
+
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+
+from .db import SessionLocal, Job, RetentionPolicy
+from .result_store import (
+    archived_meta_summary,
+    archived_result_summary,
+    hydrate_meta,
+    hydrate_result,
+    is_archived,
+    offloaded_keys,
+    write_segment,
+)
+from .canonical_store import canonical_keys
+from .storage import delete_file_from_s3
+
+logger = logging.getLogger(__name__)
+
+
+def _env_days(name: str) -> int | None:
+    value = os.getenv(name, "").strip()
+    return int(value) if value else None
+
+
+RETENTION_UPLOAD_DAYS = _env_days("RETENTION_UPLOAD_DAYS")
+RETENTION_ARCHIVE_DAYS = _env_days("RETENTION_ARCHIVE_DAYS")
+RETENTION_SEGMENT_SIZE = int(os.getenv("RETENTION_SEGMENT_SIZE", "500"))
+RETENTION_MAX_OPS_PER_SEC = float(os.getenv("RETENTION_MAX_OPS_PER_SEC", "20"))
+RETENTION_INTERVAL = int(os.getenv("RETENTION_INTERVAL", "3600"))
+
+FINISHED = ("succeeded", "needs_review", "failed")
+
+
+class RateLimiter:
+    """Spaces out operations to at most `per_sec` per second (<= 0 disables)."""
+
+    def __init__(self, per_sec: float = RETENTION_MAX_OPS_PER_SEC):
+        self.interval = 1.0 / per_sec if per_sec > 0 else 0.0
+        self._next = 0.0
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self._next > now:
+            time.sleep(self._next - now)
+            now = self._next
+        self._next = now + self.interval
+
+
+def get_policies(db) -> dict[str, tuple[int | None, int | None]]:
+    """tenant_id -> (upload_days, archive_days) for tenants with an explicit policy."""
+    return {
+        p.tenant_id: (p.upload_days, p.archive_days)
+        for p in db.execute(select(RetentionPolicy)).scalars()
+    }
+
+
+def set_policy(db, tenant_id: str, upload_days: int | None, archive_days: int | None) -> RetentionPolicy:
+    policy = db.get(RetentionPolicy, tenant_id)
+    if policy is None:
+        policy = RetentionPolicy(tenant_id=tenant_id)
+        db.add(policy)
+    policy.upload_days = upload_days
+    policy.archive_days = archive_days
+    db.commit()
+    db.refresh(policy)
+    return policy
+
+
+def effective_policy(policies: dict, tenant_id: str) -> tuple[int | None, int | None]:
+    upload_days, archive_days = policies.get(tenant_id, (None, None))
+    return (
+        RETENTION_UPLOAD_DAYS if upload_days is None else upload_days,
+        RETENTION_ARCHIVE_DAYS if archive_days is None else archive_days,
+    )
+
+
+def _claim(db, query):
+    """Lock selected rows on PostgreSQL so concurrent compactors skip each other's work."""
+    if db.bind.dialect.name == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+    return db.execute(query).scalars().all()
+
+
+def _tenants(db, *conditions) -> list[str]:
+    return list(db.execute(select(Job.tenant_id).where(*conditions).distinct()).scalars())
+
+
+def delete_expired_uploads(db, policies: dict, now: datetime, limiter: RateLimiter, limit: int = 1000) -> int:
+    pending = (Job.upload_deleted_at.is_(None), Job.status.in_(FINISHED), Job.object_key.isnot(None))
+    deleted = 0
+    for tenant_id in _tenants(db, *pending):
+        days, _ = effective_policy(policies, tenant_id)
+        if not days:
+            continue
+        jobs = _claim(db, (
+            select(Job)
+            .where(*pending, Job.tenant_id == tenant_id, Job.created_at < now - timedelta(days=days))
+            .order_by(Job.created_at)
+            .limit(limit - deleted)
+        ))
+        done = []
+        for job in jobs:
+            limiter.wait()
+            try:
+                delete_file_from_s3(job.object_key)
+            except Exception as e:
+                logger.warning(f"Retention: could not delete upload {job.object_key}: {e}")
+                continue
+            done.append(job.id)
+        if done:
+            _update(db, Job.id.in_(done), upload_deleted_at=now)
+            deleted += len(done)
+        db.commit()
+        if deleted >= limit:
+            break
+    return deleted
+
+
+def archive_old_jobs(
+    db, policies: dict, now: datetime, limiter: RateLimiter, segment_size: int = RETENTION_SEGMENT_SIZE, max_segments: int = 10
+) -> int:
+    pending = (Job.archived_at.is_(None), Job.status.in_(FINISHED))
+    archived = 0
+    segments = 0
+    for tenant_id in _tenants(db, *pending):
+        _, days = effective_policy(policies, tenant_id)
+        if not days:
+            continue
+        while segments < max_segments:
+            jobs = _claim(db, (
+                select(Job)
+                .where(*pending, Job.tenant_id == tenant_id, Job.created_at < now - timedelta(days=days))
+                .order_by(Job.created_at)
+                .limit(segment_size)
+            ))
+            if not jobs:
+                break
+            archived += _archive_segment(db, tenant_id, jobs, now, limiter)
+            segments += 1
+    return archived
+
+
+def _update(db, condition, **values) -> None:
+    # updated_at=Job.updated_at: the onupdate default would make old jobs the latest
+    db.execute(update(Job).where(condition).values(**values, updated_at=Job.updated_at))
+
+
+def _archive_segment(db, tenant_id: str, jobs: list, now: datetime, limiter: RateLimiter) -> int:
+    records, stale_keys = [], []
+    for job in jobs:
+        if is_archived(job.result) or is_archived(job.meta):
+            continue
+        limiter.wait()
+        records.append({
+            "job_id": job.id,
+            "tenant_id": job.tenant_id,
+            "doc_type": job.doc_type,
+            "status": job.status,
+            "filename": job.filename,
+            "created_at": job.created_at,
+            "result": hydrate_result(job.result),
+            "meta": hydrate_meta(job.meta),
+        })
+        stale_keys.extend(offloaded_keys(job.result, job.meta))
+        stale_keys.extend(canonical_keys(job.canonical))
+
+    if records:
+        month = (jobs[0].created_at or now).strftime("%Y-%m")
+        limiter.wait()
+        pointer = write_segment(f"archive/{tenant_id or '_'}/{month}/{uuid.uuid4().hex[:16]}", records)
+        for line, record in enumerate(records):
+            _update(
+                db, Job.id == record["job_id"],
+                result=archived_result_summary(record["result"], pointer, line),
+                meta=archived_meta_summary(record["meta"], pointer, line),
+                # Rebuilt from the archived result on next canonical read (canonical_store.py)
+                canonical=None,
+            )
+        logger.info(f"Retention: archived {len(records)} jobs of tenant {tenant_id!r} to {pointer['key']}")
+
+    _update(db, Job.id.in_([job.id for job in jobs]), archived_at=now)
+    db.commit()
+
+    # Only drop the individual blobs once the rows point at the segment
+    for key in stale_keys:
+        limiter.wait()
+        try:
+            delete_file_from_s3(key)
+        except Exception as e:
+            logger.warning(f"Retention: could not delete offloaded payload {key}: {e}")
+    return len(records)
+
+
+def run_compactor(db=None, now: datetime | None = None, limiter: RateLimiter | None = None) -> dict:
+    """One retention pass. Returns counts of deleted uploads and archived jobs."""
+    if db is None:
+        with SessionLocal() as dbs:
+            return run_compactor(dbs, now, limiter)
+    now = now or datetime.now(timezone.utc)
+    limiter = limiter or RateLimiter()
+    policies = get_policies(db)
+    stats = {
+        "uploads_deleted": delete_expired_uploads(db, policies, now, limiter),
+        "jobs_archived": archive_old_jobs(db, policies, now, limiter),
+    }
+    if any(stats.values()):
+        logger.info(f"Retention pass: {stats}")
+    return stats
+
+
+def retention_configured(db=None) -> bool:
+    """True when env defaults or any tenant policy ask for deletion/archival."""
+    if RETENTION_UPLOAD_DAYS or RETENTION_ARCHIVE_DAYS:
+        return True
+    if db is None:
+        with SessionLocal() as dbs:
+            return retention_configured(dbs)
+    try:
+        return any(u or a for u, a in get_policies(db).values())
+    except Exception:  # table not created yet
+        db.rollback()
+        return False
+
+
+def run_forever(interval: int = RETENTION_INTERVAL) -> None:
+    while True:
+        try:
+            run_compactor()
+        except Exception as e:
+            logger.error(f"Retention pass failed: {e}", exc_info=True)
+        time.sleep(max(60, interval))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Delete expired uploads and archive old job payloads")
+    parser.add_argument("--once", action="store_true", help="Run one pass and exit")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.once:
+        print(run_compactor())
+    else:
+        run_forever()
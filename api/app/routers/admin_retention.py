@@ -0,0 +1,42 @@
+"""Admin-only endpoints for per-tenant retention policies"""
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from ..retention import effective_policy, get_policies, set_policy
+from .admin_api_keys import get_db, require_admin_token
+
+router = APIRouter(prefix="/admin/retention", tags=["admin-retention"])
+
+class RetentionPolicyBody(BaseModel):
+    upload_days: Optional[int] = Field(None, ge=0, description="Delete raw uploads after N days (null: env default, 0: keep)")
+    archive_days: Optional[int] = Field(None, ge=0, description="Archive job payloads after N days (null: env default, 0: never)")
+
+def _policy_response(tenant_id: str, policies: dict) -> dict:
+    upload_days, archive_days = policies.get(tenant_id, (None, None))
+    effective_upload, effective_archive = effective_policy(policies, tenant_id)
+    return {
+        "tenant_id": tenant_id,
+        "upload_days": upload_days,
+        "archive_days": archive_days,
+        "effective": {"upload_days": effective_upload, "archive_days": effective_archive},
+    }
+
+@router.get("/{tenant_id}", summary="Get a tenant's retention policy (admin only)")
+def get_retention_policy(
+    tenant_id: str,
+    db: Session = Depends(get_db),
+    _: None = Depends(require_admin_token),
+):
+    return _policy_response(tenant_id, get_policies(db))
+
+@router.put("/{tenant_id}", summary="Set a tenant's retention policy (admin only)")
+def put_retention_policy(
+    tenant_id: str,
+    body: RetentionPolicyBody,
+    db: Session = Depends(get_db),
+    _: None = Depends(require_admin_token),
+):
+    set_policy(db, tenant_id, body.upload_days, body.archive_days)
+    return _policy_response(tenant_id, get_policies(db))
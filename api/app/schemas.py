@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 class JobResponse(BaseModel):
     job_id: str
@@ -15,3 +15,20 @@ class UsageResponse(BaseModel):
     month: str
     docs_parsed: int
     ocr_pages: int
+    bytes_processed: int = 0
+    by_doc_type: Dict[str, Dict[str, int]] = {}
+
+class DailyUsage(BaseModel):
+    day: str
+    docs_parsed: int
+    ocr_pages: int
+    bytes_processed: int
+
+class DailyUsageResponse(BaseModel):
+    start: str
+    end: str
+    days: List[DailyUsage]
+
+class FyReconRequest(BaseModel):
+    gstin: str
+    fy: str  # e.g. "2025-26"
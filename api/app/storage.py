@@ -90,6 +90,26 @@ def get_file_from_s3(key: str) -> bytes:
     with open(file_path, 'rb') as f:
         return f.read()
     
+def delete_file_from_s3(key: str) -> bool:
+    """Delete a file from storage (S3 and/or local filesystem). Returns True if anything was removed."""
+    removed = False
+    if USE_S3 and s3:
+        try:
+            s3.delete_object(Bucket=S3_BUCKET, Key=key)
+            removed = True
+        except Exception as e:
+            import logging
+            logging.warning(f"S3 delete failed for {key}: {e}")
+
+    # Uploads may have landed locally via the S3 fallback
+    file_path = LOCAL_STORAGE_DIR / key
+    try:
+        file_path.unlink()
+        removed = True
+    except FileNotFoundError:
+        pass
+    return removed
+
 # add near the bottom of storage.py
 def ensure_bucket():
     """Ensure storage is ready (S3 bucket or local directory). Returns True if successful."""
@@ -1,6 +1,7 @@
 from rq import Queue
 from rq import Retry
-from .worker import parse_job_task
+from .worker import parse_job_task, fy_reconciliation_task, fail_lost_job
+from .embedded_queue import EmbeddedQueue
 
 def enqueue_parse(q: Queue, job_id: str):
     q.enqueue(
@@ -10,3 +11,21 @@ def enqueue_parse(q: Queue, job_id: str):
         retry=Retry(max=2, interval=[10, 60])  # 2 retries at 10s and 60s
     )
 
+def create_embedded_queue() -> EmbeddedQueue:
+    """The in-process pool; jobs lost to a dead worker process are marked failed."""
+    return EmbeddedQueue(on_lost=fail_lost_job)
+
+def enqueue_parse_embedded(eq: EmbeddedQueue, job_id: str):
+    """Run the parse on the in-process pool (used when Redis is not configured)."""
+    return eq.submit(parse_job_task, job_id)
+
+def enqueue_fy_reconciliation(q: Queue, job_id: str):
+    q.enqueue(
+        fy_reconciliation_task,
+        job_id,
+        job_timeout=900,  # twelve months of registers and returns
+        retry=Retry(max=1, interval=[60])
+    )
+
+def enqueue_fy_reconciliation_embedded(eq: EmbeddedQueue, job_id: str):
+    return eq.submit(fy_reconciliation_task, job_id)
@@ -0,0 +1,107 @@
+"""
+Usage accounting for finished jobs.
+
+record_job_usage() runs inside the job's terminal transaction (see
+job_state.finish). It appends a UsageEvent to the billing ledger, which
+billing/usage_flusher.py reports to Stripe. It also bumps the per-tenant
+daily and monthly rollups with an upsert. /v1/usage and the dashboard
+charts read a handful of rollup rows instead of scanning jobs, so they cost
+the same whatever the tenant's history size.
+"""
+
+from datetime import date, datetime, timezone
+
+from sqlalchemy import func, select
+
+from .db import UsageDaily, UsageEvent, UsageMonthly
+
+METRICS = ("docs_parsed", "ocr_pages", "bytes_processed")
+
+
+def usage_from_meta(meta: dict | None, size_bytes: int = 0) -> dict:
+    """Usage of one parsed document from its parse meta."""
+    meta = meta if isinstance(meta, dict) else {}
+    ocr_pages = meta.get("ocr_pages")
+    if ocr_pages is None:
+        ocr_pages = int(meta.get("pages") or 1) if meta.get("ocr_used") else 0
+    return {"quantity": 1, "ocr_pages": int(ocr_pages), "bytes_processed": int(size_bytes or 0)}
+
+
+def _upsert(db, model, keys: dict, metrics: dict) -> None:
+    """INSERT the rollup row or add `metrics` to the existing one."""
+    dialect = db.bind.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(model).values(**keys, **metrics)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={k: getattr(model, k) + getattr(stmt.excluded, k) for k in metrics},
+        )
+        db.execute(stmt)
+        return
+    row = db.get(model, keys)
+    if row is None:
+        db.add(model(**keys, **metrics))
+    else:
+        for k, v in metrics.items():
+            setattr(row, k, (getattr(row, k) or 0) + v)
+
+
+def record_job_usage(db, job, usage: dict, when: datetime | None = None) -> None:
+    """Ledger event + rollup increments for a finished job (caller commits)."""
+    quantity = int(usage.get("quantity", 1))
+    ocr_pages = int(usage.get("ocr_pages", 0))
+    size = int(usage.get("bytes_processed", 0))
+    tenant_id = job.tenant_id or ""
+    api_key = job.api_key or ""
+    doc_type = job.doc_type or ""
+
+    db.add(UsageEvent(
+        job_id=job.id,
+        tenant_id=tenant_id,
+        api_key=api_key,
+        quantity=quantity,
+        doc_type=doc_type,
+        ocr_pages=ocr_pages,
+        bytes_processed=size,
+    ))
+
+    day = (when or datetime.now(timezone.utc)).date()
+    base = {"tenant_id": tenant_id, "api_key": api_key, "doc_type": doc_type}
+    metrics = {"docs_parsed": quantity, "ocr_pages": ocr_pages, "bytes_processed": size}
+    _upsert(db, UsageDaily, {**base, "day": day}, metrics)
+    _upsert(db, UsageMonthly, {**base, "month": day.strftime("%Y-%m")}, metrics)
+
+
+def _sums(model):
+    return [func.coalesce(func.sum(getattr(model, k)), 0).label(k) for k in METRICS]
+
+
+def get_monthly_usage(db, tenant_id: str, month: str) -> dict:
+    """Totals and per-doc_type breakdown for one 'YYYY-MM' month."""
+    rows = db.execute(
+        select(UsageMonthly.doc_type, *_sums(UsageMonthly))
+        .where(UsageMonthly.tenant_id == (tenant_id or ""), UsageMonthly.month == month)
+        .group_by(UsageMonthly.doc_type)
+    ).all()
+    out = {"month": month, **{k: 0 for k in METRICS}, "by_doc_type": {}}
+    for row in rows:
+        counts = {k: int(getattr(row, k)) for k in METRICS}
+        out["by_doc_type"][row.doc_type or "unknown"] = counts
+        for k in METRICS:
+            out[k] += counts[k]
+    return out
+
+
+def get_daily_usage(db, tenant_id: str, start: date, end: date) -> list[dict]:
+    """One entry per day with usage in [start, end], oldest first."""
+    rows = db.execute(
+        select(UsageDaily.day, *_sums(UsageDaily))
+        .where(UsageDaily.tenant_id == (tenant_id or ""), UsageDaily.day.between(start, end))
+        .group_by(UsageDaily.day)
+        .order_by(UsageDaily.day)
+    ).all()
+    return [{"day": row.day.isoformat(), **{k: int(getattr(row, k)) for k in METRICS}} for row in rows]
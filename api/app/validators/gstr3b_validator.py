@@ -7,13 +7,7 @@ Returns structured validation issues with codes, levels, and metadata.
 
 from typing import Dict, Any, List
 
-
-def _f(x: Any) -> float:
-    """Safely convert value to float."""
-    try:
-        return float(x or 0.0)
-    except Exception:
-        return 0.0
+from ..entry_table import validate_canonical_totals
 
 
 def validate_gstr3b(doc: Dict[str, Any], tolerance: float = 1.0) -> List[Dict[str, Any]]:
@@ -35,52 +29,18 @@ def validate_gstr3b(doc: Dict[str, Any], tolerance: float = 1.0) -> List[Dict[st
             "meta": {...}
         }
     """
-    issues: List[Dict[str, Any]] = []
-    
-    financials = doc.get("financials") or {}
-    entries = doc.get("entries") or []
-    
-    subtotal_canon = _f(financials.get("subtotal"))
-    tb = financials.get("tax_breakup") or {}
-    cgst_canon = _f(tb.get("cgst"))
-    sgst_canon = _f(tb.get("sgst"))
-    igst_canon = _f(tb.get("igst"))
-    cess_canon = _f(tb.get("cess"))
-    tax_total_canon = _f(financials.get("tax_total"))
-    grand_total_canon = _f(financials.get("grand_total"))
+    table, fin, issues = validate_canonical_totals(doc, tolerance)
+    subtotal_canon = fin["subtotal"]
+    tax_total_canon = fin["tax_total"]
+    grand_total_canon = fin["grand_total"]
     
     # Aggregate from entries (OUTWARD + REVERSE_CHARGE)
-    subtotal_calc = 0.0
-    cgst_calc = sgst_calc = igst_calc = cess_calc = 0.0
-    grand_total_calc = 0.0
-    
-    for e in entries:
-        amounts = e.get("amounts") or {}
-        taxable = _f(amounts.get("taxable_value"))
-        tax_b = amounts.get("tax_breakup") or {}
-        cg = _f(tax_b.get("cgst"))
-        sg = _f(tax_b.get("sgst"))
-        ig = _f(tax_b.get("igst"))
-        ce = _f(tax_b.get("cess"))
-        total = _f(amounts.get("total"))
-        
-        subtotal_calc += taxable
-        cgst_calc += cg
-        sgst_calc += sg
-        igst_calc += ig
-        cess_calc += ce
-        grand_total_calc += total
-        
-        expected_total = taxable + cg + sg + ig + ce
-        if abs(total - expected_total) > tolerance:
-            issues.append({
-                "code": "ENTRY_TOTAL_MISMATCH",
-                "level": "warning",
-                "message": (
-                    f"Entry {e.get('entry_id')} total {total} != taxable+tax {expected_total}"
-                ),
-                "meta": {"entry_id": e.get("entry_id")},
-            })
+    sums = table.totals(digits=None)
+    subtotal_calc = sums["taxable_value"]
+    cgst_calc = sums["cgst"]
+    sgst_calc = sums["sgst"]
+    igst_calc = sums["igst"]
+    cess_calc = sums["cess"]
     
     if abs(subtotal_canon - subtotal_calc) > tolerance:
         issues.append({
@@ -1,111 +1,130 @@
 from .db import (
     SessionLocal,
-    get_job_by_id,
-    update_job_status,
-    get_metered_item_for_tenant,
     get_latest_job_by_doc_type,
     find_matching_job_by_gstin_and_period,
+    find_jobs_by_gstin_and_periods,
 )
 # Import helper functions for GSTIN and period extraction
 from .db import _normalize_gstin, _extract_gstin_from_result, _extract_period_from_result
 from .storage import get_file_from_s3
+from .result_store import hydrate_result, offload_meta, offload_result
 from .parsers.invoice import parse_bytes_to_result
-from .billing.stripe_billing import record_usage
 from .parsers.router import parse_any
 from .parsers.common import extract_text_safely, extract_text_with_layout
 from .parsers.gstr3b import normalize_gstr3b
 from .recon.purchase_vs_gstr3b import reconcile_pr_vs_gstr3b_itc
+from .recon.purchase_vs_gstr2b import reconcile_purchase_register_vs_gstr2b
 from .parsers.gstr1 import normalize_gstr1
 from .recon.sales_vs_gstr1 import reconcile_sales_register_vs_gstr1
 from .recon.itc_2b_3b import reconcile_itc_2b_3b
+from .recon.fy_recon import FY_DOC_TYPES, fy_periods, reconcile_financial_year
 from .parsers.canonical import normalize_to_canonical
+from .canonical_store import build_canonical, load_canonical
+from . import job_state, recon_store
+from .usage import usage_from_meta
 
 import json
 import logging
 logger = logging.getLogger(__name__)
 
 
+def _find_counterpart(dbs, tenant_id: str, doc_type: str, gstin, month, year):
+    """Counterpart job from the reconciliations table (primary key lookup), else by scanning jobs."""
+    return (
+        recon_store.counterpart_job(dbs, tenant_id, doc_type, gstin, month, year)
+        or find_matching_job_by_gstin_and_period(dbs, tenant_id, doc_type, gstin, month, year)
+    )
+
+
+def _counterpart(dbs, tenant_id: str | None, doc_type: str, other_doc_type: str, result: dict, hydrate: bool = True):
+    """
+    The `other_doc_type` job to reconcile this `doc_type` document with, and its result.
+
+    Matched on the document's GSTIN and period (recon_store first, then a
+    scan of jobs); otherwise the tenant's latest succeeded `other_doc_type`
+    job, including jobs uploaded without a tenant. Returns (job, payload),
+    (None, None) when there is none; `hydrate=False` skips loading an
+    offloaded result.
+    """
+    search_tenant_id = tenant_id or ""
+    gstin = _extract_gstin_from_result(result)
+    month, year = _extract_period_from_result(result)
+    logger.info(f"Looking for {other_doc_type} job matching {doc_type} GSTIN={gstin}, period={month}/{year}")
+
+    other_job = None
+    if gstin and month and year:
+        other_job = _find_counterpart(dbs, search_tenant_id, other_doc_type, gstin, month, year)
+    if not other_job:
+        logger.info(f"No {other_doc_type} for this GSTIN/period, falling back to the latest {other_doc_type} job")
+        other_job = get_latest_job_by_doc_type(dbs, search_tenant_id, other_doc_type)
+    if not other_job:
+        logger.warning(f"No matching {other_doc_type} found for {doc_type} (GSTIN={gstin}, period={month}/{year})")
+        return None, None
+
+    other_month, other_year = _extract_period_from_result(other_job.result)
+    logger.info(f"Found {other_doc_type} job {other_job.id} (GSTIN={_extract_gstin_from_result(other_job.result)}, period={other_month}/{other_year})")
+    return other_job, (hydrate_result(other_job.result) if hydrate else other_job.result)
+
+
 def _attach_purchase_vs_gstr3b_recon(
     dbs, tenant_id: str | None, doc_type: str, result, meta: dict
 ):
     if not isinstance(result, dict):
         return
-
-    # Use tenant_id if available, otherwise use empty string to match all jobs (for development)
-    search_tenant_id = tenant_id if tenant_id else ""
-
-    # Extract GSTIN and period from current document for smart matching
-    source_gstin = _extract_gstin_from_result(result)
-    source_period_month, source_period_year = _extract_period_from_result(result)
-    
-    logger.info(f"Purchase vs GSTR-3B reconciliation: source_gstin={source_gstin}, period={source_period_month}/{source_period_year}")
-    
-    other_job = None
-    if doc_type == "purchase_register":
-        logger.info(f"Looking for GSTR-3B job matching GSTIN={source_gstin}, period={source_period_month}/{source_period_year}")
-        # Use smart matching: find by GSTIN and period
-        if source_gstin and source_period_month and source_period_year:
-            other_job = find_matching_job_by_gstin_and_period(
-                dbs, search_tenant_id, "gstr3b",
-                source_gstin, source_period_month, source_period_year
-            )
-        # Fallback to simple doc_type matching if no GSTIN/period
-        if not other_job:
-            logger.info("Falling back to simple doc_type matching (no GSTIN/period available)")
-            other_job = get_latest_job_by_doc_type(dbs, search_tenant_id, "gstr3b")
-        
-        pr_payload = result
-        g3b_payload = getattr(other_job, "result", None) if other_job else None
-        if other_job:
-            other_gstin = _extract_gstin_from_result(other_job.result)
-            other_period = _extract_period_from_result(other_job.result)
-            logger.info(f"Found GSTR-3B job {other_job.id} (GSTIN={other_gstin}, period={other_period[0]}/{other_period[1]})")
-        else:
-            logger.warning(f"No matching GSTR-3B found for purchase_register (GSTIN={source_gstin}, period={source_period_month}/{source_period_year})")
-    elif doc_type == "gstr3b":
-        logger.info(f"Looking for purchase_register job matching GSTIN={source_gstin}, period={source_period_month}/{source_period_year}")
-        # Use smart matching: find by GSTIN and period
-        if source_gstin and source_period_month and source_period_year:
-            other_job = find_matching_job_by_gstin_and_period(
-                dbs, search_tenant_id, "purchase_register",
-                source_gstin, source_period_month, source_period_year
-            )
-        # Fallback to simple doc_type matching if no GSTIN/period
-        if not other_job:
-            logger.info("Falling back to simple doc_type matching (no GSTIN/period available)")
-            other_job = get_latest_job_by_doc_type(dbs, search_tenant_id, "purchase_register")
-        
-        pr_payload = getattr(other_job, "result", None) if other_job else None
-        g3b_payload = result
-        if other_job:
-            other_gstin = _extract_gstin_from_result(other_job.result)
-            other_period = _extract_period_from_result(other_job.result)
-            logger.info(f"Found purchase_register job {other_job.id} (GSTIN={other_gstin}, period={other_period[0]}/{other_period[1]})")
-        else:
-            logger.warning(f"No matching purchase_register found for GSTR-3B (GSTIN={source_gstin}, period={source_period_month}/{source_period_year})")
-    else:
+    pairs_with = {"purchase_register": "gstr3b", "gstr3b": "purchase_register"}
+    other_doc_type = pairs_with.get(doc_type)
+    if not other_doc_type:
         return
 
-    if not pr_payload or not g3b_payload:
-        logger.debug(f"Missing payloads for purchase vs GSTR-3B reconciliation: pr={bool(pr_payload)}, g3b={bool(g3b_payload)}")
+    other_job, other_payload = _counterpart(dbs, tenant_id, doc_type, other_doc_type, result)
+    if not other_payload:
         return
+    pr_payload, g3b_payload = (result, other_payload) if doc_type == "purchase_register" else (other_payload, result)
 
     try:
         recon = reconcile_pr_vs_gstr3b_itc(pr_payload, g3b_payload)
-        if other_job:
-            recon["paired_job_id"] = other_job.id
-            recon["source_purchase_register_job_id"] = other_job.id if doc_type == "gstr3b" else None
-            recon["source_purchase_register_filename"] = getattr(other_job, "filename", None) if doc_type == "gstr3b" else None
+        recon["paired_job_id"] = other_job.id
+        recon["source_purchase_register_job_id"] = other_job.id if doc_type == "gstr3b" else None
+        recon["source_purchase_register_filename"] = getattr(other_job, "filename", None) if doc_type == "gstr3b" else None
         recon["source_doc_type"] = doc_type
         meta.setdefault("reconciliations", {})["purchase_vs_gstr3b_itc"] = recon
         logger.info(f"Purchase vs GSTR-3B reconciliation attached for doc_type={doc_type}, tenant_id={tenant_id}")
     except Exception as exc:  # noqa: BLE001
         logger.warning(f"Purchase vs GSTR-3B reconciliation failed: {exc}")
-        meta.setdefault("reconciliation_errors", []).append(str(exc))
+        meta.setdefault("reconciliation_errors", {})["purchase_vs_gstr3b_itc"] = str(exc)
 
 
-def _attach_itc_2b_3b_recon(
+def _attach_purchase_vs_gstr2b_recon(
     dbs, tenant_id: str | None, doc_type: str, result, meta: dict
+):
+    """Attach invoice-level ITC matching of purchase register entries against GSTR-2B b2b rows."""
+    if not isinstance(result, dict):
+        return
+    pairs_with = {"purchase_register": "gstr2b", "gstr2b": "purchase_register"}
+    other_doc_type = pairs_with.get(doc_type)
+    if not other_doc_type:
+        return
+
+    other_job, other_payload = _counterpart(dbs, tenant_id, doc_type, other_doc_type, result)
+    if not other_payload:
+        return
+    pr_payload, g2b_payload = (result, other_payload) if doc_type == "purchase_register" else (other_payload, result)
+
+    try:
+        recon = reconcile_purchase_register_vs_gstr2b(pr_payload, g2b_payload)
+        recon["paired_job_id"] = other_job.id
+        recon["source_purchase_register_job_id"] = other_job.id if doc_type == "gstr2b" else None
+        recon["source_gstr2b_job_id"] = other_job.id if doc_type == "purchase_register" else None
+        recon["source_doc_type"] = doc_type
+        meta.setdefault("reconciliations", {})["purchase_vs_gstr2b"] = recon
+        logger.info(f"Purchase vs GSTR-2B reconciliation attached for doc_type={doc_type}: {recon['summary']}")
+    except Exception as exc:  # noqa: BLE001
+        logger.warning(f"Purchase vs GSTR-2B reconciliation failed: {exc}")
+        meta.setdefault("reconciliation_errors", {})["purchase_vs_gstr2b"] = str(exc)
+
+
+def _attach_itc_2b_3b_recon(
+    dbs, tenant_id: str | None, doc_type: str, result, meta: dict, canonical: dict | None = None
 ):
     """
     Attach ITC reconciliation (GSTR-2B vs GSTR-3B) using canonical format.
@@ -113,87 +132,36 @@ def _attach_itc_2b_3b_recon(
     This reconciliation compares:
     - GSTR-2B: ITC available (from financials.tax_breakup)
     - GSTR-3B: ITC claimed (from doc_specific.input_tax_credit.total)
+
+    `canonical` is this document's canonical form when already computed; the
+    counterpart's comes from its stored canonical form (canonical_store).
     """
     if not isinstance(result, dict):
         return
-    
-    # Only process if this is a GSTR-2B or GSTR-3B document
-    if doc_type not in ("gstr2b", "gstr3b"):
+    pairs_with = {"gstr2b": "gstr3b", "gstr3b": "gstr2b"}
+    other_doc_type = pairs_with.get(doc_type)
+    if not other_doc_type:
         return
-    
-    # Use tenant_id if available, otherwise use empty string to match all jobs (for development)
-    search_tenant_id = tenant_id if tenant_id else ""
-    
-    # Extract GSTIN and period from current document for smart matching
-    source_gstin = _extract_gstin_from_result(result)
-    source_period_month, source_period_year = _extract_period_from_result(result)
-    
-    logger.info(f"ITC 2B vs 3B reconciliation: source_gstin={source_gstin}, period={source_period_month}/{source_period_year}, doc_type={doc_type}")
-    
-    other_job = None
-    if doc_type == "gstr2b":
-        logger.info(f"Looking for GSTR-3B job matching GSTIN={source_gstin}, period={source_period_month}/{source_period_year}")
-        # Use smart matching: find by GSTIN and period
-        if source_gstin and source_period_month and source_period_year:
-            other_job = find_matching_job_by_gstin_and_period(
-                dbs, search_tenant_id, "gstr3b",
-                source_gstin, source_period_month, source_period_year
-            )
-        # Fallback to simple doc_type matching if no GSTIN/period
-        if not other_job:
-            logger.info("Falling back to simple doc_type matching (no GSTIN/period available)")
-            other_job = get_latest_job_by_doc_type(dbs, search_tenant_id, "gstr3b")
-        
-        gstr2b_payload = result
-        gstr3b_payload = getattr(other_job, "result", None) if other_job else None
-        if other_job:
-            other_gstin = _extract_gstin_from_result(other_job.result)
-            other_period = _extract_period_from_result(other_job.result)
-            logger.info(f"Found GSTR-3B job {other_job.id} (GSTIN={other_gstin}, period={other_period[0]}/{other_period[1]})")
-        else:
-            logger.warning(f"No matching GSTR-3B found for GSTR-2B (GSTIN={source_gstin}, period={source_period_month}/{source_period_year})")
-    elif doc_type == "gstr3b":
-        logger.info(f"Looking for GSTR-2B job matching GSTIN={source_gstin}, period={source_period_month}/{source_period_year}")
-        # Use smart matching: find by GSTIN and period
-        if source_gstin and source_period_month and source_period_year:
-            other_job = find_matching_job_by_gstin_and_period(
-                dbs, search_tenant_id, "gstr2b",
-                source_gstin, source_period_month, source_period_year
-            )
-        # Fallback to simple doc_type matching if no GSTIN/period
-        if not other_job:
-            logger.info("Falling back to simple doc_type matching (no GSTIN/period available)")
-            other_job = get_latest_job_by_doc_type(dbs, search_tenant_id, "gstr2b")
-        
-        gstr2b_payload = getattr(other_job, "result", None) if other_job else None
-        gstr3b_payload = result
-        if other_job:
-            other_gstin = _extract_gstin_from_result(other_job.result)
-            other_period = _extract_period_from_result(other_job.result)
-            logger.info(f"Found GSTR-2B job {other_job.id} (GSTIN={other_gstin}, period={other_period[0]}/{other_period[1]})")
-        else:
-            logger.warning(f"No matching GSTR-2B found for GSTR-3B (GSTIN={source_gstin}, period={source_period_month}/{source_period_year})")
-    else:
-        return
-    
-    if not gstr2b_payload or not gstr3b_payload:
-        logger.debug(f"Missing payloads for ITC 2B vs 3B reconciliation: 2b={bool(gstr2b_payload)}, 3b={bool(gstr3b_payload)}")
+
+    # The counterpart is read through its stored canonical form, not its result
+    other_job, other_payload = _counterpart(dbs, tenant_id, doc_type, other_doc_type, result, hydrate=False)
+    if not other_payload:
         return
-    
+
     try:
-        # Convert both to canonical format for reconciliation
-        canonical_2b = normalize_to_canonical("gstr2b", gstr2b_payload)
-        canonical_3b = normalize_to_canonical("gstr3b", gstr3b_payload)
+        # Canonical forms: this document's is computed once per job, the counterpart's is stored
+        own = canonical if canonical is not None else normalize_to_canonical(doc_type, result)
+        other = load_canonical(dbs, other_job, other_doc_type)
+        canonical_2b, canonical_3b = (own, other) if doc_type == "gstr2b" else (other, own)
         
         # Perform reconciliation
         recon = reconcile_itc_2b_3b(canonical_2b, canonical_3b)
         
-        if other_job:
-            recon["paired_job_id"] = other_job.id
-            recon["source_gstr2b_job_id"] = other_job.id if doc_type == "gstr3b" else None
-            recon["source_gstr3b_job_id"] = other_job.id if doc_type == "gstr2b" else None
-            recon["source_gstr2b_filename"] = getattr(other_job, "filename", None) if doc_type == "gstr3b" else None
-            recon["source_gstr3b_filename"] = getattr(other_job, "filename", None) if doc_type == "gstr2b" else None
+        recon["paired_job_id"] = other_job.id
+        recon["source_gstr2b_job_id"] = other_job.id if doc_type == "gstr3b" else None
+        recon["source_gstr3b_job_id"] = other_job.id if doc_type == "gstr2b" else None
+        recon["source_gstr2b_filename"] = getattr(other_job, "filename", None) if doc_type == "gstr3b" else None
+        recon["source_gstr3b_filename"] = getattr(other_job, "filename", None) if doc_type == "gstr2b" else None
         recon["source_doc_type"] = doc_type
         
         meta.setdefault("reconciliations", {})["itc_2b_3b"] = recon
@@ -202,7 +170,7 @@ def _attach_itc_2b_3b_recon(
         logger.warning(f"ITC 2B vs 3B reconciliation failed: {exc}")
         import traceback
         logger.debug(f"Traceback: {traceback.format_exc()}")
-        meta.setdefault("reconciliation_errors", []).append(str(exc))
+        meta.setdefault("reconciliation_errors", {})["itc_2b_3b"] = str(exc)
 
 
 def _attach_sales_vs_gstr1_recon(
@@ -211,90 +179,39 @@ def _attach_sales_vs_gstr1_recon(
     if not isinstance(result, dict):
         logger.debug(f"Sales vs GSTR-1 reconciliation skipped: result is not a dict (type: {type(result)})")
         return
-
-    # Use tenant_id if available, otherwise use empty string to match all jobs (for development)
-    search_tenant_id = tenant_id if tenant_id else ""
-    logger.info(f"Attempting sales vs GSTR-1 reconciliation for doc_type={doc_type}, tenant_id={search_tenant_id}")
-
-    # Extract GSTIN and period from current document for smart matching
-    source_gstin = _extract_gstin_from_result(result)
-    source_period_month, source_period_year = _extract_period_from_result(result)
-    
-    logger.info(f"Sales vs GSTR-1 reconciliation: source_gstin={source_gstin}, period={source_period_month}/{source_period_year}")
-    
-    other_job = None
-    if doc_type == "sales_register":
-        logger.info(f"Looking for GSTR-1 job matching GSTIN={source_gstin}, period={source_period_month}/{source_period_year}")
-        # Use smart matching: find by GSTIN and period
-        if source_gstin and source_period_month and source_period_year:
-            other_job = find_matching_job_by_gstin_and_period(
-                dbs, search_tenant_id, "gstr1", 
-                source_gstin, source_period_month, source_period_year
-            )
-        # Fallback to simple doc_type matching if no GSTIN/period
-        if not other_job:
-            logger.info("Falling back to simple doc_type matching (no GSTIN/period available)")
-            other_job = get_latest_job_by_doc_type(dbs, search_tenant_id, "gstr1")
-        
-        sr_payload = result
-        g1_payload = getattr(other_job, "result", None) if other_job else None
-        if other_job:
-            other_gstin = _extract_gstin_from_result(other_job.result)
-            other_period = _extract_period_from_result(other_job.result)
-            logger.info(f"Found GSTR-1 job {other_job.id} (GSTIN={other_gstin}, period={other_period[0]}/{other_period[1]})")
-        else:
-            logger.warning(f"No matching GSTR-1 found for sales_register (GSTIN={source_gstin}, period={source_period_month}/{source_period_year})")
-    elif doc_type == "gstr1":
-        logger.info(f"Looking for sales_register job matching GSTIN={source_gstin}, period={source_period_month}/{source_period_year}")
-        # Use smart matching: find by GSTIN and period
-        if source_gstin and source_period_month and source_period_year:
-            other_job = find_matching_job_by_gstin_and_period(
-                dbs, search_tenant_id, "sales_register",
-                source_gstin, source_period_month, source_period_year
-            )
-        # Fallback to simple doc_type matching if no GSTIN/period
-        if not other_job:
-            logger.info("Falling back to simple doc_type matching (no GSTIN/period available)")
-            other_job = get_latest_job_by_doc_type(dbs, search_tenant_id, "sales_register")
-        
-        sr_payload = getattr(other_job, "result", None) if other_job else None
-        g1_payload = result
-        if other_job:
-            other_gstin = _extract_gstin_from_result(other_job.result)
-            other_period = _extract_period_from_result(other_job.result)
-            logger.info(f"Found sales_register job {other_job.id} (GSTIN={other_gstin}, period={other_period[0]}/{other_period[1]})")
-        else:
-            logger.warning(f"No matching sales_register found for GSTR-1 (GSTIN={source_gstin}, period={source_period_month}/{source_period_year})")
-    else:
+    pairs_with = {"sales_register": "gstr1", "gstr1": "sales_register"}
+    other_doc_type = pairs_with.get(doc_type)
+    if not other_doc_type:
         logger.debug(f"Sales vs GSTR-1 reconciliation skipped: doc_type={doc_type} is not sales_register or gstr1")
         return
 
-    if not sr_payload or not g1_payload:
-        logger.warning(f"Missing payloads for sales vs GSTR-1 reconciliation: sr={bool(sr_payload)}, g1={bool(g1_payload)}, other_job={other_job.id if other_job else None}")
+    other_job, other_payload = _counterpart(dbs, tenant_id, doc_type, other_doc_type, result)
+    if not other_payload:
         return
+    sr_payload, g1_payload = (result, other_payload) if doc_type == "sales_register" else (other_payload, result)
 
     try:
         recon = reconcile_sales_register_vs_gstr1(sr_payload, g1_payload)
-        if other_job:
-            recon["source_sales_register_job_id"] = other_job.id if doc_type == "gstr1" else None
-            recon["source_gstr1_job_id"] = other_job.id if doc_type == "sales_register" else None
-            recon["source_sales_register_filename"] = getattr(other_job, "filename", None) if doc_type == "gstr1" else None
-            recon["source_gstr1_filename"] = getattr(other_job, "filename", None) if doc_type == "sales_register" else None
+        recon["paired_job_id"] = other_job.id
+        recon["source_sales_register_job_id"] = other_job.id if doc_type == "gstr1" else None
+        recon["source_gstr1_job_id"] = other_job.id if doc_type == "sales_register" else None
+        recon["source_sales_register_filename"] = getattr(other_job, "filename", None) if doc_type == "gstr1" else None
+        recon["source_gstr1_filename"] = getattr(other_job, "filename", None) if doc_type == "sales_register" else None
         recon["source_doc_type"] = doc_type
         meta.setdefault("reconciliations", {})["sales_vs_gstr1"] = recon
         logger.info(f"Sales vs GSTR-1 reconciliation attached for doc_type={doc_type}, tenant_id={tenant_id}")
     except Exception as exc:  # noqa: BLE001
         logger.warning(f"Sales vs GSTR-1 reconciliation failed: {exc}")
-        meta.setdefault("reconciliation_errors", []).append(str(exc))
+        meta.setdefault("reconciliation_errors", {})["sales_vs_gstr1"] = str(exc)
 
 
 def parse_job_task(job_id: str):
-    dbs = SessionLocal()
     with SessionLocal() as dbs:
-        job = get_job_by_id(dbs, job_id)
+        # queued -> processing; also fetches the fields we need in the same statement
+        job = job_state.start_processing(dbs, job_id)
         if not job:
+            logger.info(f"Job {job_id} not found or already finished; skipping")
             return
-        update_job_status(dbs, job_id, status="processing")
         try:
             data = get_file_from_s3(job.object_key)
             fn = getattr(job, "filename", None) or "document"
@@ -391,6 +308,13 @@ def parse_job_task(job_id: str):
                     meta["text_content"] = layout_text
 
             logger.info(f"Processing job {job_id}: doc_type={final_doc_type}, tenant_id={getattr(job, 'tenant_id', None)}")
+            # Canonical form is computed once here and stored with the result (canonical_store.py)
+            canonical_doc = None
+            if isinstance(result, dict):
+                try:
+                    canonical_doc = normalize_to_canonical(final_doc_type, result)
+                except Exception as e:
+                    logger.warning(f"Canonical conversion failed for job {job_id}: {e}")
             _attach_purchase_vs_gstr3b_recon(
                 dbs, getattr(job, "tenant_id", None), final_doc_type, result, meta
             )
@@ -398,27 +322,74 @@ def parse_job_task(job_id: str):
                 dbs, getattr(job, "tenant_id", None), final_doc_type, result, meta
             )
             _attach_itc_2b_3b_recon(
+                dbs, getattr(job, "tenant_id", None), final_doc_type, result, meta, canonical=canonical_doc
+            )
+            _attach_purchase_vs_gstr2b_recon(
                 dbs, getattr(job, "tenant_id", None), final_doc_type, result, meta
             )
             logger.info(f"Reconciliation complete for job {job_id}. Meta reconciliations: {list(meta.get('reconciliations', {}).keys())}")
-            update_job_status(
+            # Usage goes to the ledger and rollups with the result; billing/usage_flusher.py reports it to Stripe
+            finished = job_state.finish(
                 dbs,
                 job_id,
-                status=job_status,
-                result=result,
-                meta=meta,
+                job_status,
+                result=offload_result(job_id, result),
+                meta=offload_meta(job_id, meta),
                 doc_type=final_doc_type,
+                canonical=build_canonical(job_id, final_doc_type, result, canonical_doc) if canonical_doc is not None else None,
+                usage=usage_from_meta(meta, len(data)),
             )
-            try:
-                if getattr(job, "tenant_id", None):
-                    item = get_metered_item_for_tenant(dbs, job.tenant_id)  # should return 'si_...'
-                    if item:
-                        record_usage(item, units=1, job_id=job_id)  # idempotent by job_id
-                        logger.info("BILLING usage recorded for %s -> %s", job.tenant_id, item)
-                    else:
-                        logger.info("BILLING skipped: no metered item for tenant %s", job.tenant_id)
-            except Exception as e:
-                logger.warning("BILLING error (non-fatal): %s", e)
+            if finished is not None:
+                try:
+                    if recon_store.record_job(dbs, job_id, getattr(job, "tenant_id", None), final_doc_type, result, meta):
+                        dbs.commit()
+                except Exception as e:
+                    dbs.rollback()
+                    logger.warning(f"Could not record reconciliations for job {job_id}: {e}")
         except Exception as e:
-            update_job_status(dbs, job_id, status="failed", result=None, meta={"error": str(e)})
+            # Discard whatever the failed step left in the session before failing the job
+            dbs.rollback()
+            job_state.fail(dbs, job_id, result=None, meta={"error": str(e)})
+
 
+
+def fail_lost_job(job_id: str):
+    """Mark a job failed whose embedded worker process died before it could finish (embedded_queue on_lost)."""
+    with SessionLocal() as dbs:
+        if job_state.fail(dbs, job_id, result=None, meta={"error": "worker_crashed"}) is not None:
+            logger.error(f"Job {job_id} failed: its worker process died")
+
+
+def fy_reconciliation_task(job_id: str):
+    """Reconcile every month of a financial year for one GSTIN (job created by POST /v1/reconcile/fy)."""
+    with SessionLocal() as dbs:
+        job = job_state.start_processing(dbs, job_id)
+        if not job:
+            logger.info(f"Job {job_id} not found or already finished; skipping")
+            return
+        try:
+            job_meta = dict(job.meta) if isinstance(job.meta, dict) else {}
+            gstin = _normalize_gstin(job_meta.get("gstin"))
+            fy, periods = fy_periods(job_meta.get("fy"))
+
+            jobs = find_jobs_by_gstin_and_periods(dbs, job.tenant_id or "", FY_DOC_TYPES, gstin, periods)
+            documents = {
+                key: {"job_id": found.id, "result": found.result, "canonical": found.canonical}
+                for key, found in jobs.items()
+            }
+            logger.info(f"FY reconciliation {job_id}: GSTIN={gstin}, fy={fy}, {len(documents)} documents")
+
+            report = reconcile_financial_year(gstin, fy, documents)
+            job_state.finish(
+                dbs,
+                job_id,
+                result=offload_result(job_id, report),
+                meta={**job_meta, "fy": fy, "documents_loaded": report["documents_loaded"]},
+                doc_type="fy_reconciliation",
+                # Reports are built from documents already billed when they were parsed
+                billable=False,
+            )
+        except Exception as e:
+            # Discard whatever the failed step left in the session before failing the job
+            dbs.rollback()
+            job_state.fail(dbs, job_id, result=None, meta={"error": str(e)})
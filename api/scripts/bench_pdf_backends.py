@@ -0,0 +1,83 @@
+# api/scripts/bench_pdf_backends.py
+"""
+Compare PDF extraction backends (app/parsers/pdf_backend.py) on sample PDFs.
+
+    python scripts/bench_pdf_backends.py ../samples --runs 5
+    python scripts/bench_pdf_backends.py statement.pdf --backends pdfminer,pdfplumber
+
+Prints one CSV row per file and backend: median wall time over --runs
+extractions, pages, characters, and whether the plain / layout text equals
+the pdfminer baseline's (what the parsers were written against).
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))  # make 'app' importable
+
+from app.parsers.pdf_backend import PdfminerBackend, available_backends, get_backend
+
+
+def _pdfs(path: str):
+    if os.path.isdir(path):
+        return [os.path.join(path, f) for f in sorted(os.listdir(path)) if f.lower().endswith(".pdf")]
+    return [path]
+
+
+def _time(backend, data: bytes, runs: int):
+    times = []
+    extraction = None
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        extraction = backend.extract(data)
+        # Word boxes are lazy; include them so backends are compared on the same output
+        for page in extraction.pages:
+            page.words
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times), extraction
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("path", help="PDF file or directory of PDFs")
+    p.add_argument("--runs", type=int, default=3)
+    p.add_argument("--backends", default=",".join(available_backends()),
+                   help=f"comma-separated, available: {','.join(available_backends())}")
+    args = p.parse_args()
+
+    names = []
+    for name in (n.strip() for n in args.backends.split(",")):
+        if name and name not in available_backends():
+            print(f"skipping {name}: not installed", file=sys.stderr)
+        elif name:
+            names.append(name)
+    print("file,backend,median_ms,pages,chars,words,text_matches_pdfminer,layout_matches_pdfminer")
+    totals = {name: 0.0 for name in names}
+    for fp in _pdfs(args.path):
+        with open(fp, "rb") as f:
+            data = f.read()
+        try:
+            baseline = PdfminerBackend().extract(data)
+        except Exception as e:
+            print(f"{os.path.basename(fp)},pdfminer,error,,,,,{e}", file=sys.stderr)
+            continue
+        for name in names:
+            try:
+                elapsed, ex = _time(get_backend(name), data, args.runs)
+            except Exception as e:
+                print(f"{os.path.basename(fp)},{name},error,,,,,{e}", file=sys.stderr)
+                continue
+            totals[name] += elapsed
+            print(",".join(str(v) for v in (
+                os.path.basename(fp), ex.backend, round(elapsed * 1000, 1), len(ex.pages), len(ex.text),
+                sum(len(page.words) for page in ex.pages),
+                ex.text == baseline.text, ex.layout_text == baseline.layout_text,
+            )))
+    print("total_ms," + ",".join(f"{name}={round(ms * 1000, 1)}" for name, ms in totals.items()), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
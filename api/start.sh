@@ -24,7 +24,7 @@ if [ -n "$REDIS_URL" ] && [[ ! "$REDIS_URL" =~ ^redis://(localhost|127\.0\.0\.1)
     }
     trap cleanup EXIT INT TERM
 else
-    echo "ℹ️  Redis not configured. Jobs will process synchronously."
+    echo "ℹ️  Redis not configured. Jobs will run on the embedded worker pool (EMBEDDED_WORKERS)."
 fi
 
 # Start API server (foreground - this is the main process)
@@ -0,0 +1,23 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("DB_URL", "sqlite://")
+
+
+@pytest.fixture
+def db():
+    """Session on a fresh in-memory SQLite database with every table created."""
+    from app.db import Base
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as session:
+        yield session
+    engine.dispose()
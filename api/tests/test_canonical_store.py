@@ -0,0 +1,62 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app import canonical_store
+from app.db import Job
+
+GSTR3B = {
+    "gstin": "27ABCDE1234F2Z5",
+    "period": {"month": 4, "year": 2025},
+    "input_tax_credit": {"total": {"igst": 100, "cgst": 50, "sgst": 50, "cess": 0}},
+}
+
+
+def _count_normalizations(monkeypatch):
+    calls = []
+    real = canonical_store.normalize_to_canonical
+
+    def counting(doc_type, payload):
+        calls.append(doc_type)
+        return real(doc_type, payload)
+
+    monkeypatch.setattr(canonical_store, "normalize_to_canonical", counting)
+    return calls
+
+
+def test_canonical_is_built_once_and_reused(db, monkeypatch):
+    db.add(Job(id="job_3b", doc_type="gstr", status="succeeded", result=GSTR3B))
+    db.commit()
+    updated_at = db.get(Job, "job_3b").updated_at
+    calls = _count_normalizations(monkeypatch)
+
+    first = canonical_store.load_canonical(db, db.get(Job, "job_3b"), "gstr3b")
+    db.expire_all()
+    job = db.get(Job, "job_3b")
+    second = canonical_store.load_canonical(db, job, "gstr3b")
+
+    assert calls == ["gstr3b"]
+    assert first == second
+    assert first["doc_specific"]["input_tax_credit"]["total"]["igst"] == 100
+    assert job.canonical["normalizer_version"] == canonical_store.NORMALIZER_VERSION
+    assert job.canonical["doc_type"] == "gstr3b"
+    # Caching the canonical form must not reorder job matching
+    assert job.updated_at == updated_at
+
+
+def test_stale_canonical_is_upgraded(db, monkeypatch):
+    stale = canonical_store.build_canonical("job_3b", "gstr3b", GSTR3B)
+    db.add(Job(id="job_3b", doc_type="gstr3b", status="succeeded", result=GSTR3B, canonical=stale))
+    db.commit()
+    calls = _count_normalizations(monkeypatch)
+
+    canonical_store.load_canonical(db, db.get(Job, "job_3b"))
+    assert calls == []
+
+    monkeypatch.setattr(canonical_store, "NORMALIZER_VERSION", stale["normalizer_version"] + 1)
+    assert not canonical_store.is_current(stale)
+    canonical_store.load_canonical(db, db.get(Job, "job_3b"))
+    db.expire_all()
+    assert calls == ["gstr3b"]
+    assert db.get(Job, "job_3b").canonical["normalizer_version"] == stale["normalizer_version"] + 1
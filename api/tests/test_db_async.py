@@ -0,0 +1,57 @@
+import asyncio
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app import db_async
+from app.db import Base, Job
+
+OLD = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture(params=["aiosqlite", "thread"])
+def session_factory(request, monkeypatch, tmp_path):
+    """db_async on a fresh SQLite file, through the async driver or the to_thread fallback."""
+    path = tmp_path / "jobs.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(db_async, "SessionLocal", sessionmaker(bind=engine, expire_on_commit=False))
+    async_engine = None
+    if request.param == "aiosqlite":
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        monkeypatch.setattr(db_async, "AsyncSessionLocal", async_sessionmaker(async_engine, expire_on_commit=False))
+    else:
+        monkeypatch.setattr(db_async, "AsyncSessionLocal", None)
+    yield sessionmaker(bind=engine)
+    if async_engine is not None:
+        asyncio.run(async_engine.dispose())
+    engine.dispose()
+
+
+def test_create_update_and_store_canonical(session_factory):
+    job = asyncio.run(db_async.create_job_async(
+        object_key="uploads/a.pdf", api_key="k", tenant_id=None, filename="a.pdf", meta={"requested_doc_type": "gstr1"},
+    ))
+    assert (job.status, job.tenant_id, job.meta) == ("queued", "", {"requested_doc_type": "gstr1"})
+
+    updated = asyncio.run(db_async.update_job_fields_async(job.id, status="succeeded", result={"gstin": "27ABCDE1234F2Z5"}))
+    assert (updated.id, updated.status, updated.result) == (job.id, "succeeded", {"gstin": "27ABCDE1234F2Z5"})
+    assert asyncio.run(db_async.update_job_fields_async("job_missing", status="failed")) is None
+
+    with session_factory() as db:
+        db.execute(update(Job).where(Job.id == job.id).values(updated_at=OLD))
+        db.commit()
+    asyncio.run(db_async.store_job_canonical_async(job.id, {"version": 1}))
+
+    with session_factory() as db:
+        stored = db.get(Job, job.id)
+        assert (stored.status, stored.canonical) == ("succeeded", {"version": 1})
+        # The canonical form does not make the job the latest of its type
+        assert stored.updated_at.replace(tzinfo=timezone.utc) == OLD
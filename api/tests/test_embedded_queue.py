@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.embedded_queue import EmbeddedQueue, EmbeddedQueueFull
+
+
+def test_embedded_queue_runs_jobs_in_background():
+    eq = EmbeddedQueue(max_workers=1, max_pending=2)
+    try:
+        future = eq.submit(pow, 2, 10)
+        assert future.result(timeout=60) == 1024
+    finally:
+        eq.shutdown()
+    assert eq.pending == 0
+
+
+def test_embedded_queue_rejects_when_full():
+    eq = EmbeddedQueue(max_workers=1, max_pending=1)
+    try:
+        first = eq.submit(time.sleep, 0.5)
+        with pytest.raises(EmbeddedQueueFull):
+            eq.submit(time.sleep, 0.1)
+        first.result(timeout=60)
+        # Slot is released once the running job completes
+        time.sleep(0.05)
+        eq.submit(pow, 3, 2).result(timeout=60)
+    finally:
+        eq.shutdown()
+
+
+def test_dead_worker_fails_its_jobs_and_the_pool_recovers():
+    lost = []
+    eq = EmbeddedQueue(max_workers=1, max_pending=4, on_lost=lost.append)
+    try:
+        # The worker process exits abruptly, as when it is killed for memory
+        crashed = eq.submit(os._exit, 1)
+        queued = eq.submit(time.sleep, 5)
+        for future in (crashed, queued):
+            with pytest.raises(BrokenProcessPool):
+                future.result(timeout=60)
+        time.sleep(0.05)
+        assert sorted(lost) == [1, 5]
+        assert eq.pending == 0
+        # New uploads run on a fresh pool instead of failing
+        assert eq.submit(pow, 2, 5).result(timeout=60) == 32
+    finally:
+        eq.shutdown()
@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.entry_table import EntryTable
+from app.validators import validate_sales_register
+
+
+def test_flat_table_totals_and_round_trip():
+    entries = [
+        {"invoice_number": "A-1", "supplier_gstin": "27XYZDE9876F1Z2", "taxable_value": 100, "cgst": 9, "sgst": 9, "total_value": 118},
+        {"invoice_number": "A-2", "supplier_gstin": "27XYZDE9876F1Z2", "taxable_value": "1,000.50", "igst": None},
+        "not-a-row",
+    ]
+    table = EntryTable.from_flat(entries)
+
+    assert len(table) == 2
+    assert table.totals() == {"taxable_value": 1100.5, "igst": 0.0, "cgst": 9.0, "sgst": 9.0, "cess": 0.0, "total": 1118.5}
+    # GSTINs are interned once per distinct value
+    assert table.gstin[0] is table.gstin[1]
+
+    table.amounts["cess"][1] = 5.0
+    flat = table.to_flat()
+    assert flat[1]["cess"] == 5.0 and flat[1]["invoice_number"] == "A-2"
+    assert "cess" not in entries[1]
+
+
+def test_canonical_validator_flags_entry_total_mismatch():
+    doc = {
+        "financials": {"subtotal": 300, "tax_breakup": {"cgst": 27, "sgst": 27}, "tax_total": 54, "grand_total": 354},
+        "entries": [
+            {"entry_id": "e1", "amounts": {"taxable_value": 100, "tax_breakup": {"cgst": 9, "sgst": 9}, "total": 118}},
+            {"entry_id": "e2", "amounts": {"taxable_value": 200, "tax_breakup": {"cgst": 18, "sgst": 18}, "total": 250}},
+        ],
+    }
+    issues = validate_sales_register(doc)
+
+    assert [i["code"] for i in issues] == ["ENTRY_TOTAL_MISMATCH"]
+    assert issues[0]["meta"] == {"entry_id": "e2"}
+    assert issues[0]["message"] == "Entry e2 total 250.0 != taxable+tax 236.0"
@@ -0,0 +1,99 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.db import Job, find_jobs_by_gstin_and_periods
+from app.recon import fy_recon
+
+GSTIN = "27ABCDE1234F2Z5"
+
+
+def _invoice(number, gstin, taxable, igst):
+    return {"invoice_number": number, "invoice_date": "2025-04-10", "customer_gstin": gstin,
+            "supplier_gstin": gstin, "counterparty_gstin": gstin,
+            "taxable_value": taxable, "igst": igst, "cgst": 0, "sgst": 0, "cess": 0}
+
+
+def _april_documents():
+    period = {"month": 4, "year": 2025}
+    sale = _invoice("S-1", "29LMNOP1234Z5A1", 1000, 180)
+    purchase = _invoice("P-1", "29XYZDE9876F1Z2", 5000, 900)
+    return {
+        "sales_register": {"gstin": GSTIN, "period": period, "entries": [sale]},
+        "gstr1": {"gstin": GSTIN, "period": period, "b2b_invoices": [sale]},
+        "purchase_register": {"gstin": GSTIN, "period": period, "entries": [purchase]},
+        "gstr2b": {"gstin": GSTIN, "period": period, "b2b": [purchase],
+                   "summary": {"total_igst": 900}},
+        "gstr3b": {"gstin": GSTIN, "period": period,
+                   "input_tax_credit": {"total": {"igst": 1000, "cgst": 0, "sgst": 0, "cess": 0}}},
+    }
+
+
+def test_fy_periods():
+    label, periods = fy_recon.fy_periods("FY 2025-2026")
+    assert label == "2025-26"
+    assert periods[0] == (4, 2025) and periods[-1] == (3, 2026) and len(periods) == 12
+    assert fy_recon.fy_periods("2025")[0] == "2025-26"
+    with pytest.raises(ValueError):
+        fy_recon.fy_periods("2025-27")
+
+
+def test_find_jobs_by_gstin_and_periods_keeps_latest_per_month(db):
+    db.add_all([
+        Job(id="job_apr", tenant_id="t", doc_type="gstr1", status="succeeded",
+            result={"gstin": GSTIN, "period": {"month": 4, "year": 2025}}),
+        Job(id="job_mar", tenant_id="t", doc_type="gstr3b", status="needs_review",
+            result={"gstin": GSTIN.lower(), "period": "March 2026"}),
+        Job(id="job_other_gstin", tenant_id="t", doc_type="gstr1", status="succeeded",
+            result={"gstin": "29LMNOP1234Z5A1", "period": {"month": 5, "year": 2025}}),
+        Job(id="job_other_fy", tenant_id="t", doc_type="gstr1", status="succeeded",
+            result={"gstin": GSTIN, "period": {"month": 3, "year": 2025}}),
+        Job(id="job_other_tenant", tenant_id="u", doc_type="gstr1", status="succeeded",
+            result={"gstin": GSTIN, "period": {"month": 6, "year": 2025}}),
+    ])
+    db.commit()
+
+    _, periods = fy_recon.fy_periods("2025-26")
+    found = find_jobs_by_gstin_and_periods(db, "t", fy_recon.FY_DOC_TYPES, GSTIN, periods)
+    assert {k: j.id for k, j in found.items()} == {
+        ("gstr1", (4, 2025)): "job_apr",
+        ("gstr3b", (3, 2026)): "job_mar",
+    }
+
+
+def test_reconcile_financial_year_converts_each_document_once(monkeypatch):
+    calls = []
+    real = fy_recon.normalize_to_canonical
+
+    def counting(doc_type, payload):
+        calls.append(doc_type)
+        return real(doc_type, payload)
+
+    monkeypatch.setattr(fy_recon, "normalize_to_canonical", counting)
+    documents = {
+        (doc_type, (4, 2025)): {"job_id": f"job_{doc_type}", "result": result}
+        for doc_type, result in _april_documents().items()
+    }
+    documents[("gstr1", (5, 2025))] = {"job_id": "job_may", "result": {"gstin": GSTIN, "b2b_invoices": []}}
+
+    report = fy_recon.reconcile_financial_year(GSTIN, "2025-26", documents, workers=4)
+
+    assert sorted(calls) == ["gstr2b", "gstr3b"]
+    assert report["fy"] == "2025-26" and report["documents_loaded"] == 6
+    april, may = report["months"][0], report["months"][1]
+    assert april["period"] == "2025-04" and april["label"] == "April 2025"
+    assert set(april["reconciliations"]) == set(fy_recon.RECON_PAIRS)
+    assert april["reconciliations"]["sales_vs_gstr1"]["source_gstr1_job_id"] == "job_gstr1"
+    assert may["missing"]["sales_vs_gstr1"] == ["sales_register"]
+
+    summary = report["summary"]
+    assert summary["sales_vs_gstr1"]["months_matched"] == 1
+    assert summary["purchase_vs_gstr2b"]["months_matched"] == 1
+    # 3B claims 1000 IGST against 900 in the books
+    assert summary["purchase_vs_gstr3b_itc"]["months_with_differences"] == ["2025-04"]
+    assert summary["purchase_vs_gstr3b_itc"]["totals"]["gstr3b"]["igst"] == 1000
+    assert "2025-05" in summary["sales_vs_gstr1"]["months_missing_documents"]
+    assert report["status"] == "mismatches_found"
@@ -0,0 +1,106 @@
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.parsers import gstn_portal
+from app.parsers.canonical.gstr2b_normalizer import normalize_gstr2b_to_canonical
+from app.parsers.router import parse_any
+
+GSTR2B = {
+    "chksum": "abc",
+    "data": {
+        "gstin": "27ABCDE1234F2Z5",
+        "rtnprd": "112025",
+        "gendt": "14-12-2025",
+        "docdata": {
+            "b2b": [
+                {
+                    "ctin": "27XYZDE9876F1Z2",
+                    "trdnm": "XYZ DISTRIBUTORS",
+                    "supprd": "112025",
+                    "inv": [
+                        {"inum": "INV-001", "dt": "05-11-2025", "val": 118000, "pos": "27", "rev": "N",
+                         "itcavl": "Y", "typ": "R", "txval": 100000, "igst": 0, "cgst": 9000, "sgst": 9000, "cess": 0},
+                        {"inum": "INV-002", "dt": "07-11-2025", "val": 11800, "pos": "27", "rev": "N",
+                         "itcavl": "N", "rsn": "P", "typ": "R", "txval": 10000, "igst": 0, "cgst": 900, "sgst": 900, "cess": 0},
+                    ],
+                },
+                {
+                    "ctin": "29LMNOP1234Z5A1",
+                    "trdnm": "LMN STORES",
+                    "inv": [{"inum": "L-9", "dt": "10-11-2025", "val": 59000, "pos": "27", "rev": "N",
+                             "itcavl": "Y", "typ": "R", "txval": 50000, "igst": 9000, "cgst": 0, "sgst": 0, "cess": 0}],
+                },
+            ],
+            "cdnr": [],
+        },
+    },
+}
+
+GSTR1 = {
+    "gstin": "27ABCDE1234F2Z5",
+    "fp": "042025",
+    "b2b": [
+        {
+            "ctin": "29LMNOP1234Z5A1",
+            "inv": [
+                {"inum": "S-1", "idt": "02-04-2025", "val": 1180, "pos": "29", "rchrg": "N", "inv_typ": "R",
+                 "itms": [{"num": 1, "itm_det": {"txval": 600, "rt": 18, "iamt": 108, "csamt": 0}},
+                          {"num": 2, "itm_det": {"txval": 400, "rt": 18, "iamt": 72, "csamt": 0}}]},
+            ],
+        }
+    ],
+}
+
+
+def test_gstr2b_portal_json_feeds_canonical_normalizer():
+    data = json.dumps(GSTR2B).encode()
+    result, meta, doc_type = parse_any("2b_nov.json", data)
+
+    assert doc_type == "gstr2b"
+    assert meta["text_source"] == "gstn_portal_json"
+    assert result["period"] == {"month": 11, "year": 2025, "label": "November 2025"}
+    assert [r["invoice_number"] for r in result["b2b"]] == ["INV-001", "INV-002", "L-9"]
+    assert result["b2b"][0]["invoice_date"] == "2025-11-05"
+    assert result["b2b"][1]["itc_availability"] == "not_available"
+    assert result["summary"]["total_taxable_value"] == 160000
+    assert "section_not_parsed: cdnr" in result["warnings"]
+
+    canonical = normalize_gstr2b_to_canonical(result)
+    assert len(canonical["entries"]) == 3
+    assert canonical["entries"][2]["party"]["gstin"] == "29LMNOP1234Z5A1"
+
+
+def test_gstr1_portal_json_sums_item_details():
+    result = gstn_portal.try_parse_portal_json("returns.json", json.dumps(GSTR1).encode())
+
+    assert result["doc_type"] == "gstr1"
+    (inv,) = result["b2b_invoices"]
+    assert inv["counterparty_gstin"] == "29LMNOP1234Z5A1"
+    assert (inv["taxable_value"], inv["igst"]) == (1000, 180)
+    assert result["period"]["label"] == "April 2025"
+
+
+def test_fallback_without_ijson_matches_stream(monkeypatch):
+    data = json.dumps(GSTR2B).encode()
+    streamed = gstn_portal.parse_portal_json(data, "gstr2b")
+    monkeypatch.setattr(gstn_portal, "ijson", None)
+    loaded = gstn_portal.parse_portal_json(data, "gstr2b")
+
+    assert loaded["b2b"] == streamed["b2b"]
+    assert loaded["gstin"] == streamed["gstin"] == "27ABCDE1234F2Z5"
+    assert loaded["warnings"] == streamed["warnings"]
+
+
+def test_parsed_json_is_not_treated_as_portal_download():
+    sample = Path(__file__).resolve().parents[1] / "samples" / "gstr2b_sample.json"
+    assert gstn_portal.try_parse_portal_json("gstr2b_sample.json", sample.read_bytes()) is None
+
+
+def test_forced_doc_type_is_recorded_for_portal_json():
+    _, meta, doc_type = parse_any("2b_nov.json", json.dumps(GSTR2B).encode(), forced_doc_type="GSTR2B")
+
+    assert doc_type == "gstr2b"
+    assert meta["doc_type_forced"] is True and meta["requested_doc_type"] == "gstr2b"
@@ -0,0 +1,92 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import cast, create_engine, literal, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.db import (
+    Base,
+    Job,
+    _extract_period_from_result,
+    find_matching_job_by_gstin_and_period,
+    result_gstin_expr,
+    result_period_expr,
+)
+
+# An empty PostgreSQL database (e.g. the docker-compose one) for the SQL matching path
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+@pytest.fixture
+def pg():
+    """Session on TEST_POSTGRES_URL inside a transaction that is rolled back."""
+    if not TEST_POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    engine = create_engine(TEST_POSTGRES_URL)
+    with engine.connect() as conn:
+        trans = conn.begin()
+        Base.metadata.create_all(conn)
+        with Session(bind=conn, join_transaction_mode="create_savepoint") as session:
+            yield session
+        trans.rollback()
+    engine.dispose()
+
+
+def _add_gstr1_jobs(db):
+    db.add_all([
+        Job(id="job_other", tenant_id="t", doc_type="gstr1", status="succeeded",
+            result={"gstin": "27AAAAA0000A1Z5", "period": {"month": 10, "year": 2025}}),
+        Job(id="job_match", tenant_id="t", doc_type="gstr1", status="succeeded",
+            result={"gstin": {"value": " 27aaaaa0000a1z5 "}, "period": {"from": "2025-11-01", "to": "2025-11-30"}}),
+        Job(id="job_text", tenant_id="t", doc_type="gstr1", status="succeeded",
+            result={"gstin": "27AAAAA0000A1Z5", "period": "December 2025"}),
+    ])
+    db.commit()
+
+
+def _assert_matches(db):
+    assert find_matching_job_by_gstin_and_period(db, "t", "gstr1", "27AAAAA0000A1Z5", 11, 2025).id == "job_match"
+    # Free-text periods have no SQL form and are matched in Python
+    assert find_matching_job_by_gstin_and_period(db, "t", "gstr1", "27AAAAA0000A1Z5", 12, 2025).id == "job_text"
+    assert find_matching_job_by_gstin_and_period(db, "t", "gstr1", "27AAAAA0000A1Z5", 1, 2026) is None
+    assert find_matching_job_by_gstin_and_period(db, "t", "gstr1", "29BBBBB0000B1Z5", 11, 2025) is None
+
+
+def test_find_matching_job_by_gstin_and_period(db):
+    _add_gstr1_jobs(db)
+    _assert_matches(db)
+
+
+def test_find_matching_job_in_sql_on_postgresql(pg):
+    _add_gstr1_jobs(pg)
+    _assert_matches(pg)
+
+
+@pytest.mark.parametrize("period", [
+    {"month": 11, "year": 2025},
+    {"month": "3", "year": "2025"},
+    {"from": "2025-11-01", "to": "2025-11-30"},
+    "November 2025",
+    "2025-11",
+    None,
+])
+def test_period_expression_agrees_with_python(pg, period):
+    result = {"gstin": "27AAAAA0000A1Z5", "period": period}
+    got = pg.execute(select(result_period_expr(cast(literal(json.dumps(result)), JSONB)))).scalar()
+
+    month, year = _extract_period_from_result(result)
+    # Strings ("November 2025") stay NULL in SQL: such rows remain candidates for the Python check
+    assert got == (f"{year:04d}-{month:02d}" if isinstance(period, dict) else None)
+
+
+def test_gstin_expression_reads_jsonb_paths():
+    sql = str(result_gstin_expr().compile(dialect=postgresql.dialect()))
+    assert "jsonb_typeof" in sql
+    assert "#>>" in sql
@@ -0,0 +1,97 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app import job_state
+from app.db import Batch, Job
+
+
+def _job(db, **kwargs):
+    job = Job(object_key="k", api_key="a", tenant_id="t", filename="f.pdf", status="queued", meta={}, **kwargs)
+    db.add(job)
+    db.commit()
+    return job.id
+
+
+def test_job_moves_through_states(db):
+    job_id = _job(db)
+
+    row = job_state.start_processing(db, job_id)
+    assert row.status == "processing"
+    assert row.object_key == "k"
+
+    row = job_state.finish(db, job_id, result={"ok": True}, doc_type="invoice")
+    assert row.status == "succeeded"
+    job = db.get(Job, job_id)
+    db.refresh(job)
+    assert job.result == {"ok": True}
+    assert job.doc_type == "invoice"
+
+
+def test_invalid_transitions_are_rejected(db):
+    job_id = _job(db)
+
+    # Cannot finish a job that never started
+    assert job_state.finish(db, job_id) is None
+    assert job_state.start_processing(db, "missing") is None
+
+    job_state.start_processing(db, job_id)
+    job_state.fail(db, job_id, meta={"error": "boom"})
+    # A failed job is not picked up again
+    assert job_state.start_processing(db, job_id) is None
+
+    with pytest.raises(job_state.InvalidTransition):
+        job_state.finish(db, job_id, status="failed")
+
+
+def test_terminal_transitions_update_batch_counters(db):
+    batch = Batch(tenant_id="t", total_files=2, status="processing", processed_files=0, failed_files=0)
+    db.add(batch)
+    db.commit()
+    first, second = _job(db, batch_id=batch.id), _job(db, batch_id=batch.id)
+
+    for job_id in (first, second):
+        job_state.start_processing(db, job_id)
+    job_state.finish(db, first)
+    db.refresh(batch)
+    assert (batch.processed_files, batch.failed_files, batch.status) == (1, 0, "processing")
+
+    job_state.fail(db, second)
+    db.refresh(batch)
+    assert (batch.processed_files, batch.failed_files, batch.status) == (1, 1, "completed")
+    assert batch.completed_at is not None
+
+
+def test_failed_usage_insert_leaves_the_job_failable(db, monkeypatch):
+    from app.db import UsageEvent
+
+    job_id = _job(db)
+    job_state.start_processing(db, job_id)
+
+    def broken_usage(db, row, usage):
+        raise RuntimeError("usage insert failed")
+
+    monkeypatch.setattr(job_state, "record_job_usage", broken_usage)
+    with pytest.raises(RuntimeError):
+        job_state.finish(db, job_id, result={"ok": True}, usage={"quantity": 1})
+
+    # The job UPDATE was rolled back with the usage insert, so the job can still be failed
+    assert job_state.fail(db, job_id, meta={"error": "usage insert failed"}).status == "failed"
+    job = db.get(Job, job_id)
+    db.refresh(job)
+    assert (job.status, job.result) == ("failed", None)
+    assert db.query(UsageEvent).count() == 0
+
+
+def test_unbillable_jobs_record_no_usage(db):
+    from app.db import UsageDaily, UsageEvent, UsageMonthly
+
+    job_id = _job(db)
+    job_state.start_processing(db, job_id)
+    assert job_state.finish(db, job_id, result={"report": True}, doc_type="fy_reconciliation", billable=False).status == "succeeded"
+
+    assert db.query(UsageEvent).count() == 0
+    assert db.query(UsageDaily).count() == db.query(UsageMonthly).count() == 0
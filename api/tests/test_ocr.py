@@ -0,0 +1,176 @@
+import io
+import sys
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.parsers import common, ocr, ocr_preprocess
+
+
+def _latin_page():
+    img = Image.new("RGB", (1000, 600), "white")
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default(size=28)
+    for i in range(8):
+        draw.text((40, 30 + i * 60), "Invoice total GSTIN 27ABCDE1234F2Z5 payable", fill="black", font=font)
+    return img
+
+
+def _devanagari_like_page():
+    """Words hanging from a headline (shirorekha), as Devanagari script does."""
+    img = Image.new("RGB", (1000, 600), "white")
+    draw = ImageDraw.Draw(img)
+    for i in range(8):
+        y, x = 30 + i * 60, 40
+        for w in range(6):
+            width = 90 + (w * 13) % 40
+            draw.rectangle((x, y, x + width, y + 3), fill="black")
+            for k in range(x + 8, x + width - 5, 22):
+                draw.line((k, y, k, y + 28), fill="black", width=3)
+                draw.arc((k - 14, y + 8, k, y + 26), 0, 360, fill="black", width=3)
+            x += width + 25
+    return img
+
+
+def _png(img):
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_heuristic_tells_devanagari_from_latin(monkeypatch):
+    monkeypatch.setattr(ocr, "_osd", lambda img: None)
+    monkeypatch.setattr(ocr, "installed_languages", lambda: frozenset({"eng", "hin"}))
+
+    lang, info = ocr.choose_ocr_lang([Image.new("RGB", (100, 100), "white"), _devanagari_like_page()])
+    assert lang == "hin+eng"
+    assert info["ocr_script_detection"]["source"] == "heuristic"
+    assert info["ocr_script_detection"]["page"] == 2
+
+    assert ocr.choose_ocr_lang([_latin_page()])[0] == "eng"
+    # Nothing to go on: keep the caller's default
+    assert ocr.choose_ocr_lang([Image.new("RGB", (100, 100), "white")])[0] == "hin+eng"
+
+
+def test_osd_decides_language_and_orientation(monkeypatch):
+    monkeypatch.setattr(ocr, "_osd", lambda img: {
+        "script": "Devanagari", "confidence": 4.2, "rotate": 90, "orientation_confidence": 9.0, "source": "osd",
+    })
+    monkeypatch.setattr(ocr, "installed_languages", lambda: frozenset({"eng"}))
+    images = [Image.new("RGB", (300, 100), "black")]
+
+    lang, info = ocr.choose_ocr_lang(images)
+    # hin pack missing: English once instead of a failing hin+eng call per page
+    assert lang == "eng" and info["ocr_lang_unavailable"] == "hin+eng"
+    assert info["ocr_script_detection"]["script"] == "Devanagari"
+    assert images[0].size == (100, 300)
+
+
+def test_hindi_extraction_ocrs_each_page_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ocr, "_osd", lambda img: None)
+    monkeypatch.setattr(ocr, "installed_languages", lambda: frozenset())
+    monkeypatch.setattr(ocr, "ocr_page", lambda img, lang="eng", raise_errors=False: calls.append(lang) or "बिल राशि 100")
+
+    info = {}
+    text, ocr_used = common.extract_text_safely_hindi(_png(_devanagari_like_page()), "bill.png", info=info)
+
+    assert (text, ocr_used) == ("बिल राशि 100", True)
+    assert calls == ["hin+eng"]
+    assert info["ocr_lang"] == "hin+eng"
+
+    calls.clear()
+    common.extract_text_safely(_png(_latin_page()), "bill.png")
+    assert calls == ["eng"]
+
+
+def test_only_pages_without_a_usable_text_layer_are_ocrd(monkeypatch):
+    cover = "GSTR-1 Summary for GSTIN 27ABCDE1234F2Z5, tax period April 2025"
+    monkeypatch.setattr(common, "_pdf_page_texts", lambda data: (
+        f"{cover}\f\f", [cover, " \n", "(cid:12)(cid:7)(cid:9)(cid:31)(cid:4)"],
+    ))
+    rendered = []
+
+    class Renderer:
+        def __init__(self, data):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            pass
+
+        def page(self, index):
+            rendered.append(index)
+            return lambda dpi: f"image {index + 1}"
+
+    monkeypatch.setattr(common, "PdfPageRenderer", Renderer)
+    monkeypatch.setattr(ocr_preprocess, "OCR_PREPROCESS", ())
+    monkeypatch.setattr(ocr, "ocr_page", lambda img, lang="eng", raise_errors=False: f"scanned {img}")
+
+    info = {}
+    text, ocr_used = common.extract_text_safely(b"%PDF-1.7 mixed", "gstr1.pdf", info=info)
+
+    assert rendered == [1, 2]
+    assert ocr_used
+    assert text.split("\n\f") == [cover, "scanned image 2", "scanned image 3"]
+    assert info["page_text_source"] == {"1": "pdf_text", "2": "ocr", "3": "ocr"}
+    assert (info["pages"], info["ocr_pages"], info["text_source"]) == (3, 2, "hybrid")
+
+
+def _word(text, conf, line, x):
+    return {"text": text, "conf": conf, "line": (1, 1, line), "box": (x, line * 20, x + 50, line * 20 + 15)}
+
+
+def test_adaptive_ocr_rereads_only_weak_field_lines(monkeypatch):
+    crops = []
+
+    def words(img, lang="eng", psm=6, raise_errors=False):
+        if psm == 7:
+            crops.append(img.size)
+            return [_word("GSTIN", 95.0, 1, 0), _word("27ABCDE1234F2Z5", 93.0, 1, 70)]
+        if img.width == 1200:  # low DPI pass
+            return [_word("Tax", 91.0, 1, 10), _word("Invoice", 95.0, 1, 70),
+                    _word("GSTIN", 88.0, 2, 10), _word("27ABCDE1Z34F2Z5", 41.0, 2, 70),
+                    _word("Thank", 35.0, 3, 10), _word("you", 90.0, 3, 70),
+                    _word("for", 92.0, 3, 130), _word("your", 94.0, 3, 190)]
+        raise AssertionError("the whole page must not be redone")
+
+    monkeypatch.setattr(ocr, "OCR_ADAPTIVE", True)
+    monkeypatch.setattr(ocr, "ocr_words", words)
+    monkeypatch.setattr(ocr_preprocess, "OCR_PREPROCESS", ())
+    info = {}
+    texts = ocr.ocr_pages([ocr.image_source(Image.new("L", (2000, 1000), "white"))], "eng", info)
+
+    # The weak word without digits is left alone, the weak GSTIN line is re-read from the full-size image
+    assert texts == ["Tax Invoice\nGSTIN 27ABCDE1234F2Z5\nThank you for your"]
+    assert len(crops) == 1 and crops[0][0] > 120
+    assert info["ocr_adaptive"]["regions_reocr"] == 1 and info["ocr_adaptive"]["pages_reocr"] == 0
+
+
+def test_every_frame_of_a_multipage_tiff_is_ocrd(monkeypatch):
+    frames = [Image.new("L", (400 + 100 * i, 300), 255) for i in range(4)]
+    buf = io.BytesIO()
+    frames[0].save(buf, format="TIFF", save_all=True, append_images=frames[1:])
+    rendered = []
+    render = common.ImageFrameRenderer.render
+
+    def tracking_render(self, index, dpi=ocr.OCR_RESOLUTION):
+        rendered.append(index)
+        return render(self, index, dpi)
+
+    monkeypatch.setattr(common.ImageFrameRenderer, "render", tracking_render)
+    monkeypatch.setattr(ocr_preprocess, "OCR_PREPROCESS", ())
+    monkeypatch.setattr(ocr, "ocr_page", lambda img, lang="eng", raise_errors=False: "" if img.width == 500 else f"frame {img.width}")
+
+    info = {}
+    text, ocr_used = common.extract_text_safely(buf.getvalue(), "scan.tif", info=info)
+
+    assert ocr_used
+    assert text.split("\n\f") == ["frame 400", "", "frame 600", "frame 700"]
+    assert sorted(rendered) == [0, 1, 2, 3]
+    assert (info["pages"], info["ocr_pages"]) == (4, 4)
+    assert info["page_text_source"] == {"1": "ocr", "2": "empty", "3": "ocr", "4": "ocr"}
@@ -0,0 +1,102 @@
+import os
+import sys
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.parsers import ocr, ocr_cache
+from app.parsers.ocr_cache import DiskCache, OcrCache, page_key
+
+
+def _page(label):
+    img = Image.new("L", (600, 300), 255)
+    ImageDraw.Draw(img).text((40, 40), f"Annexure {label} GSTIN 27ABCDE1234F2Z5", fill=0)
+    return img
+
+
+def _use_cache(monkeypatch, cache):
+    monkeypatch.setattr(ocr_cache, "_cache", cache)
+    monkeypatch.setattr(ocr_cache, "_cache_ready", True)
+
+
+def test_repeated_pages_are_served_from_the_cache(monkeypatch, tmp_path):
+    _use_cache(monkeypatch, OcrCache(DiskCache(str(tmp_path), 1 << 20)))
+    calls = []
+    monkeypatch.setattr(ocr, "ocr_page", lambda img, lang="eng", raise_errors=False: calls.append(lang) or f"text {len(calls)}")
+
+    first = ocr.ocr_pages([ocr.image_source(_page("A")), ocr.image_source(_page("B"))], "eng", {})
+    info = {}
+    # The same statement resent with one extra page
+    second = ocr.ocr_pages([ocr.image_source(_page(x)) for x in "ABC"], "eng", info)
+
+    assert second[:2] == first
+    assert len(calls) == 3
+    assert info["ocr_cache_hits"] == 2 and "cache" in info["ocr_stage_ms"]
+    # A different language is a different result
+    ocr.ocr_pages([ocr.image_source(_page("A"))], "hin+eng", {})
+    assert calls[-1] == "hin+eng"
+
+
+def test_key_covers_pixels_and_parameters():
+    assert page_key(_page("A"), lang="eng", dpi=200) == page_key(_page("A"), lang="eng", dpi=200)
+    assert page_key(_page("A"), lang="eng", dpi=200) != page_key(_page("B"), lang="eng", dpi=200)
+    assert page_key(_page("A"), lang="eng", dpi=200) != page_key(_page("A"), lang="eng", dpi=300)
+
+
+def test_disk_cache_evicts_least_recently_used(monkeypatch, tmp_path):
+    monkeypatch.setattr(ocr_cache, "EVICT_EVERY", 1)
+    disk = DiskCache(str(tmp_path), 3200)
+    for i in range(3):
+        disk.put(f"{i:02d}key", {"text": "x" * 900})
+        os.utime(disk._path(f"{i:02d}key"), (1000 + i, 1000 + i))
+    assert disk.get("00key") is not None  # touched: now the most recent
+    disk.put("03key", {"text": "x" * 900})
+
+    assert disk.get("01key") is None
+    assert all(disk.get(k) is not None for k in ("00key", "02key", "03key"))
+
+
+def test_shared_hits_fill_the_local_disk(tmp_path):
+    class Shared:
+        store = {"k1": {"text": "from redis", "blank": False}}
+
+        def get(self, key):
+            return self.store.get(key)
+
+        def put(self, key, value):
+            raise ConnectionError("redis down")
+
+    disk = DiskCache(str(tmp_path), 1 << 20)
+    cache = OcrCache(disk, Shared())
+    assert cache.get("k1")["text"] == "from redis"
+    assert disk.get("k1")["text"] == "from redis"
+    # A failing backend is a miss, not an error
+    cache.put("k2", {"text": "t", "blank": False})
+    assert cache.get("k2")["text"] == "t"
+
+
+def test_failed_engine_calls_are_not_cached(monkeypatch, tmp_path):
+    _use_cache(monkeypatch, OcrCache(DiskCache(str(tmp_path), 1 << 20)))
+
+    class FlakyEngine:
+        name = "flaky"
+        calls = 0
+
+        def text(self, img, lang, psm=6):
+            FlakyEngine.calls += 1
+            if FlakyEngine.calls == 1:
+                raise RuntimeError("tesseract crashed")
+            return "Annexure A"
+
+    monkeypatch.setattr(ocr, "get_engine", lambda: FlakyEngine())
+    info = {}
+    assert ocr.ocr_pages([ocr.image_source(_page("A"))], "eng", info) == [""]
+    assert info["ocr_cache_hits"] == 0
+
+    # The next run reads the page instead of getting the failure back from the cache
+    assert ocr.ocr_pages([ocr.image_source(_page("A"))], "eng", {}) == ["Annexure A"]
+    info = {}
+    assert ocr.ocr_pages([ocr.image_source(_page("A"))], "eng", info) == ["Annexure A"]
+    assert info["ocr_cache_hits"] == 1 and FlakyEngine.calls == 2
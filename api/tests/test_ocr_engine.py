@@ -0,0 +1,117 @@
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+from PIL import Image
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.parsers import ocr, ocr_engine
+
+
+class FakeWord:
+    def __init__(self, text, conf, box, starts):
+        self.text, self.conf, self.box, self.starts = text, conf, box, starts
+
+    def IsAtBeginningOf(self, level):
+        return level in self.starts
+
+    def GetUTF8Text(self, level):
+        return self.text
+
+    def Confidence(self, level):
+        return self.conf
+
+    def BoundingBox(self, level):
+        return self.box
+
+
+class FakeApi:
+    loaded = []
+
+    def __init__(self, lang):
+        if lang == "hin+eng":
+            raise RuntimeError("Failed to init API, possibly an invalid tessdata path")
+        FakeApi.loaded.append(lang)
+        self.psm = None
+
+    def SetPageSegMode(self, psm):
+        self.psm = psm
+
+    def SetImage(self, img):
+        self.img = img
+
+    def GetUTF8Text(self):
+        return f"text psm {self.psm}"
+
+    def Recognize(self):
+        pass
+
+    def GetIterator(self):
+        return [
+            FakeWord("Tax", 91.0, (10, 5, 40, 20), {"block", "para", "line"}),
+            FakeWord("Invoice", 88.0, (50, 5, 120, 20), set()),
+            FakeWord("GSTIN", 75.0, (10, 30, 60, 45), {"line"}),
+            FakeWord("Total", 90.0, (10, 80, 60, 95), {"block", "para", "line"}),
+        ]
+
+    def Clear(self):
+        self.img = None
+
+    def End(self):
+        pass
+
+
+def _fake_tesserocr(monkeypatch):
+    FakeApi.loaded = []
+    fake = SimpleNamespace(
+        PyTessBaseAPI=FakeApi,
+        RIL=SimpleNamespace(BLOCK="block", PARA="para", TEXTLINE="line", WORD="word"),
+        iterate_level=lambda iterator, level: iter(iterator),
+    )
+    monkeypatch.setattr(ocr_engine, "tesserocr", fake)
+    monkeypatch.setattr(ocr_engine, "_engines", {})
+
+
+def test_auto_prefers_the_native_binding_and_falls_back_to_pytesseract(monkeypatch):
+    _fake_tesserocr(monkeypatch)
+    assert ocr_engine.get_engine("auto").name == "tesserocr"
+    monkeypatch.setattr(ocr_engine, "tesserocr", None)
+    monkeypatch.setattr(ocr_engine, "_engines", {})
+    assert ocr_engine.get_engine("tesserocr").name == "pytesseract"
+
+
+def test_models_are_loaded_once_and_reused(monkeypatch):
+    _fake_tesserocr(monkeypatch)
+    img = Image.new("L", (100, 100), 255)
+
+    threads = [threading.Thread(target=ocr.ocr_page, args=(img,)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert ocr.ocr_page(img) == "text psm 6"
+    # At most one model per concurrent caller, never one per page
+    assert 1 <= FakeApi.loaded.count("eng") <= 8
+
+    loaded = len(FakeApi.loaded)
+    for _ in range(20):
+        ocr.ocr_page(img)
+    assert len(FakeApi.loaded) == loaded
+
+
+def test_missing_language_falls_back_to_english(monkeypatch):
+    _fake_tesserocr(monkeypatch)
+    img = Image.new("L", (100, 100), 255)
+    assert ocr.ocr_page(img, lang="hin+eng") == "text psm 6"
+    assert ocr.ocr_page(img, lang="hin+eng") == "text psm 6"
+    assert "hin+eng" not in FakeApi.loaded
+
+
+def test_words_are_numbered_like_image_to_data(monkeypatch):
+    _fake_tesserocr(monkeypatch)
+    words = ocr.ocr_words(Image.new("L", (100, 100), 255))
+    assert [w["line"] for w in words] == [(1, 1, 1), (1, 1, 1), (1, 1, 2), (2, 1, 1)]
+    assert words[2] == {"text": "GSTIN", "conf": 75.0, "line": (1, 1, 2), "box": (10, 30, 60, 45)}
+    assert ocr.words_to_text(words) == "Tax Invoice\nGSTIN\n\nTotal"
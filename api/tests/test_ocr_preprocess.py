@@ -0,0 +1,81 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.parsers import ocr, ocr_preprocess
+from app.parsers.ocr_preprocess import PagePreprocessor, adaptive_ink, skew_angle
+
+
+def _scan(angle=0.0, border=True):
+    """A text page photographed at `angle` on a dark scanner bed, lit unevenly."""
+    img = Image.new("L", (1700, 2200), 230)
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default(size=30)
+    for i in range(30):
+        draw.text((150, 200 + i * 50), "Invoice No 1234  GSTIN 27ABCDE1234F2Z5  Amount 12,345.00", fill=20, font=font)
+    img = img.rotate(angle, resample=Image.BICUBIC, fillcolor=230)
+    shadow = np.linspace(0, 110, img.width, dtype=np.float32)[None, :]
+    img = Image.fromarray((np.asarray(img, dtype=np.float32) - shadow).clip(0, 255).astype(np.uint8)).convert("RGB")
+    if border:
+        draw = ImageDraw.Draw(img)
+        draw.rectangle((0, 0, img.width, 60), fill=(10, 10, 10))
+        draw.rectangle((0, 0, 40, img.height), fill=(10, 10, 10))
+    return img
+
+
+def test_binarize_keeps_text_under_a_shadow():
+    ink = adaptive_ink(np.asarray(_scan(border=False).convert("L")))
+    # Only glyph strokes are ink, on the lit and on the shaded side alike
+    assert ink.mean() < 0.05
+    assert ink[:, 150:500].any() and ink[:, 700:1000].any()
+
+
+def test_page_is_deskewed_and_cropped_to_content():
+    timings = {}
+    pre = PagePreprocessor(timings=timings)
+    out = pre(_scan(angle=3.0))
+
+    assert pre.angle == 3.0
+    assert skew_angle(np.asarray(out) < 128) == 0.0
+    # Scanner borders and the empty margins are gone
+    assert out.width < 1300 and out.height < 1700
+    assert np.asarray(out)[:5].min() == 255
+    assert set(timings) >= {"grayscale", "binarize", "deskew", "crop"}
+
+    # A later, larger rendering of the page gets the same geometry
+    hi = pre(_scan(angle=3.0).resize((2550, 3300)))
+    assert abs(hi.width / out.width - 1.5) < 0.01
+
+
+def test_blank_page_is_not_ocrd(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ocr, "ocr_page", lambda img, lang="eng", raise_errors=False: calls.append(img) or "text")
+    info = {}
+    pages = [ocr.image_source(Image.new("RGB", (1700, 2200), "white")), ocr.image_source(_scan())]
+
+    assert ocr.ocr_pages(pages, "eng", info) == ["", "text"]
+    assert len(calls) == 1 and calls[0].mode == "L"
+    assert info["ocr_blank_pages"] == 1
+    assert {"render", "grayscale", "binarize", "ocr"} <= set(info["ocr_stage_ms"])
+
+
+def test_preprocessing_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(ocr_preprocess, "OCR_PREPROCESS", ())
+    img = Image.new("RGB", (100, 100), "white")
+    assert PagePreprocessor()(img) is img
+
+
+def test_without_grayscale_the_page_keeps_its_colours():
+    pre = PagePreprocessor(steps=("deskew", "crop"))
+    out = pre(_scan(angle=3.0))
+
+    assert out.mode == "RGB"
+    assert pre.angle == 3.0
+    assert out.width < 1300 and out.height < 1700
+    # Same geometry as the grayscale rendering of the page
+    gray = PagePreprocessor(steps=("grayscale", "deskew", "crop"))(_scan(angle=3.0))
+    assert gray.mode == "L" and gray.size == out.size
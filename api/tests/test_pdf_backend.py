@@ -0,0 +1,39 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.parsers import common, pdf_backend
+
+GSTR1_PDF = Path(__file__).resolve().parent / "fixtures" / "gstr" / "GSTR1.pdf"
+
+
+def test_single_pass_matches_pdfminer_baseline():
+    data = GSTR1_PDF.read_bytes()
+    single = pdf_backend.get_backend("pdfplumber").extract(data)
+    baseline = pdf_backend.get_backend("pdfminer").extract(data)
+
+    assert single.text == baseline.text
+    assert single.layout_text == baseline.layout_text
+    assert single.pages[0].words == baseline.pages[0].words
+    assert {"text", "x0", "top", "x1", "bottom"} <= set(single.pages[0].words[0])
+
+
+def test_text_and_layout_share_one_parse(monkeypatch):
+    calls = []
+
+    class Counting(pdf_backend.PdfplumberBackend):
+        def extract(self, data):
+            calls.append(len(data))
+            return super().extract(data)
+
+    monkeypatch.setitem(pdf_backend.BACKENDS, "pdfplumber", Counting)
+    pdf_backend.extract_pdf.cache_clear()
+    data = GSTR1_PDF.read_bytes()
+
+    text, ocr_used = common.extract_text_safely(data, "GSTR1.pdf")
+    layout = common.extract_text_with_layout(data)
+
+    assert text.strip() and layout.strip() and not ocr_used
+    assert calls == [len(data)]
+    pdf_backend.extract_pdf.cache_clear()
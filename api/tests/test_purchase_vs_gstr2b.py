@@ -0,0 +1,43 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.recon.purchase_vs_gstr2b import reconcile_purchase_register_vs_gstr2b
+
+SUP_A = "27XYZDE9876F1Z2"
+SUP_B = "29LMNOP1234Z5A1"
+
+
+def _inv(number, gstin, taxable, cgst=0.0, sgst=0.0, igst=0.0, date="2025-11-05"):
+    return {"invoice_number": number, "invoice_date": date, "supplier_gstin": gstin,
+            "taxable_value": taxable, "cgst": cgst, "sgst": sgst, "igst": igst}
+
+
+def test_invoice_level_buckets_and_heads():
+    pr = {"entries": [
+        _inv("INV-001", SUP_A, 100000, cgst=9000, sgst=9000),
+        _inv("INV-002", SUP_A, 10000, cgst=900, sgst=900),
+        _inv("L-9", SUP_B, 50000, igst=9000),
+    ]}
+    g2b = {"b2b": [
+        {**_inv("INV001", SUP_A, 100000, cgst=9000, sgst=9000), "invoice_date": "05-11-2025", "invoice_value": 118000},
+        _inv("L-9", SUP_B, 50000, igst=8000),
+        _inv("X-1", SUP_B, 2000, igst=360),
+    ]}
+    rec = reconcile_purchase_register_vs_gstr2b(pr, g2b)
+
+    assert rec["status"] == "mismatches_found"
+    assert {k: rec["summary"][k] for k in ("matched", "value_mismatch", "missing_in_2b", "missing_in_books")} == {
+        "matched": 1, "value_mismatch": 1, "missing_in_2b": 1, "missing_in_books": 1,
+    }
+    (mismatch,) = rec["value_mismatches"]
+    assert mismatch["invoice_number"] == "L-9"
+    assert mismatch["heads"] == {"igst": {"books": 9000.0, "gstr2b": 8000.0, "difference": 1000.0}}
+    assert [m["invoice_number"] for m in rec["missing_in_2b"]] == ["INV-002"]
+    assert [m["invoice_number"] for m in rec["missing_in_books"]] == ["X-1"]
+
+    igst = rec["by_head"]["igst"]
+    assert (igst["books"], igst["gstr2b"], igst["missing_in_books"]) == (9000.0, 8360.0, 360.0)
+    assert rec["by_head"]["cgst"]["missing_in_2b"] == 900.0
+    assert rec["by_head"]["cgst"]["matched"] == 9000.0
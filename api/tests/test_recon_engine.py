@@ -0,0 +1,92 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.entry_table import EntryTable
+from app.recon.engine import match_invoices, normalize_invoice_number
+from app.recon.sales_vs_gstr1 import reconcile_sales_register_vs_gstr1
+
+GSTIN_A = "27XYZDE9876F1Z2"
+GSTIN_B = "29LMNOP1234Z5A1"
+
+
+def _row(number, date, gstin, total):
+    return {"invoice_number": number, "invoice_date": date, "counterparty_gstin": gstin,
+            "taxable_value": total, "total_value": total}
+
+
+def test_normalize_invoice_number():
+    assert normalize_invoice_number(" inv/0042-a") == "INV42A"
+    assert normalize_invoice_number("--") is None
+
+
+def test_match_passes():
+    left = EntryTable.from_flat([
+        _row("INV-1", "2025-04-02", GSTIN_A, 100),     # exact
+        _row("inv 002", "2025-04-03", GSTIN_A, 200),   # normalized
+        _row("INV-3", "2025-04-30", GSTIN_A, 300),     # date drift into May
+        _row("INV-4", "2025-04-05", None, 400),        # no GSTIN on one side
+        _row("2024-25/0105", "2025-04-06", GSTIN_A, 500),  # fuzzy, same amount
+        _row("INV-6", "2025-04-07", GSTIN_B, 600),     # same number, other GSTIN
+    ])
+    right = EntryTable.from_flat([
+        _row("INV-1", "02-04-2025", GSTIN_A, 100),
+        _row("INV2", "2025-04-03", GSTIN_A, 200),
+        _row("INV-3", "2025-05-01", GSTIN_A, 300),
+        _row("INV-4", "2025-04-05", GSTIN_B, 400),
+        _row("0105", "2025-04-06", GSTIN_A, 500.4),
+        _row("INV-6", "2025-04-07", GSTIN_A, 600),
+    ])
+    result = match_invoices(left, right)
+
+    assert dict(zip(result.pairs, result.match_types)) == {
+        (0, 0): "exact",
+        (1, 1): "normalized",
+        (2, 2): "date_drift",
+        (3, 3): "no_gstin",
+        (4, 4): "fuzzy",
+    }
+    assert result.left_only == [5]
+    assert result.right_only == [5]
+
+
+def test_fuzzy_pass_keeps_recurring_invoices_apart():
+    numbers = [
+        ("RENT-1", "RENT-11"),            # recurring rent, equal amounts
+        ("INV-5", "INV-25"),
+        ("INV-1057", "INV-121057"),       # "12" in front is not a year
+        ("2024-26/0105", "0105"),         # not a financial year
+        ("2024-25/105", "105"),           # too few digits to trust the suffix
+    ]
+    left = EntryTable.from_flat([_row(a, "2025-04-10", GSTIN_A, 1000) for a, _ in numbers])
+    right = EntryTable.from_flat([_row(b, "2025-04-10", GSTIN_A, 1000) for _, b in numbers])
+    result = match_invoices(left, right)
+
+    assert result.pairs == []
+    assert result.left_only == result.right_only == list(range(len(numbers)))
+
+
+def test_fuzzy_pass_accepts_year_series_prefixes():
+    numbers = [("2024-25/0105", "0105"), ("GST/2425/0042", "0042"), ("INV/2025/7781", "7781")]
+    left = EntryTable.from_flat([_row(a, "2025-04-10", GSTIN_A, 1000 + i) for i, (a, _) in enumerate(numbers)])
+    right = EntryTable.from_flat([_row(b, "2025-04-10", GSTIN_A, 1000 + i) for i, (_, b) in enumerate(numbers)])
+    result = match_invoices(left, right)
+
+    assert result.pairs == [(0, 0), (1, 1), (2, 2)] and set(result.match_types) == {"fuzzy"}
+
+
+def test_sales_vs_gstr1_reports_value_mismatch_and_missing():
+    sr = {"entries": [
+        {"invoice_number": "S-1", "invoice_date": "2025-04-01", "customer_gstin": GSTIN_A, "taxable_value": 1000, "cgst": 90, "sgst": 90, "total_value": 1180},
+        {"invoice_number": "S-2", "invoice_date": "2025-04-02", "customer_gstin": GSTIN_A, "taxable_value": 500, "total_value": 500},
+    ]}
+    g1 = {"b2b_invoices": [
+        {"invoice_number": "S1", "invoice_date": "2025-04-01", "counterparty_gstin": GSTIN_A, "taxable_value": 900, "cgst": 81, "sgst": 81},
+    ]}
+    rec = reconcile_sales_register_vs_gstr1(sr, g1)
+
+    assert [m["invoice_number"] for m in rec["value_mismatches"]] == ["S-1"]
+    assert rec["value_mismatches"][0]["match_type"] == "normalized"
+    assert [m["invoice_number"] for m in rec["missing_in_gstr1"]] == ["S-2"]
+    assert rec["missing_in_sales_register"] == []
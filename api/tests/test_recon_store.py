@@ -0,0 +1,103 @@
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import update
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app import recon_store
+from app.db import Job, Reconciliation
+
+GSTIN = "27ABCDE1234F2Z5"
+RESULT = {"gstin": GSTIN, "period": {"month": 11, "year": 2025}}
+KEY = {"tenant_id": "t", "gstin": GSTIN, "period": "2025-11", "recon_type": "sales_vs_gstr1"}
+
+
+def _finish(db, job_id, doc_type, meta=None):
+    db.add(Job(id=job_id, tenant_id="t", doc_type=doc_type, status="succeeded", result=RESULT, meta=meta or {}))
+    db.commit()
+    recon_store.record_job(db, job_id, "t", doc_type, RESULT, meta)
+    db.commit()
+    db.expire_all()
+    return db.get(Reconciliation, KEY)
+
+
+def test_rows_are_filled_from_either_side(db):
+    row = _finish(db, "job_sr", "sales_register")
+    assert (row.left_job_id, row.right_job_id, row.status) == ("job_sr", None, recon_store.AWAITING)
+    assert recon_store.counterpart_job(db, "t", "sales_register", GSTIN, 11, 2025).id == "job_sr"
+
+    recon = {"status": "matched", "paired_job_id": "job_sr", "totals": {"gstr1": {"total": 10}},
+             "missing_in_gstr1": []}
+    row = _finish(db, "job_g1", "gstr1", {"reconciliations": {"sales_vs_gstr1": recon}})
+    assert (row.left_job_id, row.right_job_id, row.status) == ("job_sr", "job_g1", "matched")
+    assert row.computed_by_job_id == "job_g1"
+    assert "missing_in_gstr1" not in row.summary
+    # The sales register finished first but now sees the reconciliation too
+    assert recon_store.reconciliations_for_job(db, "job_sr")["sales_vs_gstr1"] == recon
+    assert recon_store.list_reconciliations(db, "t", gstin=GSTIN)[0].recon_type == "sales_vs_gstr1"
+
+    # A re-uploaded sales register invalidates the stored result but keeps the GSTR-1 side
+    row = _finish(db, "job_sr2", "sales_register")
+    assert (row.left_job_id, row.right_job_id, row.status) == ("job_sr2", "job_g1", recon_store.PENDING)
+    assert row.result is None
+    assert recon_store.reconciliations_for_job(db, "job_sr") == {}
+
+
+def test_counterpart_job_skips_unusable_jobs(db):
+    _finish(db, "job_g1", "gstr1")
+    db.get(Job, "job_g1").status = "failed"
+    db.commit()
+
+    assert recon_store.counterpart_job(db, "t", "gstr1", GSTIN, 11, 2025) is None
+    assert recon_store.record_job(db, "job_x", "t", "gstr1", {"gstin": GSTIN}, {}) == 0
+
+
+def test_pairing_with_another_gstin_or_period_is_not_stored(db):
+    # The worker fell back to the latest sales register, which is for November
+    _finish(db, "job_sr_nov", "sales_register")
+    december = {"gstin": GSTIN, "period": {"month": 12, "year": 2025}}
+    db.add(Job(id="job_g1_dec", tenant_id="t", doc_type="gstr1", status="succeeded", result=december, meta={}))
+    db.commit()
+    recon = {"status": "mismatch", "paired_job_id": "job_sr_nov"}
+    recon_store.record_job(db, "job_g1_dec", "t", "gstr1", december, {"reconciliations": {"sales_vs_gstr1": recon}})
+    db.commit()
+
+    row = db.get(Reconciliation, {**KEY, "period": "2025-12"})
+    assert (row.left_job_id, row.right_job_id, row.status, row.result) == (None, "job_g1_dec", recon_store.AWAITING, None)
+    assert recon_store.counterpart_job(db, "t", "sales_register", GSTIN, 12, 2025) is None
+
+
+def test_counterpart_job_ignores_rows_pointing_at_another_period(db):
+    db.add(Job(id="job_sr_nov", tenant_id="t", doc_type="sales_register", status="succeeded", result=RESULT, meta={}))
+    db.add(Reconciliation(**{**KEY, "period": "2025-12"}, left_job_id="job_sr_nov", status=recon_store.AWAITING))
+    db.add(Reconciliation(**KEY, left_job_id="job_sr_nov", status=recon_store.AWAITING))
+    db.commit()
+
+    assert recon_store.counterpart_job(db, "t", "sales_register", GSTIN, 12, 2025) is None
+    assert recon_store.counterpart_job(db, "t", "sales_register", GSTIN.lower(), 11, 2025).id == "job_sr_nov"
+
+
+def test_only_the_type_that_raised_is_failed(db):
+    meta = {"reconciliation_errors": {"purchase_vs_gstr3b_itc": "boom"}}
+    db.add(Job(id="job_pr", tenant_id="t", doc_type="purchase_register", status="succeeded", result=RESULT, meta=meta))
+    db.commit()
+    assert recon_store.record_job(db, "job_pr", "t", "purchase_register", RESULT, meta) == 2
+    db.commit()
+
+    statuses = {
+        recon_type: db.get(Reconciliation, {**KEY, "recon_type": recon_type}).status
+        for recon_type in ("purchase_vs_gstr3b_itc", "purchase_vs_gstr2b")
+    }
+    assert statuses == {"purchase_vs_gstr3b_itc": recon_store.FAILED, "purchase_vs_gstr2b": recon_store.AWAITING}
+
+
+def test_updates_bump_updated_at(db):
+    _finish(db, "job_sr", "sales_register")
+    db.execute(update(Reconciliation).values(updated_at=datetime(2020, 1, 1, tzinfo=timezone.utc)))
+    db.commit()
+
+    row = _finish(db, "job_g1", "gstr1")
+    assert row.status == recon_store.PENDING
+    assert row.updated_at.year > 2020
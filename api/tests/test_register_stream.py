@@ -0,0 +1,97 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.parsers.purchase_register import normalize_purchase_register
+from app.parsers.register_stream import try_parse_register_stream
+from app.parsers.router import parse_any
+
+SAMPLE = Path(__file__).resolve().parent / "fixtures" / "purchase_register" / "sample.csv"
+
+
+def test_streamed_purchase_register_matches_text_parser():
+    data = SAMPLE.read_bytes()
+    streamed = try_parse_register_stream("sample.csv", data, "purchase_register")
+    text = normalize_purchase_register(data.decode("utf-8"))
+
+    assert streamed["doc_type"] == "purchase_register"
+    assert streamed["warnings"] == []
+    assert streamed["entries"] == text["entries"]
+    assert streamed["meta"]["rows_read"] == 3
+
+
+def test_sales_register_tsv_with_preamble_and_totals():
+    rows = [
+        "Sales Register - FY 2025-26",
+        "",
+        "Invoice Date\tInvoice No\tCustomer Name\tCustomer GSTIN\tTaxable Value\tIGST\tCGST\tSGST",
+        '01-04-2025\tS-1\t"ACME, Ltd"\t27ABCDE1234F1Z5\t1,000.00\t0\t90\t90',
+        "02-04-2025\t\t\t\t0\t0\t0\t0",
+        "03-04-2025\tS-2\tBETA\t\t500\t90\t\t",
+        "Total\t\t\t\t1500\t90\t90\t90",
+    ]
+    result = try_parse_register_stream("export.tsv", "\n".join(rows).encode("utf-8"))
+
+    assert result["doc_type"] == "sales_register"
+    assert result["meta"]["source_format"] == "tsv"
+    assert [e["invoice_number"] for e in result["entries"]] == ["S-1", "S-2"]
+    first, second = result["entries"]
+    assert first["customer_name"] == "ACME, Ltd"
+    assert first["invoice_date"] == "2025-04-01"
+    assert first["total_value"] == 1180.0
+    assert second["total_value"] == 590.0
+    assert len(result["warnings"]) == 1
+
+
+def test_non_register_csv_falls_back_to_text_path():
+    data = b"name,amount\nfoo,1\n"
+    assert try_parse_register_stream("data.csv", data) is None
+    assert try_parse_register_stream("sample.csv", SAMPLE.read_bytes(), "bank_statement") is None
+
+
+def test_parse_any_uses_stream_for_register_csv():
+    result, meta = parse_any("purchase_register.csv", SAMPLE.read_bytes())
+    assert meta["text_source"] == "structured_csv"
+    assert meta["doc_type_internal"] == "purchase_register"
+    assert meta["row_count"] == len(result["entries"]) == 3
+
+
+def _workbook(sheets: dict) -> bytes:
+    import io
+
+    import openpyxl
+
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for title, rows in sheets.items():
+        ws = wb.create_sheet(title)
+        for row in rows:
+            ws.append(row)
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def test_xlsx_register_merges_sheets():
+    from datetime import datetime
+
+    header = ["Invoice Date", "Invoice No", "Supplier Name", "Supplier GSTIN", "Taxable Value", "CGST", "SGST"]
+    data = _workbook({
+        "Notes": [["Exported from Tally"]],
+        "Apr": [["Purchase Register - April 2025"], header, [datetime(2025, 4, 5), 101, "XYZ", "27XYZDE9876F1Z2", 1000.0, 90, 90]],
+        "May": [header, ["06-05-2025", "P-2", "LMN", "29LMNOP1234Z5A1", 500, 45, 45], ["Total", None, None, None, 1500]],
+    })
+    result = try_parse_register_stream("register.xlsx", data)
+
+    assert result["doc_type"] == "purchase_register"
+    assert result["meta"]["sheets"] == ["Apr", "May"]
+    assert result["period"]["label"] == "April 2025"
+    first, second = result["entries"]
+    assert first["invoice_number"] == "101"
+    assert first["invoice_date"] == "2025-04-05"
+    assert first["total_value"] == 1180.0
+    assert second["supplier_gstin"] == "29LMNOP1234Z5A1"
+
+    _, meta = parse_any("register.xlsx", data)
+    assert meta["text_source"] == "structured_xlsx"
@@ -0,0 +1,47 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app import result_store, storage
+
+
+def _use_tmp_storage(monkeypatch, tmp_path):
+    monkeypatch.setattr(storage, "USE_S3", False)
+    monkeypatch.setattr(storage, "LOCAL_STORAGE_DIR", tmp_path)
+    monkeypatch.setattr(result_store, "RESULT_OFFLOAD_BYTES", 1024)
+
+
+def test_small_result_is_stored_inline(monkeypatch, tmp_path):
+    _use_tmp_storage(monkeypatch, tmp_path)
+    result = {"doc_type": "invoice", "total": 100}
+    assert result_store.offload_result("job1", result) is result
+    assert result_store.hydrate_result(result) is result
+
+
+def test_large_result_is_offloaded_and_hydrated(monkeypatch, tmp_path):
+    _use_tmp_storage(monkeypatch, tmp_path)
+    result = {
+        "doc_type": "sales_register",
+        "gstin": {"value": "27ABCDE1234F1Z5"},
+        "entries": [{"invoice_number": f"INV-{i}", "amount": i} for i in range(500)],
+    }
+
+    stored = result_store.offload_result("job2", result)
+    assert stored["doc_type"] == "sales_register"
+    assert stored["gstin"] == {"value": "27ABCDE1234F1Z5"}
+    assert "entries" not in stored
+    assert stored["_offloaded"]["counts"] == {"entries": 500}
+    assert (tmp_path / stored["_offloaded"]["key"]).exists()
+
+    assert result_store.hydrate_result(stored) == result
+
+
+def test_large_text_content_is_offloaded(monkeypatch, tmp_path):
+    _use_tmp_storage(monkeypatch, tmp_path)
+    meta = {"source_filename": "gstr3b.pdf", "text_content": "GSTR-3B " * 1000}
+
+    stored = result_store.offload_meta("job3", meta)
+    assert "text_content" not in stored
+    assert stored["source_filename"] == "gstr3b.pdf"
+    assert result_store.hydrate_meta(stored) == meta
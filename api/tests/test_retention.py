@@ -0,0 +1,85 @@
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app import result_store, retention, storage
+from app.db import Job, get_latest_job_by_doc_type
+
+
+@pytest.fixture(autouse=True)
+def local_storage(monkeypatch, tmp_path):
+    monkeypatch.setattr(storage, "USE_S3", False)
+    monkeypatch.setattr(storage, "LOCAL_STORAGE_DIR", tmp_path)
+    monkeypatch.setattr(result_store, "RESULT_OFFLOAD_BYTES", 1024)
+    monkeypatch.setattr(retention, "RETENTION_UPLOAD_DAYS", None)
+    monkeypatch.setattr(retention, "RETENTION_ARCHIVE_DAYS", None)
+
+
+NOW = datetime(2025, 12, 31, tzinfo=timezone.utc)
+
+
+def _job(db, job_id, tenant_id, age_days, result):
+    key = f"uploads/{job_id}/doc.pdf"
+    storage.save_file_to_s3(key, b"%PDF")
+    db.add(Job(
+        id=job_id, tenant_id=tenant_id, status="succeeded", doc_type="sales_register", object_key=key,
+        result=result_store.offload_result(job_id, result),
+        meta={"source_filename": "doc.pdf"},
+        created_at=NOW - timedelta(days=age_days),
+    ))
+    db.commit()
+    return key
+
+
+def test_policies_delete_uploads_and_archive_payloads(db, tmp_path):
+    retention.set_policy(db, "t1", upload_days=30, archive_days=90)
+    entries = [{"invoice_number": f"INV-{i}", "amount": i} for i in range(200)]
+    old_key = _job(db, "job_old", "t1", 120, {"gstin": "27AAAAA0000A1Z5", "entries": entries})
+    mid_key = _job(db, "job_mid", "t1", 60, {"gstin": "27AAAAA0000A1Z5"})
+    new_key = _job(db, "job_new", "t1", 5, {"gstin": "27AAAAA0000A1Z5"})
+    other_key = _job(db, "job_other", "t2", 120, {"gstin": "29BBBBB0000B1Z5"})
+    blob_key = db.get(Job, "job_old").result["_offloaded"]["key"]
+
+    stats = retention.run_compactor(db, now=NOW, limiter=retention.RateLimiter(0))
+    assert stats == {"uploads_deleted": 2, "jobs_archived": 1}
+
+    assert not (tmp_path / old_key).exists() and not (tmp_path / mid_key).exists()
+    assert (tmp_path / new_key).exists() and (tmp_path / other_key).exists()
+
+    old = db.get(Job, "job_old")
+    assert old.archived_at is not None
+    assert old.result["gstin"] == "27AAAAA0000A1Z5"
+    assert old.result["_archived"]["counts"] == {"entries": 200}
+    # The individually offloaded blob was folded into the segment
+    assert not (tmp_path / blob_key).exists()
+    assert result_store.hydrate_result(old.result)["entries"] == entries
+    assert result_store.hydrate_meta(old.meta) == {"source_filename": "doc.pdf"}
+    assert db.get(Job, "job_mid").archived_at is None
+
+    # A second pass has nothing left to do
+    assert retention.run_compactor(db, now=NOW, limiter=retention.RateLimiter(0)) == {"uploads_deleted": 0, "jobs_archived": 0}
+
+
+def test_zero_disables_env_default(db, monkeypatch):
+    monkeypatch.setattr(retention, "RETENTION_UPLOAD_DAYS", 1)
+    retention.set_policy(db, "t1", upload_days=0, archive_days=None)
+    assert retention.effective_policy(retention.get_policies(db), "t1") == (0, None)
+    assert retention.effective_policy(retention.get_policies(db), "t2") == (1, None)
+
+
+def test_compaction_keeps_the_latest_job_order(db):
+    retention.set_policy(db, "t1", upload_days=30, archive_days=90)
+    for job_id, age in (("job_old", 400), ("job_new", 1)):
+        _job(db, job_id, "t1", age, {"gstin": "27AAAAA0000A1Z5"})
+        db.get(Job, job_id).updated_at = NOW - timedelta(days=age)
+    db.commit()
+
+    assert retention.run_compactor(db, now=NOW, limiter=retention.RateLimiter(0)) == {"uploads_deleted": 1, "jobs_archived": 1}
+    db.expire_all()
+
+    assert db.get(Job, "job_old").archived_at is not None
+    assert get_latest_job_by_doc_type(db, "t1", "sales_register").id == "job_new"
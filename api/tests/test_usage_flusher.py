@@ -0,0 +1,60 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app import job_state
+from app.billing import usage_flusher
+from app.billing.stripe_billing import StubStripeClient
+from app.db import Job, UsageEvent
+
+
+@pytest.fixture(autouse=True)
+def metered_items(monkeypatch):
+    items = {"tenant_a": "si_a", "tenant_b": "si_b"}
+    monkeypatch.setattr(usage_flusher, "get_metered_item_for_tenant", lambda db, t: items.get(t))
+    usage_flusher.clear_metered_item_cache()
+
+
+def _finished_job(db, tenant_id):
+    job = Job(object_key="k", api_key="a", tenant_id=tenant_id, filename="f.pdf", status="processing", meta={})
+    db.add(job)
+    db.commit()
+    job_state.finish(db, job.id, result={"ok": True})
+    return job.id
+
+
+def test_finish_writes_usage_event_once(db):
+    job_id = _finished_job(db, "tenant_a")
+    # A second finish is rejected by the state machine and writes nothing
+    assert job_state.finish(db, job_id) is None
+    assert db.query(UsageEvent).filter_by(job_id=job_id).count() == 1
+
+
+def test_flush_aggregates_per_subscription_item(db):
+    for tenant in ("tenant_a", "tenant_a", "tenant_b", "tenant_unbilled"):
+        _finished_job(db, tenant)
+
+    client = StubStripeClient()
+    stats = usage_flusher.flush_usage(db, client)
+    assert client.totals() == {"si_a": 2, "si_b": 1}
+    assert stats["records"] == 2 and stats["skipped"] == 1
+    assert db.query(UsageEvent).filter(UsageEvent.reported_at.is_(None)).count() == 0
+
+    # Nothing left to report
+    assert usage_flusher.flush_usage(db, client)["records"] == 0
+
+
+def test_failed_flush_is_retried_with_same_idempotency_key(db):
+    _finished_job(db, "tenant_a")
+
+    client = StubStripeClient(fail=True)
+    assert usage_flusher.flush_usage(db, client)["errors"] == 1
+    batch_id = db.query(UsageEvent.report_batch_id).scalar()
+
+    client.fail = False
+    usage_flusher.flush_usage(db, client)
+    assert list(client.records) == [f"{batch_id}:si_a"]
+    assert client.totals() == {"si_a": 1}
@@ -0,0 +1,40 @@
+import sys
+from datetime import date, datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.db import UsageDaily, UsageEvent
+from app.usage import get_daily_usage, get_monthly_usage, record_job_usage, usage_from_meta
+
+
+def _job(job_id, doc_type, tenant_id="t1"):
+    return SimpleNamespace(id=job_id, tenant_id=tenant_id, api_key="k1", doc_type=doc_type)
+
+
+def test_usage_from_meta_counts_ocr_pages():
+    assert usage_from_meta({"ocr_used": True, "pages": 3}, 100) == {"quantity": 1, "ocr_pages": 3, "bytes_processed": 100}
+    assert usage_from_meta({"ocr_used": False, "pages": 3})["ocr_pages"] == 0
+
+
+def test_rollups_are_incremented_per_job(db):
+    nov1 = datetime(2025, 11, 1, tzinfo=timezone.utc)
+    nov2 = datetime(2025, 11, 2, tzinfo=timezone.utc)
+    record_job_usage(db, _job("j1", "invoice"), {"ocr_pages": 2, "bytes_processed": 1000}, when=nov1)
+    record_job_usage(db, _job("j2", "invoice"), {"ocr_pages": 1, "bytes_processed": 500}, when=nov1)
+    record_job_usage(db, _job("j3", "gstr1"), {"bytes_processed": 10}, when=nov2)
+    record_job_usage(db, _job("j4", "gstr1", tenant_id="other"), {}, when=nov2)
+    db.commit()
+
+    assert db.query(UsageEvent).count() == 4
+    # One rollup row per (tenant, day, api_key, doc_type), not per job
+    assert db.query(UsageDaily).filter_by(tenant_id="t1").count() == 2
+
+    usage = get_monthly_usage(db, "t1", "2025-11")
+    assert (usage["docs_parsed"], usage["ocr_pages"], usage["bytes_processed"]) == (3, 3, 1510)
+    assert usage["by_doc_type"]["invoice"]["docs_parsed"] == 2
+    assert get_monthly_usage(db, "t1", "2025-12")["docs_parsed"] == 0
+
+    days = get_daily_usage(db, "t1", date(2025, 11, 1), date(2025, 11, 30))
+    assert [(d["day"], d["docs_parsed"]) for d in days] == [("2025-11-01", 2), ("2025-11-02", 1)]
@@ -0,0 +1,29 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app import worker
+from app.db import Job
+
+GSTIN = "27ABCDE1234F2Z5"
+
+
+def _gstr1(month):
+    return {"doc_type": "gstr1", "gstin": GSTIN, "period": {"month": month, "year": 2025}, "b2b_invoices": []}
+
+
+def test_all_recon_pairs_use_the_gstin_and_period_counterpart(db):
+    db.add(Job(id="g1_nov", tenant_id="t", doc_type="gstr1", status="succeeded", result=_gstr1(11), meta={}))
+    db.add(Job(id="g1_dec", tenant_id="t", doc_type="gstr1", status="succeeded", result=_gstr1(12), meta={}))
+    db.commit()
+
+    meta = {}
+    sales = {"doc_type": "sales_register", "gstin": GSTIN, "period": {"month": 11, "year": 2025}, "entries": []}
+    worker._attach_sales_vs_gstr1_recon(db, "t", "sales_register", sales, meta)
+    assert meta["reconciliations"]["sales_vs_gstr1"]["paired_job_id"] == "g1_nov"
+
+    job, payload = worker._counterpart(db, "t", "sales_register", "gstr1", {"entries": []})
+    # Without GSTIN and period only the latest job of the type can be offered
+    assert job.id in ("g1_nov", "g1_dec") and payload["doc_type"] == "gstr1"
+    assert worker._counterpart(db, "t", "gstr1", "sales_register", _gstr1(11)) == (None, None)
@@ -22,13 +22,80 @@ sys.path.insert(0, str(project_root))
 os.chdir(str(api_dir))
 
 from sqlalchemy import create_engine, inspect, text
-from app.db import Base, Job, Batch, Client, DOCPARSER_SCHEMA
+from sqlalchemy.schema import CreateIndex
+from app.db import Base, Job, Batch, Client, UsageEvent, UsageDaily, UsageMonthly, RetentionPolicy, Reconciliation, DOCPARSER_SCHEMA
 
 def table_exists(engine, table_name):
     """Check if a table exists in the database."""
     inspector = inspect(engine)
     return table_name in inspector.get_table_names()
 
+def add_missing_columns(engine, schema_name, tables, dry_run=False):
+    """ALTER TABLE ... ADD COLUMN for model columns missing from existing tables."""
+    print(f"\n🧩 Checking for new columns...")
+    if dry_run:
+        print("   [DRY RUN] Would add any model columns missing from existing tables")
+        return
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names(schema=schema_name))
+    with engine.begin() as conn:
+        for table_name, table_class in tables.items():
+            if table_name not in existing_tables:
+                continue
+            present = {c["name"] for c in inspector.get_columns(table_name, schema=schema_name)}
+            for column in table_class.__table__.columns:
+                if column.name in present:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(
+                    f"ALTER TABLE {schema_name}.{table_name} ADD COLUMN IF NOT EXISTS {column.name} {col_type}"
+                ))
+                print(f"   ✅ {table_name}.{column.name} added ({col_type})")
+
+
+# Created by earlier versions of this script; nothing queries them
+DROPPED_JOB_INDEXES = ("ix_jobs_meta_requested_doc_type", "ix_jobs_result_gin")
+
+
+def migrate_jobs_to_jsonb(engine, schema_name, dry_run=False):
+    """
+    Convert jobs.result/jobs.meta from JSON to JSONB, create the
+    expression indexes declared on Job (GSTIN/period matching) and drop
+    the ones no query used. Safe to run repeatedly.
+    """
+    print(f"\n🧬 Checking jobs JSON columns...")
+    if dry_run:
+        print("   [DRY RUN] Would convert jobs.result/meta to JSONB and create:")
+        for index in sorted(Job.__table__.indexes, key=lambda i: i.name):
+            print(f"   - {index.name}")
+        return
+
+    if engine.dialect.name != "postgresql":
+        print("   ⏭️  Not PostgreSQL - skipping JSONB migration")
+        return
+
+    inspector = inspect(engine)
+    columns = {c["name"]: str(c["type"]).upper() for c in inspector.get_columns("jobs", schema=schema_name)}
+    with engine.begin() as conn:
+        for column in ("result", "meta"):
+            if columns.get(column) == "JSONB":
+                print(f"   ✅ jobs.{column} - already JSONB")
+                continue
+            print(f"   Converting jobs.{column} ({columns.get(column)}) to JSONB...")
+            conn.execute(text(
+                f"ALTER TABLE {schema_name}.jobs ALTER COLUMN {column} TYPE JSONB USING {column}::jsonb"
+            ))
+            print(f"   ✅ jobs.{column} converted")
+
+        for index in sorted(Job.__table__.indexes, key=lambda i: i.name):
+            conn.execute(CreateIndex(index, if_not_exists=True))
+            print(f"   ✅ index {index.name}")
+
+        for name in DROPPED_JOB_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {schema_name}.{name}"))
+            print(f"   ✅ index {name} dropped")
+
+
 def apply_schema(database_url=None, dry_run=False):
     """
     Apply schema to database.
@@ -79,6 +146,11 @@ def apply_schema(database_url=None, dry_run=False):
         "jobs": Job,
         "batches": Batch,
         "clients": Client,
+        "usage_events": UsageEvent,
+        "usage_daily": UsageDaily,
+        "usage_monthly": UsageMonthly,
+        "retention_policies": RetentionPolicy,
+        "reconciliations": Reconciliation,
     }
     
     print(f"\n📋 Checking tables in schema '{schema_name}'...")
@@ -101,7 +173,9 @@ def apply_schema(database_url=None, dry_run=False):
             print(f"   ⚠️  {table_name} - missing")
     
     if not missing_tables:
-        print("\n✅ All tables already exist. Schema is up to date!")
+        print("\n✅ All tables already exist.")
+        add_missing_columns(None if dry_run else engine, schema_name, tables_to_create, dry_run=dry_run)
+        migrate_jobs_to_jsonb(None if dry_run else engine, schema_name, dry_run=dry_run)
         return
     
     print(f"\n🔨 Creating {len(missing_tables)} missing table(s)...")
@@ -110,6 +184,8 @@ def apply_schema(database_url=None, dry_run=False):
         print("\n[DRY RUN] Would create:")
         for table_name, _ in missing_tables:
             print(f"   - {table_name}")
+        add_missing_columns(None, schema_name, tables_to_create, dry_run=True)
+        migrate_jobs_to_jsonb(None, schema_name, dry_run=True)
         print("\nRun without --dry-run to actually create tables.")
         return
     
@@ -122,6 +198,9 @@ def apply_schema(database_url=None, dry_run=False):
         except Exception as e:
             print(f"   ❌ Error creating {table_name}: {e}")
             sys.exit(1)
+
+    add_missing_columns(engine, schema_name, tables_to_create)
+    migrate_jobs_to_jsonb(engine, schema_name)
     
     print("\n✅ Schema applied successfully!")
     print(f"\n📊 Current tables in schema '{schema_name}':")
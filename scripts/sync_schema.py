@@ -59,7 +59,7 @@ def compare_schemas(dev_url, prod_url):
     dev_tables = set(dev_inspector.get_table_names(schema=schema_name))
     prod_tables = set(prod_inspector.get_table_names(schema=schema_name))
     
-    docparser_tables = {"jobs", "batches", "clients"}
+    docparser_tables = {"jobs", "batches", "clients", "usage_events", "usage_daily", "usage_monthly", "retention_policies", "reconciliations"}
     
     # Filter to only DocParser tables
     dev_tables = dev_tables & docparser_tables